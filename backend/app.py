@@ -1,27 +1,52 @@
-from fastapi import FastAPI, UploadFile, File
+from contextlib import asynccontextmanager
+
+from fastapi import Depends, FastAPI, HTTPException, Request, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from .config import settings
 from .utils.logging import configure_logging
-from .models.io import IngestResponse, QueryRequest, QueryResponse, Citation
-from .ingestion.service import ingest_files
+from .utils.profiler import HotStacks, RequestProfile
+from .models.io import IngestResponse, QueryRequest, QueryResponse, SearchRequest, SearchResponse
 from pathlib import Path
+import logging
+import time
+import tracemalloc
+import uuid
 
-from .retrieval.intent import detect_intent
-from .retrieval.rewrite import deterministic_rewrite
-from .index.lexical import search as lexical_search
-from .index.semantic import semantic_search
-from .index.fusion import weighted_sum, rrf
-from .retrieval.rerank import rerank_by_heuristics
-from .retrieval.gate import evidence_gate
-from .index.chunkio import get_text_map_for_ids, get_meta_map_for_ids
-from .generation.prompt import build_prompt
-from .generation.llm import generate_answer
-from .generation.evidence_check import evidence_filter
+from .index.store import profiles_dir, write_json
+from .index.warmup import start_background_warm_up, warm_up, readiness
+from .pipeline.admission import AdmissionController, Rejected, TokenBucketLimiter
+from .pipeline.coalesce import SingleFlight, request_key
+from .pipeline.context import QueryContext
+from .pipeline.search import CursorError, run_search
+from .pipeline.stages import run_query
 
 
 configure_logging(settings.log_level)
+logger = logging.getLogger(__name__)
+
+# Shed load before it reaches Anthropic/Voyage: bounded concurrency + queue, per-client buckets
+admission = AdmissionController(
+    settings.admission_max_in_flight, settings.admission_max_queue, settings.admission_max_wait_ms / 1000.0
+)
+rate_limiter = TokenBucketLimiter(settings.rate_limit_rps, settings.rate_limit_burst)
+coalescer = SingleFlight()
+hot_stacks = HotStacks(settings.profile_hot_hz)
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    # Load indexes and chunk store off the request path; /ready flips once they are resident.
+    if settings.tracemalloc_frames > 0:
+        tracemalloc.start(settings.tracemalloc_frames)  # before warm-up, so index loads are attributed
+    start_background_warm_up()
+    hot_stacks.start()  # no-op unless PROFILE_HOT_HZ > 0
+    yield
+    hot_stacks.stop()
 
-app = FastAPI(title=settings.app_name, debug=settings.debug)
+
+app = FastAPI(title=settings.app_name, debug=settings.debug, lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -43,92 +68,131 @@ def health():
     }
 
 
+@app.get("/ready")
+def ready():
+    state = readiness()
+    return JSONResponse(state, status_code=200 if state["ready"] else 503)
+
+
 @app.post("/ingest", response_model=IngestResponse)
 async def ingest(files: list[UploadFile] = File(...)):
+    # Ingestion pulls in PyMuPDF and scikit-learn; import it only when an upload arrives.
+    from .ingestion.service import ingest_files
+    from .ingestion.upload import store_upload
+
     paths: list[Path] = []
+    md5s: dict[Path, str] = {}
     for f in files:
-        # Save uploaded file to a temp path then pass to orchestrator which copies to docs dir
-        tmp_path = Path("/tmp") / f.filename
-        content = await f.read()
-        tmp_path.write_bytes(content)
-        paths.append(tmp_path)
-    counts = ingest_files(paths)
+        # Stream straight into docs dir (constant memory), hashing in the same pass
+        try:
+            stored = await store_upload(f)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+        paths.append(stored.path)
+        md5s[stored.path] = stored.md5
+    counts = await run_in_threadpool(ingest_files, paths, md5s)
+    # Reload the rebuilt indexes now rather than on the next query.
+    await run_in_threadpool(warm_up)
     return IngestResponse(ingested=[p.stem for p in paths], chunks=counts["chunks"], warnings=[])
 
 
+@app.delete("/documents/{doc_id}")
+async def delete_document(doc_id: str):
+    from .ingestion.service import delete_document as remove_document
+
+    # Rows are masked immediately (tombstone); the index is compacted in the background
+    result = await run_in_threadpool(remove_document, doc_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"Unknown document: {doc_id}")
+    return {**result, "compaction": "scheduled"}
+
+
+def _client_key(request: Request) -> str:
+    return request.headers.get("x-client-id") or (request.client.host if request.client else "unknown")
+
+
+def _shed(status: int, reason: str, retry_after: float, model=QueryResponse) -> JSONResponse:
+    body = model(error="overloaded", reason=reason)
+    return JSONResponse(body.model_dump(), status_code=status, headers={"Retry-After": str(max(1, round(retry_after)))})
+
+
+def _diagnostics_enabled() -> bool:
+    return settings.profile_enabled or settings.debug
+
+
+def _require_diagnostics() -> None:
+    # Stacks, heap traces and file paths are for operators: hidden unless profiling is on
+    if not _diagnostics_enabled():
+        raise HTTPException(status_code=404, detail="Not Found")
+
+
+def _profile_requested(request: Request) -> bool:
+    return _diagnostics_enabled() and request.headers.get("x-profile", "").lower() in {"1", "true", "yes"}
+
+
+async def _profiled(req: QueryRequest, execute) -> QueryResponse:
+    with RequestProfile(settings.profile_interval_ms / 1000.0) as prof:
+        resp = await execute()
+    path = profiles_dir() / f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}.speedscope.json"
+    await run_in_threadpool(write_json, path, prof.to_speedscope(f"/query {req.query[:80]!r}"))
+    info = {"path": str(path), "samples": prof.samples, "elapsed_ms": round(prof.elapsed_s * 1000.0, 1)}
+    logger.info("query profiled", extra={"extra": info})
+    return resp.model_copy(update={"meta": {**resp.meta, "profile": info}})
+
+
 @app.post("/query", response_model=QueryResponse)
-async def query(req: QueryRequest):
-    # Intent detection
-    intent_res = detect_intent(req.query)
-    if intent_res.intent == "smalltalk":
-        msg = build_prompt("smalltalk", req.query, [])
-        return QueryResponse(answer=msg, citations=[], meta={"intent": "smalltalk", "threshold_passed": False})
-
-    # Rewrite
-    q = deterministic_rewrite(req.query)
-
-    # Retrieval
-    # Guard lexical/semantic with best-effort fallbacks
-    try:
-        lex = lexical_search(q, top_k=req.top_k)
-    except Exception:
-        lex = []
+async def query(req: QueryRequest, request: Request):
+    wait_s = rate_limiter.check(_client_key(request))
+    if wait_s > 0:
+        return _shed(429, "rate_limited", wait_s)
+
+    async def execute() -> QueryResponse:
+        async with admission.slot():
+            return await run_query(QueryContext.from_request(req))
+
     try:
-        sem = semantic_search(q, top_k=req.top_k) if settings.use_semantic and req.semantic else []
-    except Exception:
-        sem = []
-    use_rrf = req.use_rrf if req.use_rrf is not None else settings.use_rrf
-    fused = rrf(lex, sem, top_k=req.top_k) if use_rrf else weighted_sum(lex, sem, top_k=req.top_k)
-
-    # Build maps for rerank and citations
-    chunk_ids = [cid for cid, _ in fused]
-    id2text = get_text_map_for_ids(chunk_ids)
-    id2meta = get_meta_map_for_ids(chunk_ids)
-    id2heading = {cid: "/".join(id2meta.get(cid, {}).get("headings_path", []) or []) for cid in chunk_ids}
-    id2doc = {cid: id2meta.get(cid, {}).get("doc_id", "?") for cid in chunk_ids}
-
-    reranked = rerank_by_heuristics(req.query, fused, id2text, id2heading, top_k=req.top_k)
-
-    # Gate
-    # Allow threshold overrides
-    thr = req.evidence_threshold if req.evidence_threshold is not None else None
-    if req.evidence_topk is not None:
-        settings.evidence_topk = req.evidence_topk  # transient for this process
-    passed, gate_meta = evidence_gate(reranked, id2doc, threshold=thr)
-    if not passed:
-        return QueryResponse(error="insufficient_evidence", reason="gate_failed", citations=[], meta=gate_meta)
-
-    # Assemble context (top-k small) and prompt
-    top_ids = [cid for cid, _ in reranked[: min(4, len(reranked))]]
-    context_texts = [id2text[cid] for cid in top_ids if cid in id2text]
-    prompt = build_prompt("qa" if req.mode in ("auto", "qa") else req.mode, req.query, context_texts)
-
-    # Generate
+        if _profile_requested(request):
+            # Profiled requests run on their own (never coalesced) so the samples are theirs
+            return await _profiled(req, execute)
+        if not settings.coalesce_queries:
+            return await execute()
+        # Identical concurrent queries share one execution (and one admission slot)
+        resp, shared, waiters = await coalescer.do(request_key(req), execute)
+    except Rejected as exc:
+        return _shed(503, exc.reason, exc.retry_after)
+    return resp.model_copy(update={"meta": {**resp.meta, "coalesced_waiters": waiters, "coalesced": shared}})
+
+
+@app.post("/search", response_model=SearchResponse)
+async def search(req: SearchRequest, request: Request):
+    # Retrieval only: rate-limited per client, but no admission slot (those pace LLM calls)
+    wait_s = rate_limiter.check(_client_key(request))
+    if wait_s > 0:
+        return _shed(429, "rate_limited", wait_s, SearchResponse)
     try:
-        temp = 0.1 if req.temperature is None else req.temperature
-        answer = generate_answer(prompt, temperature=temp)
-    except Exception:
-        # If LLM fails, return insufficient evidence rather than 500
-        return QueryResponse(error="generation_failed", reason="llm_error", citations=[], meta={"intent": intent_res.intent})
-    # Evidence filter
-    answer_filtered = evidence_filter(answer, context_texts)
-
-    # Citations
-    citations: list[Citation] = []
-    for cid, score in reranked[: min(4, len(reranked))]:
-        meta = id2meta.get(cid, {})
-        citations.append(
-            Citation(
-                doc_id=str(meta.get("doc_id", "?")),
-                pages=f"{meta.get('page_start', '?')}-{meta.get('page_end', '?')}",
-                heading=("/".join(meta.get("headings_path", []) or []) or None),
-                score=float(score),
-            )
-        )
-
-    return QueryResponse(
-        answer=answer_filtered,
-        citations=citations,
-        meta={"intent": intent_res.intent, "threshold_passed": True, "used_semantic": bool(sem)},
-    )
+        return await run_search(req)
+    except CursorError as exc:
+        raise HTTPException(status_code=exc.status, detail=exc.reason) from exc
+
+
+@app.get("/debug/admission")
+def admission_metrics():
+    return {
+        "admission": admission.metrics(),
+        "rate_limit": rate_limiter.metrics(),
+        "coalescing": {"enabled": settings.coalesce_queries, "in_flight_keys": coalescer.in_flight()},
+    }
+
+
+@app.get("/debug/hot-stacks", dependencies=[Depends(_require_diagnostics)])
+def hot_stack_report(limit: int = 20, format: str = "json"):
+    if format == "speedscope":
+        return hot_stacks.to_speedscope()
+    return {"running": hot_stacks.running, "hz": hot_stacks.hz, "samples": hot_stacks.total, "stacks": hot_stacks.top(limit)}
+
+
+@app.get("/debug/index-stats", dependencies=[Depends(_require_diagnostics)])
+def index_stats_report(per_doc: bool = False, trace: bool = False):
+    from .index.stats import index_stats
 
+    return index_stats(per_doc=per_doc, trace=trace)
@@ -16,18 +16,95 @@ class Settings(BaseModel):
     use_semantic: bool = os.getenv("USE_SEMANTIC", "true").lower() == "true"
     use_rrf: bool = os.getenv("USE_RRF", "false").lower() == "true"  # default FALSE per decision
 
+    # Retrieval routing: "adaptive" runs semantic only when lexical is not decisive (see
+    # backend.retrieval.router); "always" runs both. Speculative mode starts semantic alongside
+    # lexical and cancels it if unneeded (lower latency, provider cost unchanged).
+    retrieval_routing: str = os.getenv("RETRIEVAL_ROUTING", "adaptive")
+    route_speculative: bool = os.getenv("ROUTE_SPECULATIVE", "true").lower() == "true"
+    route_min_top: float = float(os.getenv("ROUTE_MIN_TOP", "0.35"))
+    route_min_margin: float = float(os.getenv("ROUTE_MIN_MARGIN", "0.25"))
+    route_min_coverage: float = float(os.getenv("ROUTE_MIN_COVERAGE", "1.0"))
+
+    # Two-stage retrieval: score documents first and only the chunks of the top M (0 = off)
+    doc_route_top_m: int = int(os.getenv("DOC_ROUTE_TOP_M", "0"))
+
+    # Query expansion (llm_expand): LLM paraphrases to add (0 = deterministic variants only) and
+    # how long to wait for them
+    expand_llm_variants: int = int(os.getenv("EXPAND_LLM_VARIANTS", "3"))
+    expand_timeout_s: float = float(os.getenv("EXPAND_TIMEOUT_S", "4"))
+
+    # /search: ranking depth that pages are cut from, largest page, rankings kept for
+    # cursors (per worker), and snippet length in words
+    search_max_results: int = int(os.getenv("SEARCH_MAX_RESULTS", "100"))
+    search_page_size_max: int = int(os.getenv("SEARCH_PAGE_SIZE_MAX", "50"))
+    search_cache_size: int = int(os.getenv("SEARCH_CACHE_SIZE", "256"))
+    search_snippet_words: int = int(os.getenv("SEARCH_SNIPPET_WORDS", "30"))
+
     # Evidence thresholds
     evidence_topk: int = int(os.getenv("EVIDENCE_TOPK", "4"))
     evidence_threshold: float = float(os.getenv("EVIDENCE_THRESHOLD", "0.28"))
 
+    # Chunking (ingest and `python -m backend.ingestion.rechunk`)
+    chunk_target_tokens: int = int(os.getenv("CHUNK_TARGET_TOKENS", "1000"))
+    chunk_overlap_ratio: float = float(os.getenv("CHUNK_OVERLAP_RATIO", "0.15"))
+
+    # Near-duplicate chunks (MinHash estimated Jaccard >= threshold) are left out of the indexes
+    dedup_near_duplicates: bool = os.getenv("DEDUP_NEAR_DUPLICATES", "true").lower() == "true"
+    near_dup_threshold: float = float(os.getenv("NEAR_DUP_THRESHOLD", "0.85"))
+
+    # Index snapshots: how many published builds to keep on disk (the current one is never removed)
+    index_snapshots_keep: int = int(os.getenv("INDEX_SNAPSHOTS_KEEP", "3"))
+
+    # Context assembly: max prompt context size (whitespace-token proxy, as in chunking)
+    context_token_budget: int = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1200"))
+
+    # Extractive answers: auto mode skips the LLM when gate mean_topk and the best sentence's
+    # query coverage both reach these values (set the threshold above 1 to disable)
+    extractive_auto_threshold: float = float(os.getenv("EXTRACTIVE_AUTO_THRESHOLD", "0.6"))
+    extractive_min_coverage: float = float(os.getenv("EXTRACTIVE_MIN_COVERAGE", "0.75"))
+
+    # Latency budget (0 = unbounded) and the minimum time left required to attempt optional stages
+    latency_budget_ms: int = int(os.getenv("LATENCY_BUDGET_MS", "0"))
+    semantic_min_ms: int = int(os.getenv("SEMANTIC_MIN_MS", "1500"))
+    evidence_filter_min_ms: int = int(os.getenv("EVIDENCE_FILTER_MIN_MS", "1000"))
+    llm_timeout_s: float = float(os.getenv("LLM_TIMEOUT_S", "60"))
+    llm_hedge: bool = os.getenv("LLM_HEDGE", "false").lower() == "true"
+    llm_hedge_after_ms: int = int(os.getenv("LLM_HEDGE_AFTER_MS", "4000"))
+    embedding_timeout_s: float = float(os.getenv("EMBEDDING_TIMEOUT_S", "10"))
+
+    # Admission control for /query (0 in-flight = unlimited) and per-client rate limit (0 rps = off)
+    admission_max_in_flight: int = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "16"))
+    admission_max_queue: int = int(os.getenv("ADMISSION_MAX_QUEUE", "32"))
+    admission_max_wait_ms: int = int(os.getenv("ADMISSION_MAX_WAIT_MS", "2000"))
+    rate_limit_rps: float = float(os.getenv("RATE_LIMIT_RPS", "0"))
+    rate_limit_burst: float = float(os.getenv("RATE_LIMIT_BURST", "10"))
+    # Identical concurrent /query requests share one execution
+    coalesce_queries: bool = os.getenv("COALESCE_QUERIES", "true").lower() == "true"
+
+    # Profiling: an `X-Profile: 1` request header writes a speedscope file to data/profiles when
+    # enabled (or DEBUG), which also serves /debug/hot-stacks and /debug/index-stats;
+    # PROFILE_HOT_HZ > 0 samples all traffic into /debug/hot-stacks
+    profile_enabled: bool = os.getenv("PROFILE_ENABLED", "false").lower() == "true"
+    profile_interval_ms: float = float(os.getenv("PROFILE_INTERVAL_MS", "2"))
+    profile_hot_hz: float = float(os.getenv("PROFILE_HOT_HZ", "0"))
+    # Start tracemalloc at boot with this many frames per trace (0 = off); see /debug/index-stats
+    tracemalloc_frames: int = int(os.getenv("TRACEMALLOC_FRAMES", "0"))
+
     # LLM provider (Anthropic by default)
     llm_provider: str = os.getenv("LLM_PROVIDER", "anthropic")
     anthropic_api_key: str | None = os.getenv("ANTHROPIC_API_KEY")
     anthropic_model: str = os.getenv("ANTHROPIC_MODEL", "claude-sonnet-4-20250514")
+    # Alternative API endpoint (proxy, gateway or scripts/stub_providers.py); unset = the SDK default
+    anthropic_base_url: str | None = os.getenv("ANTHROPIC_BASE_URL") or None
+    # Send prompts as cacheable blocks (instructions, context, question) with cache_control
+    llm_prompt_cache: bool = os.getenv("LLM_PROMPT_CACHE", "true").lower() == "true"
 
-    # Embeddings provider (Voyage by default)
+    # Embeddings provider (Voyage by default; "local" = in-process hashed n-gram embedder)
     embedding_provider: str = os.getenv("EMBEDDING_PROVIDER", "voyage")
+    local_embedding_dim: int = int(os.getenv("LOCAL_EMBEDDING_DIM", "256"))
     voyage_api_key: str | None = os.getenv("VOYAGE_API_KEY")
+    # Alternative embeddings endpoint, e.g. http://127.0.0.1:9100/v1 (scripts/stub_providers.py)
+    voyage_base_url: str | None = os.getenv("VOYAGE_BASE_URL") or None
     embedding_model: str = os.getenv("EMBEDDING_MODEL", "voyage-3.5")
 
 
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Dict, Hashable, List, Mapping, Sequence, Set, Tuple
+import re
+
+from backend.utils.text import count_tokens, split_sentences
+
+
+_RE_WORD = re.compile(r"\w+")
+_STOP = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "how", "in", "is", "it", "of",
+    "on", "or", "that", "the", "this", "to", "was", "what", "when", "where", "which", "who", "why", "with",
+}
+
+
+@dataclass
+class ContextPassage:
+    # Keys are whatever the caller ranks by: registry rows in the pipeline, or chunk ids
+    doc_id: Hashable
+    chunk_ids: List[Hashable]
+    text: str
+    score: float
+    tokens: int = 0
+
+
+@dataclass
+class _Unit:
+    # A sentence (or a sub-window of an over-long sentence) inside one chunk
+    doc_id: Hashable
+    chunk_id: Hashable
+    pos: int
+    text: str
+    key: str
+    score: float = 0.0
+    chunk_ids: List[Hashable] = field(default_factory=list)
+
+
+def _terms(text: str) -> Set[str]:
+    return {t for t in _RE_WORD.findall(text.lower()) if t not in _STOP and len(t) > 1}
+
+
+def _units(text: str, max_unit_words: int) -> List[str]:
+    out: List[str] = []
+    for sent in split_sentences(text):
+        words = sent.split()
+        # PDF text often lacks punctuation; cut run-on "sentences" into fixed windows
+        for i in range(0, len(words), max_unit_words):
+            out.append(" ".join(words[i : i + max_unit_words]))
+    return out
+
+
+def assemble_context(
+    query: str,
+    ranked: Sequence[Tuple[Hashable, float]],
+    chunk_text_map: Mapping[Hashable, str],
+    chunk_doc_map: Mapping[Hashable, Hashable],
+    token_budget: int = 1200,
+    max_chunks: int = 8,
+    window: int = 1,
+    max_unit_words: int = 60,
+) -> List[ContextPassage]:
+    """Select the most query-relevant sentences from reranked chunks within a token budget.
+
+    Sentences are scored by query-term coverage weighted by their chunk's rank score, and each
+    pick pulls in `window` neighbouring sentences. Text repeated across overlapping chunks of
+    the same document is kept once (attributed to every chunk containing it), and adjacent
+    picks from the same chunk are merged into one passage. Token counts use the same
+    whitespace proxy as chunking.
+    """
+    q_terms = _terms(query)
+    candidates = [(cid, s) for cid, s in ranked[:max_chunks] if chunk_text_map.get(cid)]
+    if not candidates or token_budget <= 0:
+        return []
+    top_score = max(max(s for _, s in candidates), 1e-9)
+
+    per_chunk: Dict[Hashable, List[_Unit]] = {}
+    by_key: Dict[Tuple[Hashable, str], _Unit] = {}
+    for cid, chunk_score in candidates:
+        doc_id = chunk_doc_map.get(cid, "?")
+        weight = 0.5 + 0.5 * max(0.0, chunk_score) / top_score
+        units: List[_Unit] = []
+        for pos, text in enumerate(_units(chunk_text_map[cid], max_unit_words)):
+            key = " ".join(text.lower().split())
+            seen = by_key.get((doc_id, key))
+            if seen is not None:
+                # Overlap region of a neighbouring window: same text, one more source chunk
+                seen.chunk_ids.append(cid)
+                units.append(seen)
+                continue
+            coverage = len(q_terms & _terms(text)) / len(q_terms) if q_terms else 0.0
+            unit = _Unit(doc_id, cid, pos, text, key, coverage * weight, [cid])
+            by_key[(doc_id, key)] = unit
+            units.append(unit)
+        per_chunk[cid] = units
+
+    seeds = sorted((u for u in by_key.values() if u.score > 0), key=lambda u: u.score, reverse=True)
+    if not seeds:
+        # Nothing matches the query terms (e.g. purely semantic hits): fall back to chunk openings
+        seeds = [units[0] for units in per_chunk.values() if units]
+
+    chosen: Dict[int, _Unit] = {}
+    used = 0
+    for seed in seeds:
+        units = per_chunk[seed.chunk_id]
+        lo, hi = max(0, seed.pos - window), min(len(units), seed.pos + window + 1)
+        # The seed itself first, then its neighbours, each only if it still fits
+        for unit in [seed] + units[lo:seed.pos] + units[seed.pos + 1 : hi]:
+            if id(unit) in chosen:
+                continue
+            cost = count_tokens(unit.text)
+            if used + cost > token_budget:
+                continue
+            chosen[id(unit)] = unit
+            used += cost
+        if used >= token_budget:
+            break
+
+    # Merge contiguous picks within each owning chunk, preserving document order inside a run
+    passages: List[ContextPassage] = []
+    emitted: Set[int] = set()
+    for cid, units in per_chunk.items():
+        run: List[_Unit] = []
+        for unit in units + [None]:  # type: ignore[list-item]
+            if unit is not None and id(unit) in chosen and id(unit) not in emitted and unit.chunk_id == cid:
+                run.append(unit)
+                emitted.add(id(unit))
+                continue
+            if run:
+                chunk_ids = list(dict.fromkeys(c for u in run for c in u.chunk_ids))
+                text = " ".join(u.text for u in run)
+                passages.append(
+                    ContextPassage(
+                        doc_id=run[0].doc_id,
+                        chunk_ids=chunk_ids,
+                        text=text,
+                        score=max(u.score for u in run),
+                        tokens=count_tokens(text),
+                    )
+                )
+                run = []
+    passages.sort(key=lambda p: p.score, reverse=True)
+    return passages
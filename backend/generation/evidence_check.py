@@ -4,17 +4,11 @@ from typing import List, Tuple
 import numpy as np
 
 from backend.index.semantic import _cosine_similarity
-from backend.index.semantic import _embed_voyage  # reuse provider stub
-from backend.config import settings
+from backend.index.semantic import embed_texts, embeddings_available
+from backend.utils.text import split_sentences
 
 
-def split_sentences(text: str) -> List[str]:
-    import re
-    s = re.split(r"(?<=[.!?])\s+", text.strip()) if text else []
-    return [t.strip() for t in s if t.strip()]
-
-
-def evidence_filter(answer: str, supporting_texts: List[str], threshold: float = 0.28) -> str:
+def evidence_filter(answer: str, supporting_texts: List[str], threshold: float = 0.28, timeout: float | None = None) -> str:
     """Filter answer sentences that are not supported by context.
 
     Best-effort: if embeddings are unavailable/misconfigured, return the original answer.
@@ -26,12 +20,11 @@ def evidence_filter(answer: str, supporting_texts: List[str], threshold: float =
         if not sents or not supporting_texts:
             return answer
 
-        if settings.embedding_provider != "voyage" or not settings.voyage_api_key:
+        if not embeddings_available():
             return answer
 
-        model = settings.embedding_model
-        ctx_matrix = _embed_voyage(supporting_texts, model=model)
-        sent_matrix = _embed_voyage(sents, model=model)
+        ctx_matrix = embed_texts(supporting_texts, timeout=timeout)
+        sent_matrix = embed_texts(sents, timeout=timeout)
 
         sims = _cosine_similarity(sent_matrix, ctx_matrix)  # shape: [num_sents, num_ctx]
         keep: List[str] = []
@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+from typing import Dict, Hashable, List, Mapping, Sequence, Tuple
+
+from backend.generation.context import ContextPassage, assemble_context
+
+
+def extractive_answer(
+    query: str,
+    ranked: Sequence[Tuple[Hashable, float]],
+    chunk_text_map: Mapping[Hashable, str],
+    chunk_doc_map: Mapping[Hashable, Hashable],
+    max_sentences: int = 3,
+    max_tokens: int = 120,
+    max_chunks: int = 4,
+) -> Tuple[str, List[ContextPassage]]:
+    """Answer with the top-scoring sentences of the reranked chunks; no provider call.
+
+    Sentences are chosen by the same query-coverage scoring as context assembly, with no
+    neighbour window, and returned in score order. Returns (answer, passages used); the
+    answer is empty when no sentence shares a term with the query.
+    """
+    passages = assemble_context(
+        query, ranked, chunk_text_map, chunk_doc_map, token_budget=max_tokens, max_chunks=max_chunks, window=0
+    )
+    picked: Dict[str, ContextPassage] = {}
+    for p in passages:
+        if p.score <= 0:
+            continue
+        key = " ".join(p.text.lower().split())
+        if key in picked:
+            # Same sentence in another document (e.g. a revision): cite it, don't repeat it
+            picked[key].chunk_ids.extend(c for c in p.chunk_ids if c not in picked[key].chunk_ids)
+        elif len(picked) < max_sentences:
+            picked[key] = p
+    used = list(picked.values())
+    return " ".join(p.text for p in used), used
@@ -1,18 +1,25 @@
 from __future__ import annotations
 
-from typing import Dict, Any
+from dataclasses import dataclass, field
+from typing import Dict, Any, List
+import asyncio
 
 from backend.config import settings
+from backend.utils.profiler import in_request
+from .prompt import Prompt
 
 
-def generate_answer(prompt: str, temperature: float = 0.1) -> str:
-    """Call Anthropic Claude with the given prompt and return text.
+_EPHEMERAL = {"type": "ephemeral"}
+_USAGE_FIELDS = ("input_tokens", "output_tokens", "cache_read_input_tokens", "cache_creation_input_tokens")
 
-    Note: Minimal wrapper; proper tool use/JSON modes can be added later.
-    """
-    if settings.llm_provider != "anthropic":
-        raise ValueError(f"Unsupported LLM provider: {settings.llm_provider}")
 
+@dataclass
+class Completion:
+    text: str
+    usage: Dict[str, int] = field(default_factory=dict)
+
+
+def _client(timeout: float | None):
     try:
         from anthropic import Anthropic
     except Exception as exc:  # pragma: no cover
@@ -21,18 +28,105 @@ def generate_answer(prompt: str, temperature: float = 0.1) -> str:
     if not settings.anthropic_api_key:
         raise ValueError("ANTHROPIC_API_KEY not set in environment")
 
-    client = Anthropic(api_key=settings.anthropic_api_key)
-    resp = client.messages.create(
-        model=settings.anthropic_model,
-        max_tokens=800,
-        temperature=temperature,
-        messages=[{"role": "user", "content": prompt}],
-    )
-    # anthropic SDK returns content as a list of blocks
-    parts = getattr(resp, "content", [])
-    if not parts:
-        return ""
-    # text blocks contain a 'text' field
-    return "\n".join([getattr(p, "text", "") for p in parts if getattr(p, "type", "") == "text"]) or ""
+    kwargs: Dict[str, Any] = {"api_key": settings.anthropic_api_key}
+    if settings.anthropic_base_url:
+        kwargs["base_url"] = settings.anthropic_base_url
+    if timeout is None:
+        return Anthropic(timeout=settings.llm_timeout_s, **kwargs)
+    return Anthropic(timeout=timeout, max_retries=0, **kwargs)
+
+
+def _cached_request(prompt: Prompt) -> Dict[str, Any]:
+    # Cache breakpoints after the instructions and after the context: a repeated context
+    # (popular chunks) reads both from the cache, a new context still reuses the instructions
+    return {
+        "system": [{"type": "text", "text": prompt.system, "cache_control": _EPHEMERAL}],
+        "messages": [
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": prompt.context, "cache_control": _EPHEMERAL},
+                    {"type": "text", "text": prompt.question},
+                ],
+            }
+        ],
+    }
+
+
+def complete(prompt: Prompt | str, temperature: float = 0.1, timeout: float | None = None) -> Completion:
+    """Call Anthropic Claude and return the text plus token usage.
+
+    A `Prompt` is sent as cacheable blocks (unless LLM_PROMPT_CACHE=false); usage then
+    includes the cache read/write token counts. A plain string is one user message.
+    timeout bounds the whole HTTP call (seconds); with a timeout the SDK does not retry,
+    so the caller's deadline is never overrun by hidden retries.
+    """
+    if settings.llm_provider != "anthropic":
+        raise ValueError(f"Unsupported LLM provider: {settings.llm_provider}")
+
+    client = _client(timeout)
+    args: Dict[str, Any] = {"model": settings.anthropic_model, "max_tokens": 800, "temperature": temperature}
+    if isinstance(prompt, Prompt) and settings.llm_prompt_cache:
+        resp = client.beta.prompt_caching.messages.create(**args, **_cached_request(prompt))
+    else:
+        text = prompt.text() if isinstance(prompt, Prompt) else prompt
+        resp = client.messages.create(**args, messages=[{"role": "user", "content": text}])
+    usage = getattr(resp, "usage", None)
+    counts = {name: int(getattr(usage, name, None) or 0) for name in _USAGE_FIELDS} if usage is not None else {}
+    # anthropic SDK returns content as a list of blocks; text blocks contain a 'text' field
+    parts = getattr(resp, "content", None) or []
+    return Completion("\n".join([getattr(p, "text", "") for p in parts if getattr(p, "type", "") == "text"]), counts)
+
+
+def generate_answer(prompt: Prompt | str, temperature: float = 0.1, timeout: float | None = None) -> str:
+    """Call Anthropic Claude with the given prompt and return text (see `complete`)."""
+    return complete(prompt, temperature, timeout).text
+
 
+async def generate_answer_hedged(
+    prompt: Prompt | str,
+    temperature: float = 0.1,
+    timeout: float | None = None,
+    hedge_after: float | None = None,
+) -> Dict[str, Any]:
+    """Run `complete` off the event loop, optionally hedging a slow call.
 
+    If the first request has not finished after `hedge_after` seconds (and there is still
+    time left), a second identical request is started and whichever succeeds first wins.
+    Raises asyncio.TimeoutError when `timeout` elapses, or the last provider error.
+    Returns {"text": str, "usage": dict, "hedged": bool, "winner": 0 | 1}.
+    """
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+
+    def left() -> float | None:
+        return None if timeout is None else max(0.0, timeout - (loop.time() - start))
+
+    def launch() -> asyncio.Task:
+        return asyncio.ensure_future(asyncio.to_thread(in_request(complete), prompt, temperature, left()))
+
+    tasks: List[asyncio.Task] = [launch()]
+    hedged = False
+    try:
+        if hedge_after is not None and hedge_after > 0 and (timeout is None or hedge_after < timeout):
+            done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+            if not done:
+                tasks.append(launch())
+                hedged = True
+        pending = set(tasks)
+        error: BaseException | None = None
+        while pending:
+            done, pending = await asyncio.wait(pending, timeout=left(), return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                raise asyncio.TimeoutError()
+            for task in done:
+                if task.exception() is None:
+                    result: Completion = task.result()
+                    return {"text": result.text, "usage": result.usage, "hedged": hedged, "winner": tasks.index(task)}
+                error = task.exception()
+        assert error is not None
+        raise error
+    finally:
+        # Worker threads cannot be interrupted; their own HTTP timeout bounds them.
+        for task in tasks:
+            task.cancel()
@@ -1,10 +1,49 @@
 from __future__ import annotations
 
+from dataclasses import dataclass
 from typing import List, Literal, Dict
 
 
 Mode = Literal["qa", "list", "table", "smalltalk"]
 
+_HEADER = (
+    "You are a factual assistant. Use ONLY the provided context to answer. "
+    "Cite evidence by chunk index when helpful. If insufficient, say 'insufficient evidence'."
+)
+
+
+@dataclass(frozen=True)
+class Prompt:
+    """A generation prompt split into blocks, most stable first, so a provider can cache the prefix.
+
+    `system` depends only on the mode; `context` only on the chunks (callers pass them in a
+    deterministic order); `question` changes with every request.
+    """
+
+    system: str
+    context: str
+    question: str
+
+    def text(self) -> str:
+        return f"{self.system}\n\n{self.context}\n\n{self.question}"
+
+
+def _instruction(mode: Mode) -> str:
+    if mode == "list":
+        return "Return a JSON array of items directly supported by the context. No extra commentary."
+    if mode == "table":
+        return "Return a JSON array of objects (table rows) with consistent keys, using only supported facts."
+    return "Answer concisely with citations."
+
+
+def build_prompt_blocks(mode: Mode, query: str, context_chunks: List[str]) -> Prompt:
+    ctx = "\n\n".join([f"[Chunk {i}]\n{t}" for i, t in enumerate(context_chunks, 1)])
+    return Prompt(
+        system=f"{_HEADER}\n\nInstruction: {_instruction(mode)}",
+        context=f"Context:\n{ctx}",
+        question=f"Question: {query}",
+    )
+
 
 def build_prompt(mode: Mode, query: str, context_chunks: List[str]) -> str:
     if mode == "smalltalk":
@@ -15,23 +54,5 @@ def build_prompt(mode: Mode, query: str, context_chunks: List[str]) -> str:
             "so I can help with citations."
         )
 
-    header = (
-        "You are a factual assistant. Use ONLY the provided context to answer. "
-        "Cite evidence by chunk index when helpful. If insufficient, say 'insufficient evidence'.\n\n"
-    )
     ctx = "\n\n".join([f"[Chunk {i}]\n{t}" for i, t in enumerate(context_chunks, 1)])
-
-    if mode == "list":
-        instruction = (
-            "Return a JSON array of items directly supported by the context. No extra commentary."
-        )
-    elif mode == "table":
-        instruction = (
-            "Return a JSON array of objects (table rows) with consistent keys, using only supported facts."
-        )
-    else:
-        instruction = "Answer concisely with citations."
-
-    return f"{header}Context:\n{ctx}\n\nQuestion: {query}\n\nInstruction: {instruction}"
-
-
+    return f"{_HEADER}\n\nContext:\n{ctx}\n\nQuestion: {query}\n\nInstruction: {_instruction(mode)}"
@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+import json
+import sqlite3
+import threading
+
+import numpy as np
+
+from .store import manifests_dir, chunks_dir, read_json
+
+
+# Single SQLite catalog for documents and chunk metadata. WAL mode lets any number of
+# readers proceed while one writer commits; writers serialise on BEGIN IMMEDIATE.
+_DB_PATH = manifests_dir() / "catalog.sqlite3"
+_LEGACY_MANIFEST = manifests_dir() / "manifest.json"
+_LEGACY_CHUNKS_DIR = chunks_dir()
+_SCHEMA_VERSION = 2
+_IN_BATCH = 500  # stay well below SQLITE_MAX_VARIABLE_NUMBER
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    doc_id   TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    md5      TEXT NOT NULL,
+    pages    INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_documents_md5 ON documents(md5);
+
+CREATE TABLE IF NOT EXISTS chunks (
+    chunk_id      TEXT PRIMARY KEY,
+    doc_id        TEXT NOT NULL,
+    ordinal       INTEGER NOT NULL,
+    page_start    INTEGER NOT NULL,
+    page_end      INTEGER NOT NULL,
+    headings_path TEXT NOT NULL,
+    minhash       BLOB
+);
+CREATE INDEX IF NOT EXISTS idx_chunks_doc_id ON chunks(doc_id, ordinal);
+"""
+
+_local = threading.local()
+
+
+def _connect(path: Path) -> sqlite3.Connection:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path), timeout=30.0, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(_SCHEMA)
+    if conn.execute("PRAGMA user_version").fetchone()[0] < _SCHEMA_VERSION:
+        _migrate(conn)
+    return conn
+
+
+def connection() -> sqlite3.Connection:
+    """Per-thread connection to the catalog (sqlite3 connections are not shared across threads)."""
+    conns: Dict[str, sqlite3.Connection] = getattr(_local, "conns", None) or {}
+    _local.conns = conns
+    key = str(_DB_PATH)
+    conn = conns.get(key)
+    if conn is None:
+        conn = conns[key] = _connect(_DB_PATH)
+    return conn
+
+
+@contextmanager
+def transaction() -> Iterator[sqlite3.Connection]:
+    conn = connection()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+def _migrate(conn: sqlite3.Connection) -> None:
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # Re-check under the write lock: another process may have migrated already.
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version < 1:
+            _import_legacy(conn, _LEGACY_MANIFEST, _LEGACY_CHUNKS_DIR)
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(chunks)")}
+        if "minhash" not in columns:
+            conn.execute("ALTER TABLE chunks ADD COLUMN minhash BLOB")
+        conn.execute(f"PRAGMA user_version={_SCHEMA_VERSION}")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+def _import_legacy(conn: sqlite3.Connection, manifest_path: Path, jsonl_dir: Path) -> int:
+    """One-time import of manifest.json and per-doc <doc_id>.jsonl chunk metadata."""
+    manifest: Dict[str, Dict[str, Any]] = read_json(manifest_path, default={})
+    _insert_documents(conn, manifest.values())
+    imported = 0
+    for jsonl_path in sorted(jsonl_dir.glob("*.jsonl")) if jsonl_dir.exists() else []:
+        rows = []
+        with jsonl_path.open("r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    rows.append(json.loads(line))
+        if rows:
+            conn.execute("DELETE FROM chunks WHERE doc_id = ?", (rows[0]["doc_id"],))
+            _insert_chunks(conn, rows)
+            imported += 1
+    return imported
+
+
+def import_legacy(manifest_path: Path | None = None, jsonl_dir: Path | None = None) -> int:
+    """Import a manifest.json + JSONL tree into the catalog. Returns the number of docs with chunks.
+
+    Runs automatically the first time a catalog is opened; call it directly to re-import.
+    """
+    with transaction() as conn:
+        return _import_legacy(conn, manifest_path or _LEGACY_MANIFEST, jsonl_dir or _LEGACY_CHUNKS_DIR)
+
+
+def _ordinal(chunk_id: str) -> int:
+    tail = chunk_id.rsplit("::ch", 1)[-1]
+    return int(tail) if tail.isdigit() else 0
+
+
+def _insert_documents(conn: sqlite3.Connection, docs: Iterable[Dict[str, Any]]) -> None:
+    conn.executemany(
+        "INSERT INTO documents (doc_id, filename, md5, pages) VALUES (:doc_id, :filename, :md5, :pages) "
+        "ON CONFLICT(doc_id) DO UPDATE SET filename=excluded.filename, md5=excluded.md5, pages=excluded.pages",
+        list(docs),
+    )
+
+
+def _insert_chunks(conn: sqlite3.Connection, chunks: Iterable[Dict[str, Any]]) -> None:
+    conn.executemany(
+        "INSERT OR REPLACE INTO chunks (chunk_id, doc_id, ordinal, page_start, page_end, headings_path, minhash) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [
+            (
+                c["chunk_id"],
+                c["doc_id"],
+                _ordinal(c["chunk_id"]),
+                int(c["page_start"]),
+                int(c["page_end"]),
+                json.dumps(c.get("headings_path") or [], ensure_ascii=False),
+                np.asarray(c["minhash"], dtype=np.uint32).tobytes() if c.get("minhash") is not None else None,
+            )
+            for c in chunks
+        ],
+    )
+
+
+def upsert_documents(docs: Iterable[Dict[str, Any]]) -> None:
+    with transaction() as conn:
+        _insert_documents(conn, docs)
+
+
+def replace_chunks(doc_id: str, chunks: Iterable[Dict[str, Any]]) -> None:
+    """Replace all chunk rows of a document in a single transaction."""
+    with transaction() as conn:
+        conn.execute("DELETE FROM chunks WHERE doc_id = ?", (doc_id,))
+        _insert_chunks(conn, chunks)
+
+
+def delete_document(doc_id: str) -> int:
+    """Remove a document and its chunk rows in one transaction. Returns the number of chunks removed."""
+    with transaction() as conn:
+        removed = conn.execute("DELETE FROM chunks WHERE doc_id = ?", (doc_id,)).rowcount
+        conn.execute("DELETE FROM documents WHERE doc_id = ?", (doc_id,))
+    return removed
+
+
+def get_document(doc_id: str) -> Optional[Dict[str, Any]]:
+    row = connection().execute("SELECT * FROM documents WHERE doc_id = ?", (doc_id,)).fetchone()
+    return dict(row) if row else None
+
+
+def find_by_md5(md5: str) -> List[Dict[str, Any]]:
+    rows = connection().execute("SELECT * FROM documents WHERE md5 = ?", (md5,)).fetchall()
+    return [dict(r) for r in rows]
+
+
+def all_documents() -> Dict[str, Dict[str, Any]]:
+    rows = connection().execute("SELECT * FROM documents ORDER BY doc_id").fetchall()
+    return {r["doc_id"]: dict(r) for r in rows}
+
+
+def _chunk_row(row: sqlite3.Row) -> Dict[str, Any]:
+    return {
+        "chunk_id": row["chunk_id"],
+        "doc_id": row["doc_id"],
+        "page_start": row["page_start"],
+        "page_end": row["page_end"],
+        "headings_path": json.loads(row["headings_path"]),
+    }
+
+
+def get_chunk_meta(chunk_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    conn = connection()
+    out: Dict[str, Dict[str, Any]] = {}
+    unique = list(dict.fromkeys(chunk_ids))
+    for i in range(0, len(unique), _IN_BATCH):
+        batch = unique[i : i + _IN_BATCH]
+        marks = ",".join("?" * len(batch))
+        for row in conn.execute(f"SELECT * FROM chunks WHERE chunk_id IN ({marks})", batch):
+            out[row["chunk_id"]] = _chunk_row(row)
+    return out
+
+
+def chunks_for_doc(doc_id: str) -> List[Dict[str, Any]]:
+    rows = connection().execute("SELECT * FROM chunks WHERE doc_id = ? ORDER BY ordinal", (doc_id,)).fetchall()
+    return [_chunk_row(r) for r in rows]
+
+
+def get_minhashes() -> Dict[str, np.ndarray]:
+    """MinHash signatures of every chunk that has one (see backend.index.dedup)."""
+    rows = connection().execute("SELECT chunk_id, minhash FROM chunks WHERE minhash IS NOT NULL")
+    return {r["chunk_id"]: np.frombuffer(r["minhash"], dtype=np.uint32) for r in rows}
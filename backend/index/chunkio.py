@@ -1,16 +1,65 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Any, Callable, Dict, List, Tuple
 import json
+import threading
 
+from backend.config import settings
 from .store import chunks_dir
+from . import catalog
+from .dedup import find_near_duplicates
 
 
-def _doc_id_from_chunk_id(chunk_id: str) -> str:
+# Per-doc text maps kept resident between queries; each entry is (source mtime_ns, map)
+# so a re-ingested document is reloaded on its next access.
+_CACHE_LOCK = threading.Lock()
+_TEXT_CACHE: Dict[str, Tuple[int, Dict[str, str]]] = {}
+
+
+def doc_id_of(chunk_id: str) -> str:
     return chunk_id.split("::", 1)[0]
 
 
+def _cached(cache: Dict[str, Tuple[int, Any]], doc_id: str, source: Path, loader: Callable[[str], Any]) -> Any:
+    try:
+        stamp = source.stat().st_mtime_ns
+    except FileNotFoundError:
+        return {}
+    hit = cache.get(doc_id)
+    if hit is not None and hit[0] == stamp:
+        return hit[1]
+    value = loader(doc_id)
+    with _CACHE_LOCK:
+        cache[doc_id] = (stamp, value)
+    return value
+
+
+def cached_text_map(doc_id: str) -> Dict[str, str]:
+    return _cached(_TEXT_CACHE, doc_id, chunks_dir() / f"{doc_id}.texts.json", load_id_to_text_for_doc)
+
+
+def preload_chunk_store() -> int:
+    """Load text maps for every persisted document. Returns the number of docs."""
+    doc_ids = [p.name[: -len(".texts.json")] for p in sorted(chunks_dir().glob("*.texts.json"))]
+    for doc_id in doc_ids:
+        cached_text_map(doc_id)
+    return len(doc_ids)
+
+
+def remove_doc_files(doc_id: str) -> int:
+    """Delete a document's chunk files (texts, map and any legacy JSONL) and its cached text map."""
+    removed = 0
+    for suffix in (".texts.json", ".map.json", ".jsonl"):
+        path = chunks_dir() / f"{doc_id}{suffix}"
+        if path.exists():
+            path.unlink()
+            removed += 1
+    with _CACHE_LOCK:
+        _TEXT_CACHE.pop(doc_id, None)
+    return removed
+
+
 def load_id_to_text_for_doc(doc_id: str) -> Dict[str, str]:
     cdir = chunks_dir()
     texts_path = cdir / f"{doc_id}.texts.json"
@@ -21,27 +70,14 @@ def load_id_to_text_for_doc(doc_id: str) -> Dict[str, str]:
     return {cid: texts[idx] for cid, idx in id_map.items()}
 
 
-def load_id_to_meta_for_doc(doc_id: str) -> Dict[str, Dict]:
-    cdir = chunks_dir()
-    jsonl_path = cdir / f"{doc_id}.jsonl"
-    out: Dict[str, Dict] = {}
-    with jsonl_path.open("r", encoding="utf-8") as f:
-        for line in f:
-            if not line.strip():
-                continue
-            obj = json.loads(line)
-            out[obj["chunk_id"]] = obj
-    return out
-
-
 def get_text_map_for_ids(chunk_ids: List[str]) -> Dict[str, str]:
     # group by doc_id and merge per-doc maps
     out: Dict[str, str] = {}
     by_doc: Dict[str, List[str]] = {}
     for cid in chunk_ids:
-        by_doc.setdefault(_doc_id_from_chunk_id(cid), []).append(cid)
+        by_doc.setdefault(doc_id_of(cid), []).append(cid)
     for doc_id, ids in by_doc.items():
-        id2text = load_id_to_text_for_doc(doc_id)
+        id2text = cached_text_map(doc_id)
         for cid in ids:
             if cid in id2text:
                 out[cid] = id2text[cid]
@@ -49,15 +85,33 @@ def get_text_map_for_ids(chunk_ids: List[str]) -> Dict[str, str]:
 
 
 def get_meta_map_for_ids(chunk_ids: List[str]) -> Dict[str, Dict]:
-    out: Dict[str, Dict] = {}
-    by_doc: Dict[str, List[str]] = {}
-    for cid in chunk_ids:
-        by_doc.setdefault(_doc_id_from_chunk_id(cid), []).append(cid)
-    for doc_id, ids in by_doc.items():
-        id2meta = load_id_to_meta_for_doc(doc_id)
-        for cid in ids:
-            if cid in id2meta:
-                out[cid] = id2meta[cid]
-    return out
+    return catalog.get_chunk_meta(chunk_ids)
+
+
+def load_corpus() -> List[Tuple[str, str]]:
+    """All persisted chunks as (chunk_id, text), in doc-file then chunk order."""
+    cdir = chunks_dir()
+    corpus: List[Tuple[str, str]] = []
+    for texts_path in sorted(cdir.glob("*.texts.json")):
+        stem = texts_path.name.replace(".texts.json", "")
+        map_path = cdir / f"{stem}.map.json"
+        if not map_path.exists():
+            continue
+        texts = json.loads(texts_path.read_text(encoding="utf-8"))
+        id_map = json.loads(map_path.read_text(encoding="utf-8"))
+        ids = sorted(id_map, key=lambda k: id_map[k])
+        corpus.extend(zip(ids, texts))
+    return corpus
+
 
+def load_index_corpus() -> Tuple[List[Tuple[str, str]], Dict[str, str]]:
+    """Corpus to index with near-duplicate chunks dropped.
 
+    Returns (corpus, dup_of) where dup_of maps each dropped chunk id to the kept chunk it
+    duplicates. Deterministic, so the lexical and semantic builds drop the same chunks.
+    """
+    corpus = load_corpus()
+    if not settings.dedup_near_duplicates or not corpus:
+        return corpus, {}
+    dup_of = find_near_duplicates([cid for cid, _ in corpus], catalog.get_minhashes(), settings.near_dup_threshold)
+    return [(cid, text) for cid, text in corpus if cid not in dup_of], dup_of
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+from typing import Any, Dict, FrozenSet
+
+import numpy as np
+from scipy import sparse
+
+from .catalog import get_document
+from .chunkio import doc_id_of
+from .lexical import _DUPS_NAME, _MATRIX_NAME
+from .registry import load_registry, save_registry
+from .semantic import compact_embeddings
+from .store import read_json, write_json
+from . import snapshot, tombstones
+
+
+def orphans_near_duplicates(dead_docs: FrozenSet[str]) -> bool:
+    """True if a chunk was left out of the index as a near-duplicate of a deleted document's chunk.
+
+    Dropping rows cannot bring such a chunk back; it takes a rebuild.
+    """
+    base = snapshot.snapshot_path(snapshot.current_version())
+    dup_of: Dict[str, str] = read_json(base / _DUPS_NAME, default={})
+    return any(doc_id_of(kept) in dead_docs and doc_id_of(dup) not in dead_docs for dup, kept in dup_of.items())
+
+
+class _NothingToCompact(Exception):
+    pass
+
+
+def compact(dead_docs: FrozenSet[str]) -> Dict[str, Any]:
+    """Publish a snapshot without the rows of `dead_docs`: registry, TF-IDF rows and embeddings.
+
+    The vocabulary and idf weights are carried over unchanged (a full rebuild refreshes
+    them), so no text is re-read, re-vectorized or re-embedded. `dead_docs` may be stale by
+    the time the writer lock is held: a document re-ingested meanwhile (tombstone cleared,
+    or catalog row back) is live in the current snapshot and is kept. Returns the row counts
+    and the documents actually removed.
+    """
+    try:
+        with snapshot.writer() as snap:
+            # CURRENT cannot move while the writer lock is held
+            dead_docs = frozenset(d for d in dead_docs & tombstones.deleted() if get_document(d) is None)
+            if not dead_docs:
+                raise _NothingToCompact()
+            base = snapshot.snapshot_path(snapshot.current_version())
+            registry = load_registry(base)
+            dead = [i for i, doc_id in enumerate(registry.doc_ids) if doc_id in dead_docs]
+            keep = np.flatnonzero(~np.isin(registry.row_doc, dead))
+            save_registry(registry.ids(keep.tolist()), snap)
+            if (base / _MATRIX_NAME).exists():
+                sparse.save_npz(snap / _MATRIX_NAME, sparse.load_npz(base / _MATRIX_NAME)[keep])
+            dup_of: Dict[str, str] = read_json(base / _DUPS_NAME, default={})
+            write_json(snap / _DUPS_NAME, {d: k for d, k in dup_of.items() if doc_id_of(d) not in dead_docs})
+            compact_embeddings(base, snap, dead_docs)
+    except _NothingToCompact:
+        rows = len(load_registry(snapshot.snapshot_path(snapshot.current_version())))
+        return {"rows_before": rows, "rows_after": rows, "docs": []}
+    return {"rows_before": len(registry), "rows_after": int(keep.size), "docs": sorted(dead_docs)}
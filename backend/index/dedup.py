@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+from typing import Dict, List, Sequence, Tuple
+import re
+import zlib
+
+import numpy as np
+
+
+# MinHash over word shingles; LSH with BANDS x ROWS = NUM_PERM. With 16 bands of 4 rows,
+# pairs with Jaccard ~0.5 become candidates with probability ~0.65 and pairs >= 0.8 with
+# probability > 0.999; candidates are then confirmed on the estimated Jaccard.
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE = 5
+
+_PRIME = (1 << 31) - 1
+_rng = np.random.default_rng(20240917)
+_A = _rng.integers(1, _PRIME, size=NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, _PRIME, size=NUM_PERM, dtype=np.uint64)
+_RE_WORD = re.compile(r"\w+")
+
+
+def _shingle_hashes(text: str) -> np.ndarray:
+    words = _RE_WORD.findall(text.lower())
+    if not words:
+        return np.zeros(0, dtype=np.uint64)
+    n = min(SHINGLE, len(words))
+    grams = {" ".join(words[i : i + n]) for i in range(len(words) - n + 1)}
+    return np.fromiter((zlib.crc32(g.encode("utf-8")) % _PRIME for g in grams), dtype=np.uint64, count=len(grams))
+
+
+def minhash_signature(text: str) -> np.ndarray:
+    """NUM_PERM-wide MinHash signature (uint32) of the text's word shingles."""
+    hashes = _shingle_hashes(text)
+    if hashes.size == 0:
+        return np.full(NUM_PERM, _PRIME, dtype=np.uint32)
+    # a*x + b stays below 2**62 because a, b, x < 2**31
+    return ((np.outer(hashes, _A) + _B) % _PRIME).min(axis=0).astype(np.uint32)
+
+
+def estimated_jaccard(a: np.ndarray, b: np.ndarray) -> float:
+    return float(np.mean(a == b))
+
+
+class MinHashLSH:
+    """Banded LSH index over MinHash signatures."""
+
+    def __init__(self) -> None:
+        self._buckets: List[Dict[bytes, List[str]]] = [{} for _ in range(BANDS)]
+        self._sigs: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self._sigs)
+
+    def insert(self, key: str, sig: np.ndarray) -> None:
+        self._sigs[key] = sig
+        for band, bucket in enumerate(self._buckets):
+            bucket.setdefault(sig[band * ROWS : (band + 1) * ROWS].tobytes(), []).append(key)
+
+    def query(self, sig: np.ndarray, threshold: float) -> List[Tuple[str, float]]:
+        """Indexed keys whose estimated Jaccard with sig is >= threshold, best first."""
+        seen: set = set()
+        out: List[Tuple[str, float]] = []
+        for band, bucket in enumerate(self._buckets):
+            for key in bucket.get(sig[band * ROWS : (band + 1) * ROWS].tobytes(), ()):
+                if key in seen:
+                    continue
+                seen.add(key)
+                sim = estimated_jaccard(sig, self._sigs[key])
+                if sim >= threshold:
+                    out.append((key, sim))
+        out.sort(key=lambda x: x[1], reverse=True)
+        return out
+
+
+def find_near_duplicates(
+    ids: Sequence[str], signatures: Dict[str, np.ndarray], threshold: float = 0.85
+) -> Dict[str, str]:
+    """Map each near-duplicate chunk id to the canonical chunk it duplicates.
+
+    The first occurrence in `ids` order is canonical; ids without a signature are never
+    collapsed.
+    """
+    lsh = MinHashLSH()
+    dup_of: Dict[str, str] = {}
+    for cid in ids:
+        sig = signatures.get(cid)
+        if sig is None:
+            continue
+        hits = lsh.query(sig, threshold)
+        if hits:
+            dup_of[cid] = hits[0][0]
+        else:
+            lsh.insert(cid, sig)
+    return dup_of
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from .registry import ChunkRegistry
+from . import tombstones
+
+
+# Document-level routing: score one vector per document, keep the top M documents, then score
+# only their chunks. Doc vectors are derived from the loaded chunk matrices (once per snapshot,
+# cached on the matrix object), so they always match the registry, compaction and carry-over.
+_CACHE: Dict[Tuple[str, int], Tuple[Any, Any]] = {}
+
+
+def _cached(kind: str, source: Any, build) -> Any:
+    hit = _CACHE.get((kind, id(source)))
+    if hit is not None and hit[0] is source:
+        return hit[1]
+    value = build()
+    if len(_CACHE) >= 12:
+        _CACHE.clear()
+    _CACHE[(kind, id(source))] = (source, value)
+    return value
+
+
+@dataclass(frozen=True)
+class DocRows:
+    order: np.ndarray  # registry rows grouped by document (stable)
+    offsets: np.ndarray  # rows of doc i are order[offsets[i]:offsets[i + 1]]
+
+    def rows_of(self, docs: np.ndarray) -> np.ndarray:
+        parts = [self.order[self.offsets[d] : self.offsets[d + 1]] for d in docs.tolist()]
+        return np.sort(np.concatenate(parts)) if parts else np.empty(0, dtype=np.int64)
+
+
+def doc_rows(registry: ChunkRegistry) -> DocRows:
+    def build() -> DocRows:
+        counts = np.bincount(registry.row_doc, minlength=len(registry.doc_ids))
+        offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        return DocRows(order=np.argsort(registry.row_doc, kind="stable").astype(np.int64), offsets=offsets)
+
+    return _cached("rows", registry, build)
+
+
+def _membership(registry: ChunkRegistry) -> sparse.csr_matrix:
+    n = len(registry)
+    return sparse.csr_matrix(
+        (np.ones(n), (registry.row_doc, np.arange(n))), shape=(len(registry.doc_ids), n)
+    )
+
+
+def doc_tfidf(matrix: sparse.csr_matrix, registry: ChunkRegistry) -> sparse.csc_matrix:
+    """Per-document sum of chunk TF-IDF rows, l2-normalised (one row per registry doc).
+
+    Stored column-major so a query only touches the postings of its own terms.
+    """
+
+    def build() -> sparse.csc_matrix:
+        summed = sparse.csr_matrix(_membership(registry) @ matrix)
+        norms = np.sqrt(np.asarray(summed.multiply(summed).sum(axis=1)).ravel())
+        return sparse.csc_matrix(sparse.diags(1.0 / np.maximum(norms, 1e-12)) @ summed)
+
+    return _cached("tfidf", matrix, build)
+
+
+def tfidf_scores(doc_matrix: sparse.csc_matrix, query_vec: sparse.csr_matrix) -> np.ndarray:
+    """Cosine of each document vector with a (1 x vocab) l2-normalised query vector."""
+    return np.asarray(doc_matrix[:, query_vec.indices] @ query_vec.data).ravel()
+
+
+def doc_centroids(embeddings: np.ndarray, registry: ChunkRegistry) -> np.ndarray:
+    """Per-document mean of chunk embeddings, l2-normalised (one row per registry doc)."""
+
+    def build() -> np.ndarray:
+        unit = embeddings / (np.linalg.norm(embeddings, axis=1, keepdims=True) + 1e-12)
+        summed = np.asarray(_membership(registry) @ unit, dtype=np.float32)
+        return summed / (np.linalg.norm(summed, axis=1, keepdims=True) + 1e-12)
+
+    return _cached("centroids", embeddings, build)
+
+
+def route(doc_scores: np.ndarray, registry: ChunkRegistry, top_m: int) -> np.ndarray:
+    """Registry rows of the `top_m` best-scoring live documents."""
+    doc_scores = np.asarray(doc_scores, dtype=np.float64).copy()
+    doc_scores[tombstones.dead_docs(registry)] = -np.inf
+    top_m = min(top_m, doc_scores.size)
+    best = np.argpartition(-doc_scores, top_m - 1)[:top_m]
+    best = best[np.isfinite(doc_scores[best])]
+    return doc_rows(registry).rows_of(best)
@@ -1,46 +1,58 @@
 from __future__ import annotations
 
-from typing import Dict, List, Tuple
+from typing import Sequence
 
+import numpy as np
 
-def _to_score_map(results: List[Tuple[str, float]], min_norm: float = 1e-9) -> Dict[str, float]:
-    if not results:
-        return {}
-    scores = [s for _, s in results]
-    mx = max(scores) if scores else 1.0
-    if mx < min_norm:
-        mx = min_norm
-    return {cid: s / mx for cid, s in results}
+from .registry import Hits, top_hits
+
+
+def _normalized(hits: Hits, min_norm: float = 1e-9) -> np.ndarray:
+    if not len(hits):
+        return hits.scores
+    return hits.scores / max(float(hits.scores.max()), min_norm)
+
+
+def _merge(rows: np.ndarray, scores: np.ndarray, top_k: int) -> Hits:
+    if rows.size == 0:
+        return Hits.empty()
+    # Sum contributions per row; unique() sorts rows, so ties break on the lower row id
+    uniq, inverse = np.unique(rows, return_inverse=True)
+    return top_hits(uniq, np.bincount(inverse, weights=scores, minlength=uniq.size), top_k)
 
 
 def weighted_sum(
-    lexical: List[Tuple[str, float]],
-    semantic: List[Tuple[str, float]],
+    lexical: Hits,
+    semantic: Hits,
     w_lex: float = 0.6,
     w_sem: float = 0.4,
     top_k: int = 10,
-) -> List[Tuple[str, float]]:
-    ls = _to_score_map(lexical)
-    ss = _to_score_map(semantic)
-    keys = set(ls) | set(ss)
-    out = []
-    for k in keys:
-        out.append((k, w_lex * ls.get(k, 0.0) + w_sem * ss.get(k, 0.0)))
-    out.sort(key=lambda x: x[1], reverse=True)
-    return out[:top_k]
+) -> Hits:
+    rows = np.concatenate([lexical.rows, semantic.rows])
+    scores = np.concatenate([w_lex * _normalized(lexical), w_sem * _normalized(semantic)])
+    return _merge(rows, scores, top_k)
 
 
 def rrf(
-    lexical: List[Tuple[str, float]],
-    semantic: List[Tuple[str, float]],
+    lexical: Hits,
+    semantic: Hits,
     k: int = 60,
     top_k: int = 10,
-) -> List[Tuple[str, float]]:
-    ranks: Dict[str, float] = {}
-    for lst in [lexical, semantic]:
-        for rank, (cid, _score) in enumerate(lst, start=1):
-            ranks[cid] = ranks.get(cid, 0.0) + 1.0 / (k + rank)
-    out = sorted(ranks.items(), key=lambda x: x[1], reverse=True)
-    return out[:top_k]
-
-
+) -> Hits:
+    return rrf_many([lexical, semantic], k=k, top_k=top_k)
+
+
+def rrf_many(lists: Sequence[Hits], k: int = 60, top_k: int = 10, normalize: bool = False) -> Hits:
+    """Reciprocal rank fusion of any number of ranked lists.
+
+    With `normalize`, scores are divided by the best attainable score (rank 1 in every list),
+    so they fall in (0, 1] like weighted_sum's and the gate threshold keeps its meaning.
+    """
+    lists = [h for h in lists if len(h)]
+    if not lists:
+        return Hits.empty()
+    rows = np.concatenate([h.rows for h in lists])
+    scores = np.concatenate([1.0 / (k + np.arange(1, len(h) + 1)) for h in lists])
+    if normalize:
+        scores = scores * ((k + 1) / len(lists))
+    return _merge(rows, scores, top_k)
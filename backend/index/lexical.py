@@ -1,19 +1,28 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import List, Tuple, Dict
+from typing import List, Tuple, Dict, TYPE_CHECKING
+import os
 
 import numpy as np
 from scipy import sparse
-from sklearn.feature_extraction.text import TfidfVectorizer
-import joblib
 
-from .store import index_dir, write_json, read_json, chunks_dir
+from .store import write_json
+from .chunkio import load_index_corpus
+from .registry import Hits, get_registry, load_registry, save_registry, top_hits
+from . import doc_index, snapshot, tombstones
+from .vocab import Vocabulary, from_vectorizer, save_vocabulary, load_vocabulary
 
+if TYPE_CHECKING:  # sklearn is only imported when building the index
+    from sklearn.feature_extraction.text import TfidfVectorizer
 
-_VECTORIZER_PATH = index_dir() / "tfidf_vectorizer.pkl"
-_MATRIX_PATH = index_dir() / "tfidf_matrix.npz"
-_IDS_PATH = index_dir() / "tfidf_ids.json"
+
+# File names inside a snapshot directory (see backend.index.snapshot)
+_VOCAB_NAME = "tfidf_vocab"
+_MATRIX_NAME = "tfidf_matrix.npz"
+_DUPS_NAME = "near_duplicates.json"
+# Indexes saved before the vocabulary arrays pickled the whole TfidfVectorizer
+_LEGACY_VECTORIZER_NAME = "tfidf_vectorizer.pkl"
 
 
 def build_index(corpus: List[Tuple[str, str]]) -> Tuple[TfidfVectorizer, sparse.csr_matrix, List[str]]: # Note: I use a TF-IDF index for lexical similarity, which is a good compromise between speed and accuracy. It has good persistence and is easy to index, at the expense of some accuracy which will be corrected by semantic similarity.
@@ -22,6 +31,8 @@ def build_index(corpus: List[Tuple[str, str]]) -> Tuple[TfidfVectorizer, sparse.
     corpus: list of (chunk_id, text)
     returns: (vectorizer, matrix, ids)
     """
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
     ids = [cid for cid, _ in corpus]
     texts = [text for _, text in corpus]
     vectorizer = TfidfVectorizer(ngram_range=(1, 2), stop_words="english", norm="l2")
@@ -29,59 +40,121 @@ def build_index(corpus: List[Tuple[str, str]]) -> Tuple[TfidfVectorizer, sparse.
     return vectorizer, matrix, ids
 
 
-def save_index(vectorizer: TfidfVectorizer, matrix: sparse.csr_matrix, ids: List[str]) -> Dict[str, Path]:
-    out_dir = index_dir()
-    out_dir.mkdir(parents=True, exist_ok=True)
-    joblib.dump(vectorizer, _VECTORIZER_PATH)
-    sparse.save_npz(_MATRIX_PATH, matrix)
-    write_json(_IDS_PATH, ids)
-    return {"vectorizer": _VECTORIZER_PATH, "matrix": _MATRIX_PATH, "ids": _IDS_PATH}
+def save_index(
+    vectorizer: TfidfVectorizer, matrix: sparse.csr_matrix, ids: List[str], out_dir: Path | None = None
+) -> Dict[str, Path]:
+    """Persist the vocabulary as memory-mappable arrays (no pickle) plus the matrix.
 
+    Matrix rows define the snapshot's chunk registry, so `ids` is saved as the registry. Writes into `out_dir` (a snapshot being built), or publishes a new snapshot if omitted.
+    """
+    if out_dir is None:
+        with snapshot.writer() as snap:
+            return save_index(vectorizer, matrix, ids, snap)
+    vocab, column_order = from_vectorizer(vectorizer)
+    matrix = sparse.csr_matrix(matrix)[:, column_order]
+    paths = save_vocabulary(vocab, out_dir / _VOCAB_NAME)
+    sparse.save_npz(out_dir / _MATRIX_NAME, matrix)
+    return {**paths, "matrix": out_dir / _MATRIX_NAME, "ids": save_registry(ids, out_dir)}
+
+
+def _import_legacy_vectorizer(snap_dir: Path) -> None:
+    """One-time conversion of a pickled TfidfVectorizer into vocabulary arrays, in place."""
+    import joblib  # ships with scikit-learn; only needed to read the legacy pickle
+
+    with snapshot.write_lock():
+        try:
+            load_vocabulary(snap_dir / _VOCAB_NAME)
+            return  # another worker converted it meanwhile
+        except FileNotFoundError:
+            pass
+        vocab, column_order = from_vectorizer(joblib.load(snap_dir / _LEGACY_VECTORIZER_NAME))
+        if not np.array_equal(column_order, np.arange(len(column_order))):
+            matrix = sparse.csr_matrix(sparse.load_npz(snap_dir / _MATRIX_NAME))[:, column_order]
+            tmp = snap_dir / f".{_MATRIX_NAME}"
+            sparse.save_npz(tmp, matrix)
+            os.replace(tmp, snap_dir / _MATRIX_NAME)
+        save_vocabulary(vocab, snap_dir / _VOCAB_NAME)  # the analyzer file, written last, marks it done
+
+
+def load_index(snap_dir: Path | None = None) -> Tuple[Vocabulary, sparse.csr_matrix, List[str]]:
+    """Raises FileNotFoundError if nothing was built, RuntimeError if the vocabulary is missing."""
+    snap_dir = snap_dir or snapshot.snapshot_path(snapshot.current_version())
+    try:
+        vocab = load_vocabulary(snap_dir / _VOCAB_NAME)
+    except FileNotFoundError:
+        if not (snap_dir / _MATRIX_NAME).exists():
+            raise
+        if not (snap_dir / _LEGACY_VECTORIZER_NAME).exists():
+            # Not "nothing ingested": without a vocabulary every lexical query would come back empty
+            raise RuntimeError(f"TF-IDF matrix in {snap_dir} has no vocabulary; rebuild the index") from None
+        _import_legacy_vectorizer(snap_dir)
+        vocab = load_vocabulary(snap_dir / _VOCAB_NAME)
+    matrix: sparse.csr_matrix = sparse.load_npz(snap_dir / _MATRIX_NAME)
+    return vocab, matrix, load_registry(snap_dir).chunk_ids
+
+
+_CACHE: snapshot.SnapshotCache[Tuple[Vocabulary, sparse.csr_matrix, List[str]]] = snapshot.SnapshotCache(load_index)
+
+
+def get_index(version: str | None = None) -> Tuple[Vocabulary, sparse.csr_matrix, List[str]]:
+    """Return the resident index of a snapshot (default: the current one), loading it on first use.
+
+    Raises FileNotFoundError if no index has been built yet.
+    """
+    return _CACHE.get(version or snapshot.current_version())
 
-def load_index() -> Tuple[TfidfVectorizer, sparse.csr_matrix, List[str]]:
-    vectorizer: TfidfVectorizer = joblib.load(_VECTORIZER_PATH)
-    matrix: sparse.csr_matrix = sparse.load_npz(_MATRIX_PATH)
-    ids: List[str] = read_json(_IDS_PATH, default=[])
-    return vectorizer, matrix, ids
 
+def search(query: str, top_k: int = 5, version: str | None = None, doc_top_m: int = 0) -> Hits:
+    """Top-k registry rows by TF-IDF cosine.
 
-def search(query: str, top_k: int = 5) -> List[Tuple[str, float]]:
-    vectorizer, matrix, ids = load_index()
-    q = vectorizer.transform([query])  # already l2-normalized by vectorizer
+    With `doc_top_m` > 0 (and more documents than that), documents are ranked first by their
+    aggregated TF-IDF vector and only the chunks of the best `doc_top_m` are scored.
+    """
+    return search_many([query], top_k=top_k, version=version, doc_top_m=doc_top_m)[0]
+
+
+def search_many(queries: List[str], top_k: int = 5, version: str | None = None, doc_top_m: int = 0) -> List[Hits]:
+    """`search` for several queries with one vocabulary transform and one matrix product."""
+    vocab, matrix, _ = get_index(version)
+    q = vocab.transform(queries)  # already l2-normalized, same as the fitted vectorizer
+    if doc_top_m > 0:
+        registry = get_registry(version)
+        if len(registry.doc_ids) > doc_top_m:
+            doc_matrix = doc_index.doc_tfidf(matrix, registry)
+            out = []
+            for i in range(q.shape[0]):
+                rows = doc_index.route(doc_index.tfidf_scores(doc_matrix, q[i]), registry, doc_top_m)
+                out.append(top_hits(rows, (matrix[rows] @ q[i].T).toarray().ravel(), top_k))
+            return out
     # Note : cosine similarity = dot product since both are l2-normalized
-    sims = (matrix @ q.T).toarray().ravel()
-    if top_k <= 0:
-        top_k = 1
-    top_idx = np.argsort(-sims)[:top_k]
-    return [(ids[i], float(sims[i])) for i in top_idx]
+    sims = (matrix @ q.T).toarray()
+    rows = tombstones.search_rows(version, sims.shape[0])  # deleted documents drop out before compaction
+    return [top_hits(rows, sims[rows, i], top_k) for i in range(sims.shape[1])]
 
 
-def build_index_from_all_chunks() -> Dict[str, Path]:
-    """Scan chunks_dir for *.texts.json and *.map.json, rebuild and save TF-IDF index.
+def query_coverage(query: str, version: str | None = None) -> float:
+    """Fraction of the query's (stop-word filtered) terms that exist in the TF-IDF vocabulary."""
+    vocab, _, _ = get_index(version)
+    terms = {t for t in vocab.analyze(query) if " " not in t}
+    if not terms:
+        return 0.0
+    return sum(vocab.lookup(t) >= 0 for t in terms) / len(terms)
 
-    Returns paths dict from save_index(). If no chunks found, raises ValueError.
-    """
-    import json
-
-    cdir = chunks_dir()
-    texts_files = sorted(cdir.glob("*.texts.json"))
-    if not texts_files:
-        raise ValueError("No chunk texts found. Ingest documents first.")
 
-    corpus: List[Tuple[str, str]] = []
-    for texts_path in texts_files:
-        stem = texts_path.name.replace(".texts.json", "")
-        map_path = cdir / f"{stem}.map.json"
-        if not map_path.exists():
-            continue
-        texts = json.loads(texts_path.read_text(encoding="utf-8"))
-        id_map = json.loads(map_path.read_text(encoding="utf-8"))
-        ids = sorted(id_map, key=lambda k: id_map[k])
-        corpus.extend(zip(ids, texts))
+def build_index_from_all_chunks(out_dir: Path | None = None) -> Dict[str, Path]:
+    """Rebuild and save the TF-IDF index over all persisted chunks, minus near-duplicates.
 
+    Writes into `out_dir` (a snapshot being built), or publishes a new snapshot if omitted.
+    Returns paths dict from save_index() plus the near-duplicate map. If no chunks found, raises ValueError.
+    """
+    if out_dir is None:
+        with snapshot.writer() as snap:
+            return build_index_from_all_chunks(snap)
+    corpus, dup_of = load_index_corpus()
     if not corpus:
-        raise ValueError("No chunks to index.")
+        raise ValueError("No chunk texts found. Ingest documents first.")
 
     vectorizer, matrix, ids = build_index(corpus)
-    return save_index(vectorizer, matrix, ids)
-
+    paths = save_index(vectorizer, matrix, ids, out_dir)
+    write_json(out_dir / _DUPS_NAME, dup_of)
+    return {**paths, "near_duplicates": out_dir / _DUPS_NAME}
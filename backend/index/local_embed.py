@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+from collections import Counter
+from typing import List, Tuple
+import re
+import threading
+import zlib
+
+import numpy as np
+from scipy import sparse
+
+
+# In-process embedder: hashed character n-grams (plus whole words) projected to a dense
+# space with a fixed random Gaussian matrix. No model download, no network; deterministic
+# across processes because hashing uses crc32 rather than Python's salted hash().
+BUCKETS = 1 << 14
+NGRAMS = (3, 4, 5)
+_SEED = 1729
+_RE_WORD = re.compile(r"\w+")
+
+_PROJ_LOCK = threading.Lock()
+_PROJ: dict = {}
+
+
+def _projection(dim: int) -> np.ndarray:
+    proj = _PROJ.get(dim)
+    if proj is None:
+        with _PROJ_LOCK:
+            proj = _PROJ.get(dim)
+            if proj is None:
+                rng = np.random.default_rng(_SEED)
+                proj = (rng.standard_normal((BUCKETS, dim), dtype=np.float32) / np.sqrt(dim)).astype(np.float32)
+                _PROJ[dim] = proj
+    return proj
+
+
+def _features(text: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Bucket indices and signed, sublinear weights of the text's n-gram features."""
+    grams: Counter = Counter()
+    for word in _RE_WORD.findall(text.lower()):
+        grams["w:" + word] += 1
+        padded = f"<{word}>"
+        for n in NGRAMS:
+            for i in range(len(padded) - n + 1):
+                grams[padded[i : i + n]] += 1
+    if not grams:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+    hashes = np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.int64, count=len(grams))
+    counts = np.fromiter(grams.values(), dtype=np.float32, count=len(grams))
+    # Low bits pick the bucket, bit 31 the sign, so colliding features tend to cancel
+    signs = np.where(hashes & (1 << 31), -1.0, 1.0).astype(np.float32)
+    return hashes % BUCKETS, signs * np.log1p(counts)
+
+
+def embed_local(texts: List[str], dim: int = 256) -> np.ndarray:
+    """Embed texts on CPU; returns an L2-normalised float32 matrix of shape (len(texts), dim)."""
+    proj = _projection(dim)
+    if len(texts) == 1:
+        idx, w = _features(texts[0])
+        out = (w @ proj[idx])[None, :] if idx.size else np.zeros((1, dim), dtype=np.float32)
+    else:
+        rows, cols, vals = [], [], []
+        for r, text in enumerate(texts):
+            idx, w = _features(text)
+            rows.append(np.full(idx.size, r, dtype=np.int64))
+            cols.append(idx)
+            vals.append(w)
+        feats = sparse.csr_matrix(
+            (np.concatenate(vals) if vals else [], (np.concatenate(rows) if rows else [], np.concatenate(cols) if cols else [])),
+            shape=(len(texts), BUCKETS),
+            dtype=np.float32,
+        )
+        out = np.asarray(feats @ proj, dtype=np.float32)
+    norms = np.linalg.norm(out, axis=1, keepdims=True)
+    return out / np.maximum(norms, 1e-12)
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .store import read_json, write_json
+from .chunkio import doc_id_of
+from . import snapshot
+
+
+# Dense integer row ids shared by every index in a snapshot: row i of the TF-IDF matrix and
+# of the (aligned) embedding matrix is chunk_ids[i]. Stages pass rows and scores as arrays
+# and only resolve chunk-id strings for citations and response meta.
+_REGISTRY_NAME = "chunk_ids.json"
+_LEGACY_IDS_NAME = "tfidf_ids.json"
+
+
+@dataclass(frozen=True)
+class Hits:
+    rows: np.ndarray  # int64 registry rows, best first
+    scores: np.ndarray  # float64, aligned with rows
+
+    @classmethod
+    def empty(cls) -> "Hits":
+        return cls(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64))
+
+    @classmethod
+    def of(cls, rows: Iterable[int], scores: Iterable[float]) -> "Hits":
+        return cls(np.asarray(list(rows), dtype=np.int64), np.asarray(list(scores), dtype=np.float64))
+
+    def __len__(self) -> int:
+        return int(self.rows.size)
+
+    def head(self, k: int) -> "Hits":
+        return Hits(self.rows[:k], self.scores[:k])
+
+    def pairs(self) -> List[Tuple[int, float]]:
+        return list(zip(self.rows.tolist(), self.scores.tolist()))
+
+
+def top_hits(rows: np.ndarray, scores: np.ndarray, top_k: int) -> Hits:
+    """The top_k (row, score) pairs by descending score; ties go to the earlier position."""
+    top_k = max(1, top_k)
+    if scores.size > top_k:
+        part = np.argpartition(-scores, top_k - 1)[:top_k]
+        order = part[np.lexsort((part, -scores[part]))]
+    else:
+        order = np.argsort(-scores, kind="stable")
+    return Hits(np.asarray(rows, dtype=np.int64)[order], np.asarray(scores, dtype=np.float64)[order])
+
+
+@dataclass
+class ChunkRegistry:
+    chunk_ids: List[str]
+    doc_ids: List[str]
+    row_doc: np.ndarray  # int32 index into doc_ids, per row
+
+    @classmethod
+    def from_ids(cls, chunk_ids: List[str]) -> "ChunkRegistry":
+        doc_index: Dict[str, int] = {}
+        row_doc = np.fromiter(
+            (doc_index.setdefault(doc_id_of(cid), len(doc_index)) for cid in chunk_ids), dtype=np.int32, count=len(chunk_ids)
+        )
+        return cls(chunk_ids=chunk_ids, doc_ids=list(doc_index), row_doc=row_doc)
+
+    def __len__(self) -> int:
+        return len(self.chunk_ids)
+
+    def ids(self, rows: Iterable[int]) -> List[str]:
+        return [self.chunk_ids[r] for r in rows]
+
+    def docs(self, rows: np.ndarray) -> np.ndarray:
+        return self.row_doc[np.asarray(rows, dtype=np.int64)]
+
+    def rows_for(self, chunk_ids: Iterable[str]) -> np.ndarray:
+        index = {cid: i for i, cid in enumerate(self.chunk_ids)}
+        return np.asarray([index.get(cid, -1) for cid in chunk_ids], dtype=np.int64)
+
+
+def save_registry(chunk_ids: List[str], out_dir: Path) -> Path:
+    write_json(out_dir / _REGISTRY_NAME, chunk_ids)
+    return out_dir / _REGISTRY_NAME
+
+
+def load_registry(snap_dir: Optional[Path] = None) -> ChunkRegistry:
+    snap_dir = snap_dir or snapshot.snapshot_path(snapshot.current_version())
+    path = snap_dir / _REGISTRY_NAME
+    if not path.exists():
+        # Built before the registry existed: TF-IDF rows define the id space
+        path = snap_dir / _LEGACY_IDS_NAME
+    if not path.exists():
+        raise FileNotFoundError(path)
+    return ChunkRegistry.from_ids(read_json(path, default=[]))
+
+
+_CACHE: snapshot.SnapshotCache[ChunkRegistry] = snapshot.SnapshotCache(load_registry)
+
+
+def get_registry(version: Optional[str] = None) -> ChunkRegistry:
+    """Resident registry of a snapshot (default: the current one).
+
+    Raises FileNotFoundError if no index has been built yet.
+    """
+    return _CACHE.get(version or snapshot.current_version())
@@ -1,17 +1,23 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import List, Tuple, Dict
-import json
+from typing import Dict, Iterable, List, Tuple
+import hashlib
 
 import numpy as np
 
 from backend.config import settings
-from .store import index_dir, chunks_dir, write_json, read_json
+from .store import write_json, read_json
+from .chunkio import doc_id_of, load_index_corpus
+from .registry import Hits, get_registry, load_registry, top_hits
+from . import doc_index, snapshot, tombstones
 
 
-_EMB_MATRIX_PATH = index_dir() / "embeddings.npy"
-_EMB_IDS_PATH = index_dir() / "embedding_ids.json"
+# File names inside a snapshot directory (see backend.index.snapshot)
+_EMB_MATRIX_NAME = "embeddings.npy"
+_EMB_IDS_NAME = "embedding_ids.json"
+# {"model": provider/model key, "hashes": text hash per embedding row}; lets rebuilds reuse vectors
+_EMB_HASHES_NAME = "embedding_hashes.json"
 
 
 def _cosine_similarity(a: np.ndarray, b: np.ndarray) -> np.ndarray: # Note: I use cosine similarity for semantic similarity instead of dot product because it is more stable and easier to compute.
@@ -20,7 +26,7 @@ def _cosine_similarity(a: np.ndarray, b: np.ndarray) -> np.ndarray: # Note: I us
     return a_norm @ b_norm.T
 
 
-def _embed_voyage(texts: List[str], model: str, batch_size: int = 128) -> np.ndarray:
+def _embed_voyage(texts: List[str], model: str, batch_size: int = 128, timeout: float | None = None) -> np.ndarray:
     try:
         import voyageai  # type: ignore
     except Exception as exc:  # pragma: no cover
@@ -30,7 +36,10 @@ def _embed_voyage(texts: List[str], model: str, batch_size: int = 128) -> np.nda
         # Soft-fail to avoid 500s; return zeros so semantic contributes nothing
         return np.zeros((len(texts), 384), dtype=np.float32)
 
-    client = voyageai.Client(api_key=settings.voyage_api_key)
+    if settings.voyage_base_url:
+        # voyageai 0.3 reads the endpoint from a module global, not from the client
+        voyageai.api_base = settings.voyage_base_url
+    client = voyageai.Client(api_key=settings.voyage_api_key, timeout=timeout if timeout is not None else settings.embedding_timeout_s)
     embeddings: List[List[float]] = []
     for i in range(0, len(texts), batch_size):
         batch = texts[i : i + batch_size]
@@ -39,69 +48,193 @@ def _embed_voyage(texts: List[str], model: str, batch_size: int = 128) -> np.nda
     return np.asarray(embeddings, dtype=np.float32)
 
 
-def save_embeddings(matrix: np.ndarray, ids: List[str]) -> Dict[str, Path]:
-    out_dir = index_dir()
-    out_dir.mkdir(parents=True, exist_ok=True)
-    np.save(_EMB_MATRIX_PATH, matrix)
-    write_json(_EMB_IDS_PATH, ids)
-    return {"matrix": _EMB_MATRIX_PATH, "ids": _EMB_IDS_PATH}
+def embeddings_available() -> bool:
+    """True when the configured provider can produce real (non-zero) embeddings."""
+    if settings.embedding_provider == "local":
+        return True
+    return settings.embedding_provider == "voyage" and bool(settings.voyage_api_key)
 
 
-def load_embeddings() -> Tuple[np.ndarray, List[str]]:
-    matrix: np.ndarray = np.load(_EMB_MATRIX_PATH)
-    ids: List[str] = read_json(_EMB_IDS_PATH, default=[])
+def embed_texts(texts: List[str], model: str | None = None, timeout: float | None = None) -> np.ndarray:
+    """Embed texts with the configured provider ("local" runs in-process on CPU)."""
+    if settings.embedding_provider == "local":
+        from .local_embed import embed_local
+
+        return embed_local(texts, dim=settings.local_embedding_dim)
+    return _embed_voyage(texts, model=model or settings.embedding_model, timeout=timeout)
+
+
+def text_hash(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def _model_key(model: str | None = None) -> str:
+    if settings.embedding_provider == "local":
+        return f"local:{settings.local_embedding_dim}"
+    return f"{settings.embedding_provider}:{model or settings.embedding_model}"
+
+
+def save_embeddings(
+    matrix: np.ndarray,
+    ids: List[str],
+    out_dir: Path | None = None,
+    hashes: List[str] | None = None,
+    model_key: str | None = None,
+) -> Dict[str, Path]:
+    """Persist embeddings + ids into `out_dir` (a snapshot being built), or publish a new snapshot.
+
+    `hashes` (text hash per row) and `model_key` let later builds reuse these vectors.
+    """
+    if out_dir is None:
+        with snapshot.writer() as snap:
+            return save_embeddings(matrix, ids, snap, hashes, model_key)
+    np.save(out_dir / _EMB_MATRIX_NAME, matrix)
+    write_json(out_dir / _EMB_IDS_NAME, ids)
+    # Always rewritten so a stale file is never carried over next to new vectors
+    write_json(out_dir / _EMB_HASHES_NAME, {"model": model_key, "hashes": hashes or []})
+    return {"matrix": out_dir / _EMB_MATRIX_NAME, "ids": out_dir / _EMB_IDS_NAME, "hashes": out_dir / _EMB_HASHES_NAME}
+
+
+def _load_raw(snap_dir: Path) -> Tuple[np.ndarray, List[str], Dict[str, object]]:
+    """Embedding files as written (not aligned to the registry)."""
+    matrix = np.load(snap_dir / _EMB_MATRIX_NAME)
+    ids: List[str] = read_json(snap_dir / _EMB_IDS_NAME, default=[])
+    meta: Dict[str, object] = read_json(snap_dir / _EMB_HASHES_NAME, default={})
+    return matrix, ids, meta
+
+
+def _reusable_vectors(model_key: str) -> Dict[str, np.ndarray]:
+    """text hash -> vector from the published snapshot, if it was embedded with the same model."""
+    try:
+        matrix, ids, meta = _load_raw(snapshot.snapshot_path(snapshot.current_version()))
+    except FileNotFoundError:
+        return {}
+    hashes = meta.get("hashes") or []
+    if meta.get("model") != model_key or len(hashes) != len(ids) or len(ids) != matrix.shape[0]:
+        return {}
+    return {h: matrix[i] for i, h in enumerate(hashes) if matrix[i].any()}
+
+
+def compact_embeddings(base: Path, out_dir: Path, dead_docs: Iterable[str]) -> Dict[str, Path] | None:
+    """Copy base's embeddings into out_dir without the rows of `dead_docs`. None if there are none."""
+    try:
+        matrix, ids, meta = _load_raw(base)
+    except FileNotFoundError:
+        return None
+    dead = set(dead_docs)
+    keep = [i for i, cid in enumerate(ids) if doc_id_of(cid) not in dead]
+    hashes = meta.get("hashes") or []
+    kept_hashes = [hashes[i] for i in keep] if len(hashes) == len(ids) else None
+    return save_embeddings(matrix[keep], [ids[i] for i in keep], out_dir, kept_hashes, meta.get("model"))
+
+
+def load_embeddings(snap_dir: Path | None = None) -> Tuple[np.ndarray, List[str]]:
+    """Load embeddings with rows aligned to the snapshot's chunk registry.
+
+    Embeddings carried over from an older snapshot may list different chunks; those are
+    re-ordered to registry rows, and chunks without a vector get a zero row.
+    """
+    snap_dir = snap_dir or snapshot.snapshot_path(snapshot.current_version())
+    matrix: np.ndarray = np.load(snap_dir / _EMB_MATRIX_NAME)
+    ids: List[str] = read_json(snap_dir / _EMB_IDS_NAME, default=[])
+    registry = load_registry(snap_dir)
+    if ids != registry.chunk_ids:
+        src = {cid: i for i, cid in enumerate(ids)}
+        aligned = np.zeros((len(registry), matrix.shape[1]), dtype=matrix.dtype)
+        pos = np.asarray([src.get(cid, -1) for cid in registry.chunk_ids], dtype=np.int64)
+        aligned[pos >= 0] = matrix[pos[pos >= 0]]
+        matrix, ids = aligned, registry.chunk_ids
     return matrix, ids
 
 
-def build_embeddings_from_all_chunks(model: str | None = None) -> Dict[str, Path]: 
-    """Embed all chunk texts from chunks_dir and persist a single matrix + ids.
+_CACHE: snapshot.SnapshotCache[Tuple[np.ndarray, List[str]]] = snapshot.SnapshotCache(load_embeddings)
+
+
+def get_embeddings(version: str | None = None) -> Tuple[np.ndarray, List[str]]:
+    """Return the resident embeddings of a snapshot (default: the current one), loading them on first use.
+
+    Raises FileNotFoundError if embeddings have not been built yet.
+    """
+    return _CACHE.get(version or snapshot.current_version())
+
+
+def build_embeddings_from_all_chunks(model: str | None = None, out_dir: Path | None = None) -> Dict[str, Path]:
+    """Embed all chunk texts (minus near-duplicates) and persist a single matrix + ids.
 
+    Writes into `out_dir` (a snapshot being built), or publishes a new snapshot if omitted.
     Returns saved paths dict.
     """
-    cdir = chunks_dir()
-    texts_files = sorted(cdir.glob("*.texts.json"))
-    if not texts_files:
+    if out_dir is None:
+        with snapshot.writer() as snap:
+            return build_embeddings_from_all_chunks(model, snap)
+    corpus, _ = load_index_corpus()
+    if not corpus:
         raise ValueError("No chunk texts found. Ingest documents first.")
+    corpus_ids = [cid for cid, _ in corpus]
+    corpus_texts = [text for _, text in corpus]
 
-    corpus_texts: List[str] = []
-    corpus_ids: List[str] = []
-    for texts_path in texts_files:
-        stem = texts_path.name.replace(".texts.json", "")
-        map_path = cdir / f"{stem}.map.json"
-        if not map_path.exists():
-            continue
-        texts = json.loads(texts_path.read_text(encoding="utf-8"))
-        id_map = json.loads(map_path.read_text(encoding="utf-8"))
-        ids = sorted(id_map, key=lambda k: id_map[k])
-        corpus_texts.extend(texts)
-        corpus_ids.extend(ids)
-
-    if not corpus_texts:
-        raise ValueError("No chunk texts to embed.")
-
-    provider = settings.embedding_provider
-    model_name = model or settings.embedding_model
-    if provider != "voyage":
+    if settings.embedding_provider not in ("voyage", "local"):
         # No-op build; create empty embeddings matching corpus size
         matrix = np.zeros((len(corpus_texts), 384), dtype=np.float32)
-    else:
-        matrix = _embed_voyage(corpus_texts, model=model_name)
-    return save_embeddings(matrix, corpus_ids)
-
-
-def semantic_search(query: str, top_k: int = 5, model: str | None = None) -> List[Tuple[str, float]]: # top_k is set to 4 as a reasonable compromise and can be adjusted in .env if needed.
-    """Compute embedding for query using configured provider and return top_k (id, score)."""
-    provider = settings.embedding_provider
-    model_name = model or settings.embedding_model
-    matrix, ids = load_embeddings()
-    if provider != "voyage" or not settings.voyage_api_key:
+        return save_embeddings(matrix, corpus_ids, out_dir)
+    # Only chunks whose text is new (or changed) since the published build go to the provider
+    key = _model_key(model)
+    hashes = [text_hash(t) for t in corpus_texts]
+    reuse = _reusable_vectors(key)
+    missing = [i for i, h in enumerate(hashes) if h not in reuse]
+    fresh = embed_texts([corpus_texts[i] for i in missing], model=model) if missing else None
+    dim = fresh.shape[1] if fresh is not None else next(iter(reuse.values())).shape[0]
+    matrix = np.zeros((len(corpus_texts), dim), dtype=np.float32)
+    for i, h in enumerate(hashes):
+        if h in reuse:
+            matrix[i] = reuse[h]
+    if fresh is not None:
+        matrix[missing] = fresh
+    return save_embeddings(matrix, corpus_ids, out_dir, hashes, key)
+
+
+def semantic_search(
+    query: str,
+    top_k: int = 5,
+    model: str | None = None,
+    timeout: float | None = None,
+    version: str | None = None,
+    doc_top_m: int = 0,
+) -> Hits: # top_k is set to 4 as a reasonable compromise and can be adjusted in .env if needed.
+    """Compute embedding for query using configured provider and return the top_k registry rows.
+
+    With `doc_top_m` > 0, documents are ranked by centroid similarity first and only the chunks
+    of the best `doc_top_m` are scored.
+    """
+    return semantic_search_many([query], top_k, model, timeout, version, doc_top_m)[0]
+
+
+def semantic_search_many(
+    queries: List[str],
+    top_k: int = 5,
+    model: str | None = None,
+    timeout: float | None = None,
+    version: str | None = None,
+    doc_top_m: int = 0,
+) -> List[Hits]:
+    """`semantic_search` for several queries with a single (batched) embedding call."""
+    matrix, _ = get_embeddings(version)
+    if not embeddings_available():
         # Fallback to zeros so semantic path is neutral
-        sims = np.zeros((matrix.shape[0],), dtype=np.float32)
+        sims = np.zeros((matrix.shape[0], len(queries)), dtype=np.float32)
     else:
-        q_vec = _embed_voyage([query], model=model_name)
-        sims = _cosine_similarity(matrix, q_vec)[..., 0]
-    top_k = max(1, top_k)
-    top_idx = np.argsort(-sims)[:top_k]
-    return [(ids[i], float(sims[i])) for i in top_idx]
-
-
+        q_vecs = embed_texts(queries, model=model, timeout=timeout)
+        if q_vecs.shape[1] != matrix.shape[1]:
+            raise ValueError("Embeddings were built with a different provider; rebuild them.")
+        if doc_top_m > 0:
+            registry = get_registry(version)
+            if len(registry.doc_ids) > doc_top_m:
+                doc_sims = _cosine_similarity(doc_index.doc_centroids(matrix, registry), q_vecs)
+                out = []
+                for i in range(len(queries)):
+                    rows = doc_index.route(doc_sims[:, i], registry, doc_top_m)
+                    out.append(top_hits(rows, _cosine_similarity(matrix[rows], q_vecs[i : i + 1])[..., 0], top_k))
+                return out
+        sims = _cosine_similarity(matrix, q_vecs)
+    rows = tombstones.search_rows(version, sims.shape[0])
+    return [top_hits(rows, sims[rows, i], top_k) for i in range(sims.shape[1])]
@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Generic, Iterator, List, Optional, TypeVar
+import os
+import shutil
+import threading
+import time
+
+from backend.config import settings
+from .store import index_dir, _atomic_write
+
+
+# Index builds are written to snapshots/<version>/ and published by atomically replacing the
+# CURRENT pointer file. Files a build does not rewrite are hardlinked from the previous
+# snapshot, so every snapshot is complete. Readers resolve CURRENT once per query and read
+# only from that directory, which is never modified after publication.
+_CURRENT_PATH = index_dir() / "CURRENT"
+_SNAPSHOTS_DIR = index_dir() / "snapshots"
+
+_WRITE_LOCK = threading.Lock()
+
+# Versions in-flight readers of this process have pinned, with their counts; gc() skips them
+_PINS: Dict[str, int] = {}
+_PIN_LOCK = threading.Lock()
+
+T = TypeVar("T")
+
+
+def current_version() -> Optional[str]:
+    """Published snapshot version, or None before the first snapshot build."""
+    try:
+        version = _CURRENT_PATH.read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        return None
+    return version or None
+
+
+def snapshot_path(version: Optional[str]) -> Path:
+    # No snapshot yet: read the flat pre-snapshot layout directly under index_dir()
+    return _SNAPSHOTS_DIR / version if version else index_dir()
+
+
+def pin(version: Optional[str] = None) -> Optional[str]:
+    """Pin `version` (default: the current one) for a reader and return it.
+
+    A pinned version is not garbage-collected until every pin on it is released.
+    """
+    with _PIN_LOCK:
+        version = version or current_version()
+        if version is not None:
+            _PINS[version] = _PINS.get(version, 0) + 1
+        return version
+
+
+def release(version: Optional[str]) -> None:
+    with _PIN_LOCK:
+        if version in _PINS:
+            _PINS[version] -= 1
+            if not _PINS[version]:
+                del _PINS[version]
+
+
+def list_versions() -> List[str]:
+    if not _SNAPSHOTS_DIR.exists():
+        return []
+    return sorted(p.name for p in _SNAPSHOTS_DIR.iterdir() if p.is_dir())
+
+
+def _new_version() -> str:
+    ns = time.time_ns()
+    return time.strftime("%Y%m%dT%H%M%S", time.gmtime(ns // 10**9)) + f".{ns % 10**9:09d}"
+
+
+def _carry_over(base: Path, target: Path) -> None:
+    for src in base.iterdir() if base.exists() else []:
+        dst = target / src.name
+        if not src.is_file() or src.name == _CURRENT_PATH.name or dst.exists():
+            continue
+        try:
+            os.link(src, dst)
+        except OSError:
+            shutil.copy2(src, dst)
+
+
+def gc(keep: Optional[int] = None) -> List[str]:
+    """Remove all but the newest `keep` snapshots, never the current or a pinned one.
+
+    Pins are per process: a query or /search cursor read in another API worker is only
+    protected by `keep`, and a pin released later leaves its version for the next gc().
+    Returns the removed versions.
+    """
+    keep = max(1, settings.index_snapshots_keep if keep is None else keep)
+    removed: List[str] = []
+    # Held throughout, so a reader cannot pin a version between the check and its removal
+    with _PIN_LOCK:
+        current = current_version()
+        for version in list_versions()[:-keep]:
+            if version == current or version in _PINS:
+                continue
+            shutil.rmtree(_SNAPSHOTS_DIR / version, ignore_errors=True)
+            removed.append(version)
+    return removed
+
+
+@contextmanager
+def _process_lock() -> Iterator[None]:
+    # API workers share the index directory: without this, one worker's build is removed
+    # as an orphan by another worker starting its own
+    try:
+        import fcntl
+    except ImportError:  # pragma: no cover - not POSIX: builds are serialised per process only
+        yield
+        return
+    _SNAPSHOTS_DIR.mkdir(parents=True, exist_ok=True)
+    with open(_SNAPSHOTS_DIR / ".write.lock", "a") as fh:
+        fcntl.flock(fh, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+@contextmanager
+def write_lock() -> Iterator[None]:
+    """Exclusive against snapshot builds in every worker, for one-time in-place migrations."""
+    with _WRITE_LOCK, _process_lock():
+        yield
+
+
+@contextmanager
+def writer() -> Iterator[Path]:
+    """Build a new snapshot directory and publish it on successful exit.
+
+    Builds are serialised, across worker processes too; readers are never blocked. On
+    error the partial build is discarded and CURRENT is left untouched.
+    """
+    with write_lock():
+        _SNAPSHOTS_DIR.mkdir(parents=True, exist_ok=True)
+        base = current_version()
+        for orphan in list_versions():
+            # Newer than CURRENT means a build that died before publishing
+            if base is None or orphan > base:
+                shutil.rmtree(_SNAPSHOTS_DIR / orphan, ignore_errors=True)
+        version = _new_version()
+        target = _SNAPSHOTS_DIR / version
+        target.mkdir()
+        try:
+            yield target
+            _carry_over(snapshot_path(base), target)
+            _atomic_write(_CURRENT_PATH, version)
+        except BaseException:
+            shutil.rmtree(target, ignore_errors=True)
+            raise
+        gc()
+
+
+class SnapshotCache(Generic[T]):
+    """Resident artifacts keyed by snapshot version; the `size` most recent stay loaded.
+
+    Keeping more than one lets queries pinned to the previous snapshot finish without
+    evicting the new one.
+    """
+
+    def __init__(self, loader: Callable[[Path], T], size: int = 2) -> None:
+        self._loader = loader
+        self._size = size
+        self._lock = threading.Lock()
+        self._items: "OrderedDict[Optional[str], T]" = OrderedDict()
+
+    def get(self, version: Optional[str]) -> T:
+        item = self._items.get(version)
+        if item is not None:
+            return item
+        with self._lock:
+            item = self._items.get(version)
+            if item is None:
+                item = self._loader(snapshot_path(version))
+                self._items[version] = item
+                while len(self._items) > self._size:
+                    self._items.popitem(last=False)
+            return item
+
+    def versions(self) -> List[Optional[str]]:
+        """Resident snapshot versions, oldest first."""
+        return list(self._items)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
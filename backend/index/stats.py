@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import argparse
+import json
+import sys
+import tracemalloc
+
+import numpy as np
+from scipy import sparse
+
+from backend.config import settings
+from . import catalog, chunkio, lexical, registry, semantic, snapshot
+from .store import chunks_dir, index_dir, pages_dir
+
+
+_MIB = 1024 * 1024
+# Previous tracemalloc snapshot, so consecutive reports show growth (e.g. across an ingest)
+_LAST_TRACE: Optional[tracemalloc.Snapshot] = None
+
+
+def _mib(n: int | float) -> float:
+    return round(n / _MIB, 3)
+
+
+def _array_bytes(arr: np.ndarray) -> Dict[str, Any]:
+    # Memory-mapped arrays are backed by the page cache, not the heap
+    return {"bytes": int(arr.nbytes), "mmap": isinstance(arr, np.memmap) or isinstance(arr.base, np.memmap)}
+
+
+def _csr_bytes(m: sparse.csr_matrix) -> int:
+    return int(m.data.nbytes + m.indices.nbytes + m.indptr.nbytes)
+
+
+def _dir_bytes(path: Path) -> Dict[str, Any]:
+    files = [p for p in path.rglob("*") if p.is_file()] if path.exists() else []
+    return {"files": len(files), "mib": _mib(sum(p.stat().st_size for p in files))}
+
+
+def process_memory() -> Dict[str, Any]:
+    """Resident set size (current and peak) of this process, in MiB."""
+    out: Dict[str, Any] = {}
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in ("VmRSS", "VmHWM"):
+                    out["rss_mib" if key == "VmRSS" else "peak_rss_mib"] = _mib(int(value.split()[0]) * 1024)
+    except OSError:
+        import resource  # not on Linux: only the peak is available (KiB on Linux, bytes on macOS)
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        out["peak_rss_mib"] = _mib(peak if sys.platform == "darwin" else peak * 1024)
+    return out
+
+
+def lexical_stats(version: str | None) -> Dict[str, Any]:
+    try:
+        vocab, matrix, _ = lexical.get_index(version)
+    except FileNotFoundError:
+        return {"loaded": False}
+    vocab_parts = {name: _array_bytes(getattr(vocab, name)) for name in ("blob", "offsets", "idf")}
+    rows, cols = matrix.shape
+    return {
+        "loaded": True,
+        "vocab_terms": len(vocab),
+        "vocab_mib": _mib(sum(p["bytes"] for p in vocab_parts.values())),
+        "vocab_mmap": all(p["mmap"] for p in vocab_parts.values()),
+        "matrix_shape": [rows, cols],
+        "matrix_nnz": int(matrix.nnz),
+        "matrix_density": round(matrix.nnz / max(1, rows * cols), 6),
+        "matrix_mib": _mib(_csr_bytes(matrix)),
+        "matrix_dtype": str(matrix.dtype),
+    }
+
+
+def semantic_stats(version: str | None) -> Dict[str, Any]:
+    try:
+        emb, _ = semantic.get_embeddings(version)
+    except FileNotFoundError:
+        return {"loaded": False}
+    return {
+        "loaded": True,
+        "shape": list(emb.shape),
+        "dtype": str(emb.dtype),
+        "mib": _mib(emb.nbytes),
+        "mmap": _array_bytes(emb)["mmap"],
+        # Rows of chunks that have no vector (carried-over embeddings missing new chunks)
+        "zero_rows": int(np.count_nonzero(~emb.any(axis=1))) if emb.size else 0,
+    }
+
+
+def chunk_store_stats() -> Dict[str, Any]:
+    cache = dict(chunkio._TEXT_CACHE)
+    chars = sum(len(t) for _, texts in cache.values() for t in texts.values())
+    return {
+        "resident_docs": len(cache),
+        "resident_chunks": sum(len(texts) for _, texts in cache.values()),
+        "resident_text_chars": chars,
+        "disk": _dir_bytes(chunks_dir()),
+    }
+
+
+def cache_stats() -> Dict[str, Any]:
+    return {
+        "current_snapshot": snapshot.current_version(),
+        "registry": registry._CACHE.versions(),
+        "lexical": lexical._CACHE.versions(),
+        "semantic": semantic._CACHE.versions(),
+        "chunk_text_docs": len(chunkio._TEXT_CACHE),
+        "page_cache_disk": _dir_bytes(pages_dir()),
+        "index_disk": _dir_bytes(index_dir()),
+    }
+
+
+def per_document(version: str | None) -> List[Dict[str, Any]]:
+    """Chunks, TF-IDF nonzeros, embedding bytes and resident text per document."""
+    try:
+        reg = registry.get_registry(version)
+    except FileNotFoundError:
+        return []
+    n_docs = len(reg.doc_ids)
+    chunks = np.bincount(reg.row_doc, minlength=n_docs)
+    try:
+        _, matrix, _ = lexical.get_index(version)
+        nnz = np.bincount(reg.row_doc, weights=np.diff(matrix.indptr), minlength=n_docs)
+    except FileNotFoundError:
+        nnz = np.zeros(n_docs)
+    try:
+        emb, _ = semantic.get_embeddings(version)
+        row_bytes = emb.shape[1] * emb.itemsize
+    except FileNotFoundError:
+        row_bytes = 0
+    docs = catalog.all_documents()
+    out = []
+    for i, doc_id in enumerate(reg.doc_ids):
+        texts = chunkio._TEXT_CACHE.get(doc_id, (0, {}))[1]
+        out.append(
+            {
+                "doc_id": doc_id,
+                "pages": (docs.get(doc_id) or {}).get("pages"),
+                "chunks": int(chunks[i]),
+                "tfidf_nnz": int(nnz[i]),
+                "embedding_bytes": int(chunks[i]) * row_bytes,
+                "resident_text_chars": sum(len(t) for t in texts.values()),
+            }
+        )
+    return sorted(out, key=lambda d: d["tfidf_nnz"], reverse=True)
+
+
+def tracemalloc_report(limit: int = 15) -> Dict[str, Any]:
+    """Traced heap grouped by module (package/module path), with growth since the last report.
+
+    Only allocations made after `tracemalloc.start()` are seen; start it early (TRACEMALLOC_FRAMES).
+    """
+    global _LAST_TRACE
+    if not tracemalloc.is_tracing():
+        return {"tracing": False}
+    snap = tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+    by_module: Dict[str, int] = {}
+    for stat in snap.statistics("filename"):
+        module = _module_of(stat.traceback[0].filename)
+        by_module[module] = by_module.get(module, 0) + stat.size
+    grown: Dict[str, int] = {}
+    if _LAST_TRACE is not None:
+        for stat in snap.compare_to(_LAST_TRACE, "filename"):
+            module = _module_of(stat.traceback[0].filename)
+            grown[module] = grown.get(module, 0) + stat.size_diff
+    _LAST_TRACE = snap
+    current, peak = tracemalloc.get_traced_memory()
+    top = sorted(by_module.items(), key=lambda kv: kv[1], reverse=True)[:limit]
+    return {
+        "tracing": True,
+        "traced_mib": _mib(current),
+        "traced_peak_mib": _mib(peak),
+        "by_module_mib": {m: _mib(b) for m, b in top},
+        "growth_since_last_mib": {m: _mib(b) for m, b in sorted(grown.items(), key=lambda kv: -abs(kv[1]))[:limit] if b},
+    }
+
+
+def _module_of(filename: str) -> str:
+    # site-packages/<pkg>/... -> pkg; backend/<sub>/<mod>.py -> backend.sub.mod; stdlib -> module name
+    parts = Path(filename).parts
+    if "site-packages" in parts:
+        i = parts.index("site-packages")
+        return parts[i + 1] if i + 1 < len(parts) else filename
+    if "backend" in parts:
+        i = len(parts) - 1 - parts[::-1].index("backend")
+        return ".".join(parts[i:]).removesuffix(".py")
+    return Path(filename).stem
+
+
+def index_stats(version: str | None = None, per_doc: bool = False, trace: bool = False) -> Dict[str, Any]:
+    """Footprint of the loaded indexes of a snapshot (default: current), the chunk store and the process."""
+    version = version or snapshot.current_version()
+    report: Dict[str, Any] = {
+        "snapshot": version,
+        "lexical": lexical_stats(version),
+        "semantic": semantic_stats(version),
+        "chunk_store": chunk_store_stats(),
+        "caches": cache_stats(),
+        "process": process_memory(),
+    }
+    try:
+        reg = registry.get_registry(version)
+        report["registry"] = {"chunks": len(reg), "docs": len(reg.doc_ids)}
+    except FileNotFoundError:
+        report["registry"] = {"chunks": 0, "docs": 0}
+    if per_doc:
+        report["documents"] = per_document(version)
+    if trace:
+        report["tracemalloc"] = tracemalloc_report()
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Report index, chunk store and memory footprint.")
+    parser.add_argument("--version", default=None, help="snapshot version (default: current)")
+    parser.add_argument("--per-doc", action="store_true", help="include per-document breakdown")
+    parser.add_argument("--tracemalloc", action="store_true", help="trace allocations while loading and attribute them to modules")
+    args = parser.parse_args()
+    if args.tracemalloc:
+        tracemalloc.start(max(1, settings.tracemalloc_frames))
+    chunkio.preload_chunk_store()
+    print(json.dumps(index_stats(args.version, per_doc=args.per_doc, trace=args.tracemalloc), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -32,8 +32,16 @@ def manifests_dir() -> Path:
     return data_dir() / "manifests"
 
 
+def pages_dir() -> Path:
+    return data_dir() / "pages"
+
+
+def profiles_dir() -> Path:
+    return data_dir() / "profiles"
+
+
 def ensure_data_dirs() -> None:
-    for path in [data_dir(), docs_dir(), chunks_dir(), index_dir(), manifests_dir()]:
+    for path in [data_dir(), docs_dir(), chunks_dir(), index_dir(), manifests_dir(), pages_dir()]:
         path.mkdir(parents=True, exist_ok=True)
 
 
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+from typing import Dict, FrozenSet, Iterable, Optional, Tuple
+import threading
+
+import numpy as np
+
+from .registry import ChunkRegistry, get_registry
+from .store import index_dir, read_json, write_json
+
+
+# Deleted documents whose rows may still be present in published snapshots. Searches mask
+# those rows immediately; compaction (or a rebuild) removes them physically and clears the
+# entry. The file is shared by all processes and reloaded when it changes.
+_PATH = index_dir() / "tombstones.json"
+
+_LOCK = threading.Lock()
+_state: Dict[str, object] = {"stamp": None, "docs": frozenset()}
+# Live-row masks per registry object, valid while the tombstone set is unchanged
+_MASKS: Dict[int, Tuple[ChunkRegistry, FrozenSet[str], Optional[np.ndarray]]] = {}
+
+
+def _stamp() -> Optional[int]:
+    try:
+        return _PATH.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def deleted() -> FrozenSet[str]:
+    """Currently tombstoned doc ids."""
+    stamp = _stamp()
+    if stamp != _state["stamp"]:
+        with _LOCK:
+            _state["docs"] = frozenset(read_json(_PATH, default=[]))
+            _state["stamp"] = stamp
+    return _state["docs"]  # type: ignore[return-value]
+
+
+def _write(docs: FrozenSet[str]) -> None:
+    write_json(_PATH, sorted(docs))
+    _state["docs"] = docs
+    _state["stamp"] = _stamp()
+
+
+def add(doc_ids: Iterable[str]) -> None:
+    with _LOCK:
+        _write(frozenset(read_json(_PATH, default=[])) | set(doc_ids))
+
+
+def discard(doc_ids: Iterable[str]) -> None:
+    remove = set(doc_ids)
+    with _LOCK:
+        current = frozenset(read_json(_PATH, default=[]))
+        if current & remove:
+            _write(current - remove)
+
+
+def dead_docs(registry: ChunkRegistry) -> np.ndarray:
+    """Indexes into `registry.doc_ids` of tombstoned documents."""
+    docs = deleted()
+    if not docs:
+        return np.empty(0, dtype=np.int64)
+    return np.asarray([i for i, doc_id in enumerate(registry.doc_ids) if doc_id in docs], dtype=np.int64)
+
+
+def live_rows(registry: ChunkRegistry) -> Optional[np.ndarray]:
+    """Registry rows not belonging to a tombstoned document, or None when every row is live."""
+    docs = deleted()
+    if not docs:
+        return None
+    hit = _MASKS.get(id(registry))
+    if hit is not None and hit[0] is registry and hit[1] is docs:
+        return hit[2]
+    dead = dead_docs(registry)
+    rows = np.flatnonzero(~np.isin(registry.row_doc, dead)) if dead.size else None
+    if len(_MASKS) >= 8:
+        _MASKS.clear()
+    _MASKS[id(registry)] = (registry, docs, rows)
+    return rows
+
+
+def search_rows(version: Optional[str], n_rows: int) -> np.ndarray:
+    """Rows a search over a snapshot may return: all `n_rows`, minus tombstoned documents."""
+    if not deleted():
+        return np.arange(n_rows)
+    live = live_rows(get_registry(version))
+    return np.arange(n_rows) if live is None else live
@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+from bisect import bisect_left
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, FrozenSet, List, Sequence, Tuple, TYPE_CHECKING
+import re
+
+import numpy as np
+from scipy import sparse
+
+from .store import write_json, read_json
+
+if TYPE_CHECKING:
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+
+# On-disk layout (all arrays loadable with mmap_mode="r"):
+#   <prefix>_terms.npy    uint8   UTF-8 bytes of every term, concatenated in sorted order
+#   <prefix>_offsets.npy  int64   n_terms + 1 offsets into the blob; term i = blob[off[i]:off[i+1]]
+#   <prefix>_idf.npy      float64 idf weight of term i (= matrix column i)
+#   <prefix>_analyzer.json         tokenization parameters needed to reproduce the vectorizer
+_TERMS_SUFFIX = "_terms.npy"
+_OFFSETS_SUFFIX = "_offsets.npy"
+_IDF_SUFFIX = "_idf.npy"
+_ANALYZER_SUFFIX = "_analyzer.json"
+
+
+class _SortedTerms(Sequence[bytes]):
+    """Read-only view over the term blob so `bisect` can search it without decoding everything."""
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray) -> None:
+        self._blob = blob
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):  # type: ignore[override]
+        return self._blob[self._offsets[i] : self._offsets[i + 1]].tobytes()
+
+
+@dataclass
+class Vocabulary:
+    """Query-time replacement for a fitted TfidfVectorizer.
+
+    Reproduces the word analyzer (lowercase, token_pattern, stop-word removal, word n-grams),
+    raw term counts, idf weighting and l2 normalisation, so `transform` matches sklearn's.
+    """
+
+    blob: np.ndarray
+    offsets: np.ndarray
+    idf: np.ndarray
+    ngram_range: Tuple[int, int]
+    token_pattern: str
+    lowercase: bool
+    stop_words: FrozenSet[str]
+    norm: str | None
+
+    def __post_init__(self) -> None:
+        self._terms = _SortedTerms(self.blob, self.offsets)
+        self._token_re = re.compile(self.token_pattern)
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    def analyze(self, text: str) -> List[str]:
+        if self.lowercase:
+            text = text.lower()
+        tokens = self._token_re.findall(text)
+        if self.stop_words:
+            tokens = [t for t in tokens if t not in self.stop_words]
+        min_n, max_n = self.ngram_range
+        out = list(tokens) if min_n == 1 else []
+        for n in range(max(2, min_n), min(max_n, len(tokens)) + 1):
+            for i in range(len(tokens) - n + 1):
+                out.append(" ".join(tokens[i : i + n]))
+        return out
+
+    def lookup(self, term: str) -> int:
+        """Column index of term, or -1 if it is not in the vocabulary."""
+        key = term.encode("utf-8")
+        i = bisect_left(self._terms, key)
+        if i < len(self._terms) and self._terms[i] == key:
+            return i
+        return -1
+
+    def transform(self, texts: List[str]) -> sparse.csr_matrix:
+        indptr = [0]
+        indices: List[int] = []
+        data: List[float] = []
+        for text in texts:
+            counts: Dict[int, int] = {}
+            for term in self.analyze(text):
+                col = self.lookup(term)
+                if col >= 0:
+                    counts[col] = counts.get(col, 0) + 1
+            cols = sorted(counts)
+            row = np.asarray([counts[c] for c in cols], dtype=np.float64) * self.idf[cols]
+            if self.norm == "l2" and row.size:
+                row /= np.sqrt(np.dot(row, row))
+            elif self.norm == "l1" and row.size:
+                row /= np.abs(row).sum()
+            indices.extend(cols)
+            data.extend(row.tolist())
+            indptr.append(len(indices))
+        return sparse.csr_matrix(
+            (np.asarray(data, dtype=np.float64), np.asarray(indices, dtype=np.int32), np.asarray(indptr, dtype=np.int32)),
+            shape=(len(texts), len(self)),
+        )
+
+
+def from_vectorizer(vectorizer: TfidfVectorizer) -> Tuple[Vocabulary, np.ndarray]:
+    """Convert a fitted TfidfVectorizer into a Vocabulary.
+
+    Returns (vocabulary, column_order): matrix columns must be reordered with `column_order`
+    (a no-op permutation for sklearn's default sorted vocabulary).
+    """
+    if vectorizer.analyzer != "word" or vectorizer.preprocessor is not None or vectorizer.tokenizer is not None:
+        raise ValueError("Only the default word analyzer can be exported")
+    if vectorizer.strip_accents is not None or vectorizer.sublinear_tf or not vectorizer.use_idf:
+        raise ValueError("Unsupported TfidfVectorizer options for export")
+
+    by_col = sorted(vectorizer.vocabulary_.items(), key=lambda kv: kv[1])
+    encoded = [term.encode("utf-8") for term, _ in by_col]
+    order = np.asarray(sorted(range(len(encoded)), key=encoded.__getitem__), dtype=np.int64)
+    encoded = [encoded[i] for i in order]
+
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(t) for t in encoded], out=offsets[1:])
+    blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    vocab = Vocabulary(
+        blob=blob,
+        offsets=offsets,
+        idf=np.asarray(vectorizer.idf_, dtype=np.float64)[order],
+        ngram_range=tuple(vectorizer.ngram_range),
+        token_pattern=vectorizer.token_pattern,
+        lowercase=bool(vectorizer.lowercase),
+        stop_words=frozenset(vectorizer.get_stop_words() or ()),
+        norm=vectorizer.norm,
+    )
+    return vocab, order
+
+
+def save_vocabulary(vocab: Vocabulary, prefix: Path) -> Dict[str, Path]:
+    paths = {
+        "terms": prefix.with_name(prefix.name + _TERMS_SUFFIX),
+        "offsets": prefix.with_name(prefix.name + _OFFSETS_SUFFIX),
+        "idf": prefix.with_name(prefix.name + _IDF_SUFFIX),
+        "analyzer": prefix.with_name(prefix.name + _ANALYZER_SUFFIX),
+    }
+    np.save(paths["terms"], vocab.blob)
+    np.save(paths["offsets"], vocab.offsets)
+    np.save(paths["idf"], vocab.idf)
+    write_json(
+        paths["analyzer"],
+        {
+            "ngram_range": list(vocab.ngram_range),
+            "token_pattern": vocab.token_pattern,
+            "lowercase": vocab.lowercase,
+            "stop_words": sorted(vocab.stop_words),
+            "norm": vocab.norm,
+        },
+    )
+    return paths
+
+
+def load_vocabulary(prefix: Path, mmap: bool = True) -> Vocabulary:
+    analyzer_path = prefix.with_name(prefix.name + _ANALYZER_SUFFIX)
+    params = read_json(analyzer_path, default=None)
+    if params is None:
+        raise FileNotFoundError(analyzer_path)
+    mode = "r" if mmap else None
+    return Vocabulary(
+        blob=np.load(prefix.with_name(prefix.name + _TERMS_SUFFIX), mmap_mode=mode),
+        offsets=np.load(prefix.with_name(prefix.name + _OFFSETS_SUFFIX), mmap_mode=mode),
+        idf=np.load(prefix.with_name(prefix.name + _IDF_SUFFIX), mmap_mode=mode),
+        ngram_range=tuple(params["ngram_range"]),
+        token_pattern=params["token_pattern"],
+        lowercase=bool(params["lowercase"]),
+        stop_words=frozenset(params["stop_words"]),
+        norm=params["norm"],
+    )
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+from typing import Any, Dict
+import logging
+import threading
+
+from backend.config import settings
+from . import catalog, chunkio, doc_index, lexical, registry, semantic, snapshot
+
+
+logger = logging.getLogger(__name__)
+
+_READY = threading.Event()
+_STATUS: Dict[str, Any] = {}
+
+
+def warm_up() -> Dict[str, Any]:
+    """Make the query indexes and chunk store resident in memory.
+
+    Missing artifacts (nothing ingested yet) are reported but do not block readiness;
+    any other load error leaves the process not ready.
+    """
+    status: Dict[str, Any] = {}
+    try:
+        status["snapshot"] = snapshot.current_version()
+        try:
+            _, matrix, _ = lexical.get_index()
+            reg = registry.get_registry()
+            status["lexical"] = {"loaded": True, "chunks": int(matrix.shape[0])}
+            if settings.doc_route_top_m > 0:
+                # Document-level routing vectors, derived once per snapshot
+                doc_index.doc_tfidf(matrix, reg)
+                doc_index.doc_rows(reg)
+        except FileNotFoundError:
+            status["lexical"] = {"loaded": False}
+        if settings.use_semantic:
+            try:
+                emb, _ = semantic.get_embeddings()
+                status["semantic"] = {"loaded": True, "chunks": int(emb.shape[0])}
+                if settings.doc_route_top_m > 0:
+                    doc_index.doc_centroids(emb, registry.get_registry())
+            except FileNotFoundError:
+                status["semantic"] = {"loaded": False}
+        status["catalog"] = {"docs": len(catalog.all_documents())}
+        status["chunk_store"] = {"docs": chunkio.preload_chunk_store()}
+    except Exception as exc:
+        logger.exception("index warm-up failed")
+        _STATUS.clear()
+        _STATUS.update({"error": str(exc)})
+        return dict(_STATUS)
+    _STATUS.clear()
+    _STATUS.update(status)
+    _READY.set()
+    return dict(_STATUS)
+
+
+def start_background_warm_up() -> threading.Thread:
+    thread = threading.Thread(target=warm_up, name="index-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def is_ready() -> bool:
+    return _READY.is_set()
+
+
+def readiness() -> Dict[str, Any]:
+    return {"ready": is_ready(), **_STATUS}
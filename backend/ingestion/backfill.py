@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterator, List
+import argparse
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+
+from backend.config import settings
+from backend.index.store import data_dir, docs_dir, ensure_data_dirs
+from backend.ingestion.chunk import build_chunks, persist_chunks
+from backend.ingestion.manifest import compute_md5, get_document, upsert_document
+from backend.ingestion.page_cache import extract_pages_cached
+from backend.ingestion.service import rebuild_indexes
+from backend.utils.logging import configure_logging
+
+
+logger = logging.getLogger(__name__)
+
+# Present while catalogued documents may be missing from the published indexes: set
+# before a document is (re)ingested, removed only after a rebuild succeeds.
+# A run that crashes (or fails) in between, or one run with --no-index, leaves it behind,
+# so the next run rebuilds even when it has nothing new to ingest.
+_INDEXES_PENDING = data_dir() / "backfill.indexes_pending"
+
+
+@dataclass
+class BackfillStats:
+    total_docs: int
+    total_bytes: int
+    done_docs: int = 0
+    skipped_docs: int = 0
+    failed: List[str] = field(default_factory=list)
+    pages: int = 0
+    chunks: int = 0
+    done_bytes: int = 0
+    started: float = field(default_factory=time.perf_counter)
+
+    def progress(self) -> dict:
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        byte_rate = self.done_bytes / elapsed
+        remaining = self.total_bytes - self.done_bytes
+        return {
+            "processed": self.done_docs,
+            "skipped": self.skipped_docs,
+            "failed": len(self.failed),
+            "remaining": self.total_docs - self.done_docs - self.skipped_docs - len(self.failed),
+            "pages": self.pages,
+            "pages_per_s": round(self.pages / elapsed, 2),
+            "elapsed_s": round(elapsed, 1),
+            # Bytes track work better than doc counts when PDF sizes vary widely
+            "eta_s": round(remaining / byte_rate, 1) if byte_rate > 0 else None,
+        }
+
+
+def iter_pdfs(root: Path) -> Iterator[Path]:
+    # Deterministic order so a resumed run revisits files the same way
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name.lower().endswith(".pdf"):
+                yield Path(dirpath) / name
+
+
+def doc_id_for(src: Path, root: Path) -> str:
+    """File stem for PDFs directly under root; stem plus a hash of the relative path below it.
+
+    Same-named files in different subdirectories get distinct ids, and the id is stable
+    across runs so resuming still finds each checkpoint.
+    """
+    rel = src.relative_to(root)
+    if rel.parent == Path("."):
+        return src.stem
+    return f"{src.stem}-{hashlib.blake2b(rel.as_posix().encode(), digest_size=4).hexdigest()}"
+
+
+def _place(src: Path, dst: Path) -> None:
+    if dst.exists() and src.resolve() == dst.resolve():
+        return
+    tmp = dst.with_name(f".{dst.name}.part")
+    tmp.unlink(missing_ok=True)
+    try:
+        os.link(src, tmp)  # archives can be huge: share the inode when on the same filesystem
+    except OSError:
+        shutil.copy2(src, tmp)
+    os.replace(tmp, dst)
+
+
+def ingest_one(src: Path, root: Path) -> tuple[str, int, int] | None:
+    """Ingest one PDF without rebuilding indexes. Returns (doc_id, pages, chunks), or None when already done.
+
+    The catalog document row is written last and serves as the checkpoint: a document whose
+    row exists with the same MD5 was fully chunked and persisted.
+    """
+    doc_id = doc_id_for(src, root)
+    md5 = compute_md5(src)
+    existing = get_document(doc_id)
+    if existing is not None and existing.md5 == md5:
+        return None
+    _INDEXES_PENDING.touch()
+    dst = docs_dir() / f"{doc_id}{src.suffix}"  # uploads rely on doc_id == stem of the stored file
+    _place(src, dst)
+    pages = extract_pages_cached(dst, md5)
+    chunks = build_chunks(
+        doc_id=doc_id, pages=pages, target_tokens=settings.chunk_target_tokens, overlap_ratio=settings.chunk_overlap_ratio
+    )
+    persist_chunks(doc_id, chunks)
+    upsert_document(doc_id=doc_id, filename=dst.name, md5=md5, pages=len(pages))
+    return doc_id, len(pages), len(chunks)
+
+
+def backfill(root: Path, build_indexes: bool = True, report_every_s: float = 10.0) -> BackfillStats:
+    """Ingest every PDF under root, one document at a time, checkpointing after each.
+
+    Safe to interrupt and re-run: finished documents are skipped. Indexes are rebuilt once
+    at the end if anything changed in this run or an earlier one did not finish its rebuild. Memory is bounded by the largest single document.
+    """
+    ensure_data_dirs()
+    sizes = [(p, p.stat().st_size) for p in iter_pdfs(root)]
+    stats = BackfillStats(total_docs=len(sizes), total_bytes=sum(s for _, s in sizes))
+    last_report = time.perf_counter()
+    for src, size in sizes:
+        try:
+            result = ingest_one(src, root)
+        except Exception:
+            logger.exception("backfill failed", extra={"extra": {"file": str(src)}})
+            stats.failed.append(str(src))
+            stats.total_bytes -= size
+            continue
+        if result is None:
+            stats.skipped_docs += 1
+            stats.total_bytes -= size  # already done: not part of this run's work
+        else:
+            stats.done_docs += 1
+            stats.pages += result[1]
+            stats.chunks += result[2]
+            stats.done_bytes += size
+        if time.perf_counter() - last_report >= report_every_s:
+            logger.info("backfill progress", extra={"extra": stats.progress()})
+            last_report = time.perf_counter()
+    if build_indexes and (stats.done_docs or _INDEXES_PENDING.exists()):
+        rebuild_indexes()
+        _INDEXES_PENDING.unlink(missing_ok=True)
+    logger.info("backfill finished", extra={"extra": stats.progress()})
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Resumable bulk ingestion of a directory of PDFs.")
+    parser.add_argument("root", type=Path)
+    parser.add_argument("--no-index", action="store_true", help="skip the final index rebuild")
+    parser.add_argument("--report-every", type=float, default=10.0, help="seconds between progress lines")
+    args = parser.parse_args()
+    configure_logging(settings.log_level)
+    stats = backfill(args.root, build_indexes=not args.no_index, report_every_s=args.report_every)
+    print(json.dumps({**stats.progress(), "chunks": stats.chunks, "failed_files": stats.failed}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
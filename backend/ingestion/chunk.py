@@ -1,12 +1,13 @@
 from __future__ import annotations
 
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, field
 from pathlib import Path
 from typing import List, Dict, Tuple
-import json
 
 from backend.utils.text import normalize_whitespace, count_tokens, tail_words
 from backend.index.store import chunks_dir, write_json
+from backend.index import catalog
+from backend.index.dedup import minhash_signature
 from backend.ingestion.extract import PageContent
 
 
@@ -18,6 +19,7 @@ class Chunk:
     page_start: int
     page_end: int
     headings_path: List[str]
+    minhash: List[int] = field(default_factory=list)
 
 
 def _split_into_chunks_by_heading(pages: List[PageContent]) -> List[Tuple[List[int], str, List[str]]]:
@@ -75,27 +77,25 @@ def build_chunks(doc_id: str, pages: List[PageContent], target_tokens: int = 100
                     page_start=page_ids[0],
                     page_end=page_ids[-1],
                     headings_path=heading_path,
+                    minhash=minhash_signature(w).tolist(),
                 )
             )
     return out
 
 
 def persist_chunks(doc_id: str, chunks: List[Chunk]) -> Dict[str, Path]:
-    # Write JSONL and a sidecar mapping for quick indexing
+    # Chunk metadata goes to the catalog (one transaction); texts and a sidecar mapping stay on disk
     out_dir = chunks_dir()
     out_dir.mkdir(parents=True, exist_ok=True)
-    jsonl_path = out_dir / f"{doc_id}.jsonl"
     texts_path = out_dir / f"{doc_id}.texts.json"
     map_path = out_dir / f"{doc_id}.map.json"
 
-    with jsonl_path.open("w", encoding="utf-8") as f:
-        for ch in chunks:
-            f.write(json.dumps(asdict(ch), ensure_ascii=False) + "\n")
+    catalog.replace_chunks(doc_id, (asdict(ch) for ch in chunks))
 
     texts = [c.text for c in chunks]
     id_map = {c.chunk_id: i for i, c in enumerate(chunks)}
     write_json(texts_path, texts)
     write_json(map_path, id_map)
-    return {"jsonl": jsonl_path, "texts": texts_path, "map": map_path}
+    return {"texts": texts_path, "map": map_path}
 
 
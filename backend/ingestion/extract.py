@@ -5,8 +5,6 @@ from pathlib import Path
 from typing import List
 import re
 
-import fitz  # PyMuPDF
-
 
 _RE_NUM_HEADING = re.compile(r"^(\d+[\.\)])+\s+.+")
 
@@ -41,6 +39,8 @@ def _detect_heading_candidates(page_text: str, max_candidates: int = 8) -> List[
 
 
 def extract_pdf_pages(file_path: Path) -> List[PageContent]:
+    import fitz  # PyMuPDF; ingestion-only, keep it out of the query process import graph
+
     doc = fitz.open(str(file_path))
     pages: List[PageContent] = []
     try:
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import List, Optional
+import gzip
+import json
+import os
+import tempfile
+
+from backend.index.store import pages_dir
+from backend.ingestion.extract import PageContent, _detect_heading_candidates, extract_pdf_pages
+
+
+# Extracted page text per document, gzip-compressed JSON keyed by the file MD5, so
+# re-chunking never re-parses a PDF. Only raw text is stored; heading candidates are
+# recomputed on load so heading-detection changes apply without re-extraction.
+_PAGES_DIR = pages_dir()
+_FORMAT_VERSION = 1
+
+
+def _path(md5: str) -> Path:
+    return _PAGES_DIR / f"{md5}.json.gz"
+
+
+def has_pages(md5: str) -> bool:
+    return _path(md5).exists()
+
+
+def save_pages(md5: str, pages: List[PageContent]) -> Path:
+    path = _path(md5)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    payload = json.dumps({"v": _FORMAT_VERSION, "pages": [p.text for p in pages]}, ensure_ascii=False).encode("utf-8")
+    fd, tmp = tempfile.mkstemp(dir=str(path.parent), suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6, mtime=0) as f:
+            f.write(payload)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+    return path
+
+
+def load_pages(md5: str) -> Optional[List[PageContent]]:
+    """Cached pages for a file MD5, or None if it was never extracted."""
+    try:
+        with gzip.open(_path(md5), "rb") as f:
+            payload = json.loads(f.read().decode("utf-8"))
+    except FileNotFoundError:
+        return None
+    return [
+        PageContent(page_index=i, text=text, heading_candidates=_detect_heading_candidates(text))
+        for i, text in enumerate(payload["pages"])
+    ]
+
+
+def extract_pages_cached(file_path: Path, md5: str) -> List[PageContent]:
+    pages = load_pages(md5)
+    if pages is None:
+        pages = extract_pdf_pages(file_path)
+        save_pages(md5, pages)
+    return pages
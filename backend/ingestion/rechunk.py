@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+import argparse
+import json
+import os
+import time
+
+from backend.config import settings
+from backend.ingestion.chunk import Chunk, build_chunks, persist_chunks
+from backend.ingestion.manifest import all_documents
+from backend.ingestion.page_cache import load_pages
+from backend.ingestion.service import rebuild_indexes
+
+
+def rechunk_document(doc_id: str, md5: str, target_tokens: int, overlap_ratio: float) -> Tuple[str, Optional[List[Chunk]]]:
+    """Re-chunk one document from the page cache. Returns (doc_id, chunks), None if not cached.
+
+    Runs in a worker process, so it only computes: the parent persists the chunks, and
+    no worker ever uses a SQLite connection inherited across fork().
+    """
+    pages = load_pages(md5)
+    if pages is None:
+        return doc_id, None
+    return doc_id, build_chunks(doc_id=doc_id, pages=pages, target_tokens=target_tokens, overlap_ratio=overlap_ratio)
+
+
+def rechunk_all(
+    target_tokens: int | None = None,
+    overlap_ratio: float | None = None,
+    workers: int | None = None,
+    rebuild: bool = True,
+) -> Dict[str, object]:
+    """Regenerate chunks for every catalogued document from cached page text, then the indexes.
+
+    Never opens a PDF: documents without cached pages are reported in `missing` and keep
+    their current chunks (re-ingest them once to populate the cache).
+    """
+    target_tokens = target_tokens or settings.chunk_target_tokens
+    overlap_ratio = settings.chunk_overlap_ratio if overlap_ratio is None else overlap_ratio
+    docs = all_documents()
+    started = time.perf_counter()
+    done: Dict[str, int] = {}
+    missing: List[str] = []
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = [pool.submit(rechunk_document, d.doc_id, d.md5, target_tokens, overlap_ratio) for d in docs.values()]
+        for fut in futures:
+            doc_id, chunks = fut.result()
+            if chunks is None:
+                missing.append(doc_id)
+            else:
+                persist_chunks(doc_id, chunks)
+                done[doc_id] = len(chunks)
+    if rebuild and done:
+        rebuild_indexes()
+    return {
+        "docs": len(done),
+        "chunks": sum(done.values()),
+        "missing": missing,
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Re-chunk all documents from the page cache and rebuild indexes.")
+    parser.add_argument("--target-tokens", type=int, default=None)
+    parser.add_argument("--overlap-ratio", type=float, default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--no-rebuild", action="store_true", help="only rewrite chunks; skip the index rebuild")
+    args = parser.parse_args()
+    print(json.dumps(rechunk_all(args.target_tokens, args.overlap_ratio, args.workers, rebuild=not args.no_rebuild), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,30 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import List, Tuple, Dict
+from typing import Any, List, Tuple, Dict, Optional
+import logging
 import shutil
+import threading
 
 from backend.index.store import ensure_data_dirs, docs_dir
-from backend.ingestion.extract import extract_pdf_pages
+from backend.ingestion.page_cache import extract_pages_cached
 from backend.ingestion.chunk import build_chunks, persist_chunks
-from backend.ingestion.manifest import compute_md5, upsert_document
+from backend.ingestion.manifest import compute_md5, delete_document as delete_catalog_document, get_document, upsert_document
+from backend.index import chunkio, compact, registry, snapshot, tombstones
 from backend.index.lexical import build_index_from_all_chunks
-from backend.index.semantic import build_embeddings_from_all_chunks
+from backend.index.semantic import build_embeddings_from_all_chunks, embeddings_available
 from backend.config import settings
 
 
-def ingest_files(file_paths: List[Path]) -> Dict[str, int]:
+logger = logging.getLogger(__name__)
+
+
+def ingest_files(file_paths: List[Path], md5s: Optional[Dict[Path, str]] = None) -> Dict[str, int]:
     """Ingest a list of local PDF file paths.
 
-    Steps: copy into docs_dir, extract pages, chunk, persist, update manifest,
-    rebuild TF-IDF index. Returns counts.
+    Steps: copy into docs_dir, extract pages (or reuse the page cache), chunk, persist,
+    update manifest, rebuild TF-IDF index. `md5s` carries hashes already computed while storing
+    (e.g. streamed uploads) so those files are not re-read. Returns counts.
     """
     ensure_data_dirs()
     total_chunks = 0
@@ -27,25 +34,111 @@ def ingest_files(file_paths: List[Path]) -> Dict[str, int]:
         dst = docs_dir() / src.name
         if src.resolve() != dst.resolve():
             shutil.copy2(src, dst)
-        pages = extract_pdf_pages(dst)
-        md5 = compute_md5(dst)
+        md5 = (md5s or {}).get(src) or compute_md5(dst)
+        pages = extract_pages_cached(dst, md5)
         doc_id = dst.stem
         upsert_document(doc_id=doc_id, filename=dst.name, md5=md5, pages=len(pages))
-        chunks = build_chunks(doc_id=doc_id, pages=pages)
+        chunks = build_chunks(
+            doc_id=doc_id, pages=pages, target_tokens=settings.chunk_target_tokens, overlap_ratio=settings.chunk_overlap_ratio
+        )
         persist_chunks(doc_id, chunks)
+        # Replacing a document: texts/map were rewritten; drop a pre-catalog JSONL if one is left
+        (chunkio.chunks_dir() / f"{doc_id}.jsonl").unlink(missing_ok=True)
         total_chunks += len(chunks)
         ingested.append(doc_id)
 
-    # Rebuild lexical index after batch
-    build_index_from_all_chunks()
-
-    # Optionally (re)build semantic embeddings if enabled and configured
-    try:
-        if settings.use_semantic and settings.embedding_provider == "voyage" and settings.voyage_api_key:
-            build_embeddings_from_all_chunks()
-    except Exception:
-        # Best-effort: do not fail ingestion if embeddings build fails
-        pass
+    rebuild_indexes()
+    # A deleted-then-re-ingested document is live again in the snapshot just published
+    tombstones.discard(ingested)
     return {"docs": len(ingested), "chunks": total_chunks}
 
 
+def rebuild_indexes() -> None:
+    """Rebuild lexical index (and embeddings) from all chunks, published together as one snapshot."""
+    with snapshot.writer() as snap:
+        build_index_from_all_chunks(snap)
+
+        # Optionally (re)build semantic embeddings if enabled and configured
+        try:
+            if settings.use_semantic and embeddings_available():
+                build_embeddings_from_all_chunks(out_dir=snap)
+        except Exception:
+            # Best-effort: do not fail ingestion if embeddings build fails (previous ones carry over)
+            pass
+    _clear_compacted_tombstones()
+
+
+def _clear_compacted_tombstones() -> None:
+    # Tombstones of documents no longer in the published registry have nothing left to mask
+    dead = tombstones.deleted()
+    if dead:
+        live = set(registry.get_registry().doc_ids)
+        tombstones.discard(d for d in dead if d not in live)
+
+
+def delete_document(doc_id: str, schedule: bool = True) -> Optional[Dict[str, Any]]:
+    """Remove a document: hidden from search at once, files and catalog rows removed, then compacted.
+
+    Returns None if the document is unknown. Index rows are only masked here (tombstone);
+    `compact_deleted` drops them physically, in the background when `schedule` is set.
+    """
+    doc = get_document(doc_id)
+    if doc is None:
+        return None
+    tombstones.add([doc_id])  # first, so no search returns rows whose text is about to go
+    chunks = delete_catalog_document(doc_id)
+    chunkio.remove_doc_files(doc_id)
+    (docs_dir() / doc.filename).unlink(missing_ok=True)
+    if schedule:
+        schedule_compaction()
+    return {"doc_id": doc_id, "chunks": chunks}
+
+
+def compact_deleted() -> Dict[str, Any]:
+    """Physically remove tombstoned documents from the indexes by publishing a compacted snapshot."""
+    dead = tombstones.deleted()
+    if not dead or snapshot.current_version() is None:
+        return {"compacted": False}
+    if compact.orphans_near_duplicates(dead):
+        # A surviving chunk was indexed only through a deleted duplicate: re-derive everything
+        rebuild_indexes()
+        return {"compacted": True, "rebuild": True, "docs": sorted(dead)}
+    stats = compact.compact(dead)
+    # Only what was removed: a document re-ingested meanwhile has had its tombstone cleared
+    tombstones.discard(stats["docs"])
+    return {"compacted": bool(stats["docs"]), "rebuild": False, **stats}
+
+
+_COMPACT_LOCK = threading.Lock()
+_compactor: Dict[str, Any] = {"thread": None, "again": False}
+
+
+def schedule_compaction() -> None:
+    """Run `compact_deleted` in a background thread; deletes arriving meanwhile trigger one more pass."""
+    with _COMPACT_LOCK:
+        thread = _compactor["thread"]
+        if thread is not None and thread.is_alive():
+            _compactor["again"] = True
+            return
+        _compactor["thread"] = threading.Thread(target=_compaction_loop, name="index-compactor", daemon=True)
+        _compactor["thread"].start()
+
+
+def _compaction_loop() -> None:
+    from backend.index.warmup import warm_up
+
+    while True:
+        try:
+            result = compact_deleted()
+            logger.info("index compaction", extra={"extra": result})
+            if result["compacted"]:
+                warm_up()  # load the compacted snapshot before the next query needs it
+        except Exception:
+            logger.exception("index compaction failed")
+        with _COMPACT_LOCK:
+            if not _compactor["again"]:
+                _compactor["thread"] = None
+                return
+            _compactor["again"] = False
+
+
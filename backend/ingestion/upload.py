@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Awaitable, Protocol
+import hashlib
+import os
+import tempfile
+
+from fastapi.concurrency import run_in_threadpool
+
+from backend.index.store import docs_dir
+
+
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+
+class _AsyncReadable(Protocol):
+    filename: str | None
+
+    def read(self, size: int = -1) -> Awaitable[bytes]: ...
+
+
+@dataclass
+class StoredUpload:
+    path: Path
+    md5: str
+    size: int
+
+
+def safe_filename(name: str | None) -> str:
+    # Drop any client-supplied directory components
+    base = Path((name or "").replace("\\", "/")).name
+    if not base or base in (".", ".."):
+        raise ValueError(f"invalid upload filename: {name!r}")
+    return base
+
+
+async def store_upload(upload: _AsyncReadable, dest_dir: Path | None = None, chunk_size: int = UPLOAD_CHUNK_BYTES) -> StoredUpload:
+    """Stream an upload into dest_dir (default docs_dir) in fixed-size chunks, hashing as it goes.
+
+    The file is written to a temp file in the destination directory and renamed into place,
+    so a partial upload never replaces an existing document. Memory use is one chunk.
+    """
+    dest_dir = dest_dir or docs_dir()
+    dest_dir.mkdir(parents=True, exist_ok=True)
+    dest = dest_dir / safe_filename(upload.filename)
+    md5 = hashlib.md5()
+    size = 0
+    fd, tmp_name = tempfile.mkstemp(dir=str(dest_dir), prefix=f".{dest.name}.", suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = await upload.read(chunk_size)
+                if not chunk:
+                    break
+                md5.update(chunk)
+                size += len(chunk)
+                await run_in_threadpool(out.write, chunk)
+        os.replace(tmp_name, dest)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+    return StoredUpload(path=dest, md5=md5.hexdigest(), size=size)
@@ -10,15 +10,20 @@ class IngestResponse(BaseModel):
 
 class QueryRequest(BaseModel):
     query: str
-    mode: Optional[Literal["auto", "qa", "list", "table"]] = "auto"
+    mode: Optional[Literal["auto", "qa", "list", "table", "extractive"]] = "auto"
     top_k: int = 12
     semantic: bool = True
     llm_expand: bool = False
     # Runtime overrides
     use_rrf: Optional[bool] = None
+    routing: Optional[Literal["adaptive", "always"]] = None
+    doc_top_m: Optional[int] = None
     evidence_threshold: Optional[float] = None
     evidence_topk: Optional[int] = None
     temperature: Optional[float] = None
+    context_tokens: Optional[int] = None
+    latency_budget_ms: Optional[int] = None
+    hedge: Optional[bool] = None
 
 
 class Citation(BaseModel):
@@ -35,3 +40,35 @@ class QueryResponse(BaseModel):
     error: Optional[str] = None
     reason: Optional[str] = None
 
+
+
+class SearchRequest(BaseModel):
+    query: str
+    page_size: int = 10
+    # Opaque token from a previous page's next_cursor; the query and options must be unchanged
+    cursor: Optional[str] = None
+    semantic: bool = True
+    use_rrf: Optional[bool] = None
+    routing: Optional[Literal["adaptive", "always"]] = None
+    doc_top_m: Optional[int] = None
+    latency_budget_ms: Optional[int] = None
+
+
+class SearchHit(BaseModel):
+    chunk_id: str
+    doc_id: str
+    pages: str
+    heading: Optional[str] = None
+    score: float
+    snippet: str
+    # [start, end) character offsets of query terms within snippet
+    highlights: List[List[int]] = []
+
+
+class SearchResponse(BaseModel):
+    results: List[SearchHit] = []
+    next_cursor: Optional[str] = None
+    total: int = 0
+    meta: dict = {}
+    error: Optional[str] = None
+    reason: Optional[str] = None
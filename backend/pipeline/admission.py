@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Tuple
+import asyncio
+import math
+import time
+
+
+class Rejected(Exception):
+    """The request was shed; `retry_after` is a whole-second hint for the client."""
+
+    def __init__(self, reason: str, retry_after: int) -> None:
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Bounded in-flight limit with a bounded FIFO queue and a maximum queue wait.
+
+    Runs on the event loop (one per process), so plain counters need no locking. A request
+    that finds the queue full is rejected immediately; one that waits longer than
+    `max_wait_s` is rejected when the wait expires. A limit of 0 disables admission control.
+    """
+
+    def __init__(self, max_in_flight: int, max_queue: int, max_wait_s: float) -> None:
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.max_wait_s = max_wait_s
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._service_ewma_s = 0.0
+        self.counters: Dict[str, int] = {"admitted": 0, "queued": 0, "rejected_queue_full": 0, "rejected_queue_timeout": 0}
+        self._max_depth_seen = 0
+        self._wait_ewma_ms = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def retry_after(self) -> int:
+        # Expected time for the queue ahead to drain, from the smoothed service time
+        per_slot = self._service_ewma_s or 1.0
+        return max(1, math.ceil(per_slot * (self.queue_depth + 1) / max(1, self.max_in_flight)))
+
+    async def acquire(self) -> None:
+        if self.max_in_flight <= 0 or (self.in_flight < self.max_in_flight and not self._waiters):
+            self.in_flight += 1
+            self.counters["admitted"] += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            self.counters["rejected_queue_full"] += 1
+            raise Rejected("queue_full", self.retry_after())
+        fut: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._waiters.append(fut)
+        self.counters["queued"] += 1
+        self._max_depth_seen = max(self._max_depth_seen, len(self._waiters))
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(fut), timeout=self.max_wait_s)
+        except asyncio.TimeoutError:
+            if fut.done() and not fut.cancelled():
+                # The slot was handed over just as the wait expired: take it
+                pass
+            else:
+                fut.cancel()
+                self._waiters.remove(fut)
+                self.counters["rejected_queue_timeout"] += 1
+                raise Rejected("queue_timeout", self.retry_after())
+        except BaseException:
+            if fut.done() and not fut.cancelled():
+                self.release()  # slot was granted but the request went away
+            else:
+                fut.cancel()
+                if fut in self._waiters:
+                    self._waiters.remove(fut)
+            raise
+        waited_ms = (time.perf_counter() - start) * 1000.0
+        self._wait_ewma_ms = 0.9 * self._wait_ewma_ms + 0.1 * waited_ms if self._wait_ewma_ms else waited_ms
+        self.counters["admitted"] += 1
+
+    def release(self, service_s: float | None = None) -> None:
+        if service_s is not None:
+            self._service_ewma_s = 0.9 * self._service_ewma_s + 0.1 * service_s if self._service_ewma_s else service_s
+        while self._waiters:
+            fut = self._waiters.popleft()
+            if not fut.done():
+                fut.set_result(None)  # hand the slot over; in_flight is unchanged
+                return
+        self.in_flight = max(0, self.in_flight - 1)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        await self.acquire()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(time.perf_counter() - start)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "queue_depth": self.queue_depth,
+            "max_queue": self.max_queue,
+            "max_queue_depth_seen": self._max_depth_seen,
+            "max_wait_ms": round(self.max_wait_s * 1000.0),
+            "queue_wait_ewma_ms": round(self._wait_ewma_ms, 1),
+            "service_ewma_ms": round(self._service_ewma_s * 1000.0, 1),
+            **self.counters,
+        }
+
+
+class TokenBucketLimiter:
+    """Per-client token buckets: `rate` tokens/s refill up to `burst`. rate <= 0 disables it.
+
+    Only the `max_clients` most recently seen clients are tracked; an evicted client starts
+    again with a full bucket.
+    """
+
+    def __init__(self, rate: float, burst: float, max_clients: int = 10000, clock: Callable[[], float] = time.monotonic) -> None:
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.max_clients = max_clients
+        self._clock = clock
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self.limited = 0
+
+    def check(self, client: str) -> float:
+        """Take a token for client. Returns 0 if allowed, else seconds until a token is available."""
+        if self.rate <= 0:
+            return 0.0
+        now = self._clock()
+        tokens, last = self._buckets.pop(client, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - last) * self.rate)
+        wait = 0.0
+        if tokens >= 1.0:
+            tokens -= 1.0
+        else:
+            wait = (1.0 - tokens) / self.rate
+            self.limited += 1
+        self._buckets[client] = (tokens, now)
+        while len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+        return wait
+
+    def metrics(self) -> Dict[str, Any]:
+        return {"rate_per_s": self.rate, "burst": self.burst, "clients": len(self._buckets), "rate_limited": self.limited}
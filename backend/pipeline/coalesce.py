@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+from dataclasses import astuple, dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+import asyncio
+
+from backend.index import snapshot
+from backend.models.io import QueryRequest
+from backend.pipeline.context import QueryOptions
+from backend.retrieval.rewrite import deterministic_rewrite
+
+
+@dataclass
+class _Flight:
+    task: asyncio.Task
+    waiters: int = 0
+
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key onto one execution.
+
+    The work runs in its own task, so a caller that goes away (client disconnect) does not
+    cancel it for the others. The key is dropped when the work finishes: only calls that
+    overlap share a result; nothing is cached.
+    """
+
+    def __init__(self) -> None:
+        self._flights: Dict[Hashable, _Flight] = {}
+
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool, int]:
+        """Returns (result, shared, waiters): `shared` is False for the caller that ran fn."""
+        flight = self._flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _Flight(task=asyncio.ensure_future(fn()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _t: self._flights.pop(key, None))
+        else:
+            flight.waiters += 1
+        result = await asyncio.shield(flight.task)
+        return result, not leader, flight.waiters
+
+
+def request_key(req: QueryRequest) -> Hashable:
+    """Normalized identity of a query: rewritten text, mode, resolved options and index version."""
+    return (
+        deterministic_rewrite(req.query),
+        req.mode,
+        astuple(QueryOptions.from_request(req)),
+        req.llm_expand,
+        req.latency_budget_ms,
+        snapshot.current_version(),
+    )
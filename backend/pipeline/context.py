@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List
+
+import numpy as np
+
+from backend.config import settings
+from backend.generation.context import ContextPassage
+from backend.generation.prompt import Prompt
+from backend.index import snapshot
+from backend.index.chunkio import get_text_map_for_ids, get_meta_map_for_ids
+from backend.index.registry import ChunkRegistry, Hits, get_registry
+from backend.models.io import Citation, QueryRequest
+from backend.retrieval.intent import IntentResult
+from backend.retrieval.router import RouteDecision
+from backend.utils.deadline import Deadline
+
+
+@dataclass(frozen=True)
+class QueryOptions:
+    """Effective per-request knobs: request overrides resolved against settings once.
+
+    Stages read these instead of the global settings so concurrent requests never share
+    (or mutate) configuration.
+    """
+
+    top_k: int
+    use_semantic: bool
+    use_rrf: bool
+    routing: str
+    doc_top_m: int
+    evidence_topk: int
+    evidence_threshold: float
+    context_tokens: int
+    temperature: float
+    hedge: bool
+
+    @classmethod
+    def from_request(cls, req: QueryRequest) -> "QueryOptions":
+        def pick(value, default):
+            return default if value is None else value
+
+        return cls(
+            top_k=req.top_k,
+            use_semantic=settings.use_semantic and req.semantic,
+            use_rrf=pick(req.use_rrf, settings.use_rrf),
+            routing=pick(req.routing, settings.retrieval_routing),
+            doc_top_m=pick(req.doc_top_m, settings.doc_route_top_m),
+            evidence_topk=pick(req.evidence_topk, settings.evidence_topk),
+            evidence_threshold=pick(req.evidence_threshold, settings.evidence_threshold),
+            context_tokens=pick(req.context_tokens, settings.context_token_budget),
+            temperature=pick(req.temperature, 0.1),
+            hedge=pick(req.hedge, settings.llm_hedge),
+        )
+
+
+@dataclass
+class QueryContext:
+    """Request-scoped state threaded through the query stages.
+
+    Retrieval results are registry rows + scores (`Hits`); chunk-id strings are only
+    resolved for citations and response meta. Chunk text and metadata are materialised on
+    demand and memoised by row, so stages that exit early (smalltalk, a failed gate) never
+    touch the chunk store or the catalog.
+    """
+
+    req: QueryRequest
+    opts: QueryOptions
+    deadline: Deadline
+    snapshot: str | None = None
+    degraded: List[str] = field(default_factory=list)
+    intent: IntentResult | None = None
+    rewritten: str = ""
+    route: RouteDecision | None = None
+    expansion: Dict[str, Any] | None = None
+    lexical: Hits = field(default_factory=Hits.empty)
+    semantic: Hits = field(default_factory=Hits.empty)
+    fused: Hits = field(default_factory=Hits.empty)
+    reranked: Hits = field(default_factory=Hits.empty)
+    gate_meta: Dict[str, Any] = field(default_factory=dict)
+    passages: List[ContextPassage] = field(default_factory=list)
+    prompt: Prompt | str = ""
+    answer: str | None = None
+    meta: Dict[str, Any] = field(default_factory=dict)
+    _registry: ChunkRegistry | None = field(default=None, repr=False)
+    _texts: Dict[int, str] = field(default_factory=dict, repr=False)
+    _metas: Dict[int, Dict[str, Any]] = field(default_factory=dict, repr=False)
+    _released: bool = field(default=False, repr=False)
+
+    @classmethod
+    def from_request(cls, req: QueryRequest, version: str | None = None) -> "QueryContext":
+        budget_ms = req.latency_budget_ms if req.latency_budget_ms is not None else settings.latency_budget_ms
+        # Pin the index snapshot (the current one unless given) so every stage reads the same
+        # build, even across a rebuild, and gc() leaves it alone until release()
+        pinned = snapshot.pin(version)
+        return cls(req=req, opts=QueryOptions.from_request(req), deadline=Deadline(budget_ms), snapshot=pinned)
+
+    def release(self) -> None:
+        """Unpin the snapshot once the request is done reading it (idempotent)."""
+        if not self._released:
+            self._released = True
+            snapshot.release(self.snapshot)
+
+    @property
+    def registry(self) -> ChunkRegistry:
+        if self._registry is None:
+            self._registry = get_registry(self.snapshot)
+        return self._registry
+
+    def _resolve(
+        self, cache: Dict[int, Any], rows: Iterable[int], fetch: Callable[[List[str]], Dict[str, Any]]
+    ) -> Dict[int, Any]:
+        rows = [int(r) for r in rows]
+        missing = [r for r in rows if r not in cache]
+        if missing:
+            ids = self.registry.ids(missing)
+            found = fetch(ids)
+            cache.update({r: found[cid] for r, cid in zip(missing, ids) if cid in found})
+        return {r: cache[r] for r in rows if r in cache}
+
+    def texts(self, rows: Iterable[int]) -> Dict[int, str]:
+        return self._resolve(self._texts, rows, get_text_map_for_ids)
+
+    def metas(self, rows: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        return self._resolve(self._metas, rows, get_meta_map_for_ids)
+
+    def docs(self, rows: np.ndarray) -> np.ndarray:
+        # Document ordinal per row, straight from the registry; no store access needed
+        return self.registry.docs(rows)
+
+    def doc_map(self, rows: np.ndarray) -> Dict[int, int]:
+        return dict(zip(np.asarray(rows).tolist(), self.docs(rows).tolist()))
+
+    def chunk_ids(self, rows: Iterable[int]) -> List[str]:
+        return self.registry.ids(rows)
+
+    def citations(self, passages: List[ContextPassage]) -> List[Citation]:
+        # Every chunk that contributed text, in passage order
+        cited = list(dict.fromkeys(row for p in passages for row in p.chunk_ids))
+        scores = dict(self.reranked.pairs())
+        metas = self.metas(cited)
+        out: List[Citation] = []
+        for row in cited:
+            meta = metas.get(row, {})
+            doc_id = meta.get("doc_id") or self.registry.doc_ids[int(self.registry.row_doc[row])]
+            out.append(
+                Citation(
+                    doc_id=str(doc_id),
+                    pages=f"{meta.get('page_start', '?')}-{meta.get('page_end', '?')}",
+                    heading=("/".join(meta.get("headings_path", []) or []) or None),
+                    score=float(scores.get(row, 0.0)),
+                )
+            )
+        return out
+
+    def diagnostics(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"elapsed_ms": round(self.deadline.elapsed_ms(), 1)}
+        if self.route is not None:
+            out["route"] = self.route.as_meta()
+        if self.expansion is not None:
+            out["expansion"] = self.expansion
+        if self.deadline.bounded:
+            out.update(
+                {"budget_ms": self.deadline.budget_ms, "deadline_exceeded": self.deadline.expired(), "degraded": self.degraded}
+            )
+        return out
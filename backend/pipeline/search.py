@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Optional, Tuple
+import base64
+import hashlib
+import json
+import re
+
+from backend.config import settings
+from backend.index import snapshot, tombstones
+from backend.index.registry import Hits
+from backend.models.io import QueryRequest, SearchHit, SearchRequest, SearchResponse
+from backend.retrieval.rewrite import deterministic_rewrite
+from backend.retrieval.snippets import query_terms, snippet
+from .context import QueryContext
+from .stages import rerank, retrieve
+
+
+# /search: retrieval and rerank only, never the LLM. The full ranking (up to
+# SEARCH_MAX_RESULTS) is computed once per (snapshot, query) and kept in an LRU; a cursor
+# names the snapshot and an offset, so later pages are slices of that ranking. After
+# eviction (or on another worker) it is recomputed against the same immutable snapshot.
+_RESULTS: "OrderedDict[Tuple[Optional[str], str], Hits]" = OrderedDict()
+
+
+_VERSION = re.compile(r"\d{8}T\d{6}\.\d{9}")
+
+
+class CursorError(ValueError):
+    def __init__(self, reason: str, status: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.status = status
+
+
+def query_key(req: SearchRequest) -> str:
+    # Everything that changes the ranking; page_size does not, so clients may vary it
+    fields = [deterministic_rewrite(req.query), req.semantic, req.use_rrf, req.routing, req.doc_top_m]
+    return hashlib.blake2b(json.dumps(fields).encode(), digest_size=12).hexdigest()
+
+
+def encode_cursor(version: Optional[str], key: str, offset: int) -> str:
+    raw = json.dumps({"v": version, "k": key, "o": offset}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[str], str, int]:
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        version, key, offset = data["v"], str(data["k"]), max(0, int(data["o"]))
+    except Exception as exc:
+        raise CursorError("invalid_cursor", 400) from exc
+    # Cursors are not signed: the version becomes a path, so only a version name is accepted
+    if version is not None and not (isinstance(version, str) and _VERSION.fullmatch(version)):
+        raise CursorError("invalid_cursor", 400)
+    return version, key, offset
+
+
+async def _ranking(ctx: QueryContext) -> Hits:
+    ctx.rewritten = deterministic_rewrite(ctx.req.query)
+    await retrieve(ctx)
+    await rerank(ctx)
+    # A chunk neither retriever matched only pads the ranking
+    keep = ctx.reranked.scores > 0
+    return Hits(ctx.reranked.rows[keep], ctx.reranked.scores[keep])
+
+
+async def _page(req: SearchRequest, ctx: QueryContext, key: str, offset: int) -> SearchResponse:
+    version = ctx.snapshot
+    ranked = _RESULTS.get((version, key))
+    cached = ranked is not None
+    if ranked is None:
+        ranked = await _ranking(ctx)
+        _RESULTS[(version, key)] = ranked
+        while len(_RESULTS) > settings.search_cache_size:
+            _RESULTS.popitem(last=False)
+    else:
+        _RESULTS.move_to_end((version, key))
+
+    page_size = max(1, min(req.page_size, settings.search_page_size_max))
+    page = Hits(ranked.rows[offset : offset + page_size], ranked.scores[offset : offset + page_size])
+    rows = page.rows.tolist()
+    texts, metas = ctx.texts(rows), ctx.metas(rows)
+    terms = query_terms(req.query)
+    dead = tombstones.deleted()
+    results = []
+    for row, chunk_id, score in zip(rows, ctx.chunk_ids(rows), page.scores.tolist()):
+        meta = metas.get(row, {})
+        doc_id = str(meta.get("doc_id") or ctx.registry.doc_ids[int(ctx.registry.row_doc[row])])
+        if doc_id in dead:  # deleted after this ranking was cached
+            continue
+        text, marks = snippet(texts.get(row, ""), terms, settings.search_snippet_words)
+        results.append(
+            SearchHit(
+                chunk_id=chunk_id,
+                doc_id=doc_id,
+                pages=f"{meta.get('page_start', '?')}-{meta.get('page_end', '?')}",
+                heading=("/".join(meta.get("headings_path", []) or []) or None),
+                score=float(score),
+                snippet=text,
+                highlights=[list(m) for m in marks],
+            )
+        )
+    end = offset + page_size
+    meta = {"snapshot": version, "offset": offset, "ranking_cached": cached, **ctx.diagnostics()}
+    if not cached:
+        meta["used_semantic"] = bool(ctx.semantic)
+    return SearchResponse(
+        results=results,
+        next_cursor=encode_cursor(version, key, end) if end < len(ranked) else None,
+        total=len(ranked),
+        meta=meta,
+    )
+
+
+async def run_search(req: SearchRequest) -> SearchResponse:
+    """One page of fused and reranked chunks with snippets.
+
+    Raises CursorError for a cursor that is malformed, belongs to another query, or points
+    at a snapshot that has since been garbage-collected.
+    """
+    key = query_key(req)
+    version, offset = None, 0
+    if req.cursor:
+        version, cursor_key, offset = decode_cursor(req.cursor)
+        if cursor_key != key:
+            raise CursorError("cursor_mismatch", 400)
+        if version is not None and version not in snapshot.list_versions():
+            # Checked before pinning: loading any other directory could evict the current snapshot
+            raise CursorError("cursor_expired", 410)
+    qreq = QueryRequest(
+        query=req.query,
+        top_k=settings.search_max_results,
+        semantic=req.semantic,
+        use_rrf=req.use_rrf,
+        routing=req.routing,
+        doc_top_m=req.doc_top_m,
+        latency_budget_ms=req.latency_budget_ms,
+    )
+    # Pinned before the existence check, so gc() cannot remove the snapshot mid-page
+    ctx = QueryContext.from_request(qreq, version=version)
+    try:
+        if req.cursor and version is not None and not snapshot.snapshot_path(version).exists():
+            raise CursorError("cursor_expired", 410)
+        return await _page(req, ctx, key, offset)
+    finally:
+        ctx.release()
@@ -0,0 +1,388 @@
+from __future__ import annotations
+
+from typing import Awaitable, Callable, List, Optional
+import asyncio
+
+from fastapi.concurrency import run_in_threadpool
+
+from backend.config import settings
+from backend.generation.context import assemble_context
+from backend.generation.evidence_check import evidence_filter
+from backend.generation.extractive import extractive_answer
+from backend.generation.llm import generate_answer_hedged
+from backend.generation.prompt import build_prompt, build_prompt_blocks
+from backend.index.fusion import rrf, rrf_many, weighted_sum
+from backend.index.lexical import query_coverage as lexical_coverage, search as lexical_search, search_many as lexical_search_many
+from backend.index.registry import Hits
+from backend.index.semantic import semantic_search, semantic_search_many
+from backend.models.io import QueryResponse
+from backend.retrieval.gate import DEFAULT_MIN_SOURCES, evidence_gate, mean_topk
+from backend.retrieval.intent import detect_intent
+from backend.retrieval.rerank import rerank_by_heuristics, rerank_upper_bound
+from backend.retrieval.expand import dedupe, deterministic_variants, llm_variants
+from backend.retrieval.rewrite import deterministic_rewrite
+from backend.retrieval.router import route_query
+from backend.utils.profiler import in_request
+from .context import QueryContext
+
+
+# A stage returns a response to finish the request early, or None to continue.
+Stage = Callable[[QueryContext], Awaitable[Optional[QueryResponse]]]
+
+
+def _search_or_empty(single, many, queries: List[str], **kwargs) -> List[Hits]:
+    # Guard lexical/semantic with best-effort fallbacks; several queries go out as one batch
+    try:
+        if len(queries) == 1:
+            return [single(queries[0], **kwargs)]
+        return many(queries, **kwargs)
+    except Exception:
+        return [Hits.empty() for _ in queries]
+
+
+async def intent(ctx: QueryContext) -> Optional[QueryResponse]:
+    ctx.intent = detect_intent(ctx.req.query)
+    if ctx.intent.intent == "smalltalk":
+        msg = build_prompt("smalltalk", ctx.req.query, [])
+        return QueryResponse(answer=msg, citations=[], meta={"intent": "smalltalk", "threshold_passed": False})
+    ctx.rewritten = deterministic_rewrite(ctx.req.query)
+    return None
+
+
+def _start_llm_variants(ctx: QueryContext) -> Optional[asyncio.Future]:
+    # Runs alongside first-pass retrieval; resolves to TimeoutError on its own after the budget
+    n = settings.expand_llm_variants
+    if not ctx.req.llm_expand or n <= 0:
+        return None
+    timeout = ctx.deadline.timeout(settings.expand_timeout_s)
+    return asyncio.ensure_future(
+        asyncio.wait_for(run_in_threadpool(in_request(llm_variants), ctx.req.query, n, timeout), timeout=timeout)
+    )
+
+
+def _first_pass_queries(ctx: QueryContext) -> List[str]:
+    if not ctx.req.llm_expand:
+        return [ctx.rewritten]
+    return dedupe([ctx.rewritten] + [deterministic_rewrite(v) for v in deterministic_variants(ctx.req.query)])
+
+
+async def _llm_queries(ctx: QueryContext, task: Optional[asyncio.Future], queries: List[str]) -> List[str]:
+    """LLM variants not already among `queries`, once they arrive (none on failure or timeout).
+
+    LLM variants are cached per normalized query, so repeats cost no provider call.
+    """
+    llm, extra = "off", []
+    if task is not None:
+        try:
+            variants, cached = await task
+            extra = dedupe(queries + [deterministic_rewrite(v) for v in variants])[len(queries) :]
+            llm = "cached" if cached else "generated"
+        except Exception:
+            llm = "failed"
+            ctx.degraded.append("expansion_llm_failed")
+    if ctx.req.llm_expand:
+        ctx.expansion = {"variants": queries[1:] + extra, "llm": llm}
+    return extra
+
+
+def _coverage_or_none(query: str, version: str | None) -> float | None:
+    try:
+        return lexical_coverage(query, version=version)
+    except Exception:
+        return None
+
+
+async def retrieve(ctx: QueryContext) -> Optional[QueryResponse]:
+    """Lexical and semantic retrieval, concurrently and off the event loop.
+
+    With adaptive routing, semantic is only kept when lexical is not decisive: it starts
+    speculatively alongside lexical and is cancelled (or, non-speculative, never started)
+    once the router has seen the lexical scores. Semantic is skipped when the remaining
+    budget cannot cover an embedding round trip, and abandoned on timeout. With llm_expand,
+    the first pass searches the query and its deterministic variants while the LLM writes
+    paraphrases; those are searched in a second, smaller batch when they arrive.
+    """
+    opts, deadline = ctx.opts, ctx.deadline
+    adaptive = opts.routing == "adaptive"
+    llm_task = _start_llm_variants(ctx)
+    queries = _first_pass_queries(ctx)
+    sem_lists: List[Hits] = []
+
+    def start_semantic() -> asyncio.Future:
+        return asyncio.ensure_future(
+            run_in_threadpool(
+                in_request(_search_or_empty),
+                semantic_search,
+                semantic_search_many,
+                queries,
+                top_k=opts.top_k,
+                timeout=deadline.timeout(settings.embedding_timeout_s),
+                version=ctx.snapshot,
+                doc_top_m=opts.doc_top_m,
+            )
+        )
+
+    lex_task = asyncio.ensure_future(
+        run_in_threadpool(
+            in_request(_search_or_empty),
+            lexical_search,
+            lexical_search_many,
+            queries,
+            top_k=opts.top_k,
+            version=ctx.snapshot,
+            doc_top_m=opts.doc_top_m,
+        )
+    )
+    sem_task: asyncio.Future | None = None
+    semantic_ok = opts.use_semantic and deadline.allows(settings.semantic_min_ms / 1000.0)
+    if opts.use_semantic and not semantic_ok:
+        ctx.degraded.append("semantic_skipped")
+    if semantic_ok and (not adaptive or settings.route_speculative):
+        sem_task = start_semantic()
+    lex_lists: List[Hits] = await lex_task
+    ctx.lexical = lex_lists[0]
+
+    if semantic_ok and adaptive:
+        coverage = _coverage_or_none(ctx.rewritten, ctx.snapshot)
+        ctx.route = route_query(ctx.lexical, coverage if coverage is not None else 0.0)
+        if not ctx.route.semantic and sem_task is not None:
+            # The thread finishes its call in the background; nothing waits on it
+            sem_task.cancel()
+            sem_task = None
+        elif ctx.route.semantic and sem_task is None:
+            sem_task = start_semantic()
+    if sem_task is not None:
+        try:
+            sem_lists = await asyncio.wait_for(sem_task, timeout=deadline.timeout())
+            ctx.semantic = sem_lists[0]
+        except asyncio.TimeoutError:
+            ctx.degraded.append("semantic_timeout")
+
+    extra = await _llm_queries(ctx, llm_task, queries)
+    if extra:
+        # Only the LLM variants are left to search; each retriever that ran gets one more batch
+        sem_more = None
+        if sem_lists and deadline.allows(settings.semantic_min_ms / 1000.0):
+            sem_more = asyncio.ensure_future(
+                run_in_threadpool(
+                    in_request(_search_or_empty),
+                    semantic_search,
+                    semantic_search_many,
+                    extra,
+                    top_k=opts.top_k,
+                    timeout=deadline.timeout(settings.embedding_timeout_s),
+                    version=ctx.snapshot,
+                    doc_top_m=opts.doc_top_m,
+                )
+            )
+        lex_lists = lex_lists + await run_in_threadpool(
+            in_request(_search_or_empty),
+            lexical_search,
+            lexical_search_many,
+            extra,
+            top_k=opts.top_k,
+            version=ctx.snapshot,
+            doc_top_m=opts.doc_top_m,
+        )
+        if sem_more is not None:
+            try:
+                sem_lists = sem_lists + await asyncio.wait_for(sem_more, timeout=deadline.timeout())
+            except asyncio.TimeoutError:
+                ctx.degraded.append("semantic_timeout")
+        queries = queries + extra
+    fuse = rrf if opts.use_rrf else weighted_sum
+    if len(queries) > 1:
+        # Expanded query: every variant's lists vote by rank; normalised to the weighted-sum scale
+        ctx.fused = rrf_many(lex_lists + sem_lists, top_k=opts.top_k, normalize=True)
+    elif ctx.route is not None and not ctx.route.semantic:
+        # Lexical was decisive: fuse as if semantic agreed, so scores stay on the same scale
+        # as a two-retriever query and the gate threshold keeps its meaning
+        ctx.fused = fuse(ctx.lexical, ctx.lexical, top_k=opts.top_k)
+    else:
+        ctx.fused = fuse(ctx.lexical, ctx.semantic, top_k=opts.top_k)
+    return None
+
+
+async def pregate(ctx: QueryContext) -> Optional[QueryResponse]:
+    """Fail the gate from registry rows and fused scores alone when no rerank outcome could pass it."""
+    opts = ctx.opts
+    bound = mean_topk(rerank_upper_bound(ctx.fused), opts.evidence_topk)
+    docs = len(set(ctx.docs(ctx.fused.rows).tolist())) if len(ctx.fused) else 0
+    need = DEFAULT_MIN_SOURCES
+    if bound < opts.evidence_threshold or docs < need:
+        meta = {
+            "mean_topk_upper_bound": bound,
+            "distinct_docs": docs,
+            "need_docs": need,
+            "k": opts.evidence_topk,
+            "threshold": opts.evidence_threshold,
+            "early_exit": True,
+        }
+        return QueryResponse(error="insufficient_evidence", reason="gate_failed", citations=[], meta={**meta, **ctx.diagnostics()})
+    return None
+
+
+async def rerank(ctx: QueryContext) -> Optional[QueryResponse]:
+    rows = ctx.fused.rows
+    metas = ctx.metas(rows)
+    headings = {row: "/".join(meta.get("headings_path", []) or []) for row, meta in metas.items()}
+    ctx.reranked = rerank_by_heuristics(ctx.req.query, ctx.fused, ctx.texts(rows), headings, top_k=ctx.opts.top_k)
+    return None
+
+
+async def gate(ctx: QueryContext) -> Optional[QueryResponse]:
+    opts = ctx.opts
+    passed, ctx.gate_meta = evidence_gate(
+        ctx.reranked, ctx.docs(ctx.reranked.rows), threshold=opts.evidence_threshold, k=opts.evidence_topk
+    )
+    if not passed:
+        return QueryResponse(error="insufficient_evidence", reason="gate_failed", citations=[], meta={**ctx.gate_meta, **ctx.diagnostics()})
+    return None
+
+
+def _extractive_response(ctx: QueryContext, reason: str | None, max_sentences: int = 3) -> Optional[QueryResponse]:
+    rows = ctx.reranked.rows
+    answer, used = extractive_answer(
+        ctx.req.query, ctx.reranked.pairs(), ctx.texts(rows), ctx.doc_map(rows), max_sentences=max_sentences
+    )
+    if not answer:
+        return None
+    meta = {
+        "intent": ctx.intent.intent if ctx.intent else None,
+        "threshold_passed": True,
+        "used_semantic": bool(ctx.semantic),
+        "answer_mode": "extractive",
+        "context_chunks": [ctx.chunk_ids(p.chunk_ids) for p in used],
+    }
+    if reason:
+        meta["fallback"] = reason
+    return QueryResponse(answer=answer, citations=ctx.citations(used), meta={**meta, **ctx.diagnostics()})
+
+
+async def extractive(ctx: QueryContext) -> Optional[QueryResponse]:
+    """Extractive tier: explicit, or automatic for confident lookups (no provider call)."""
+    if ctx.req.mode == "extractive":
+        resp = _extractive_response(ctx, None)
+        if resp is None:
+            return QueryResponse(
+                error="insufficient_evidence", reason="no_matching_sentence", citations=[], meta={**ctx.gate_meta, **ctx.diagnostics()}
+            )
+        return resp
+    if ctx.req.mode == "auto" and ctx.gate_meta.get("mean_topk", 0.0) >= settings.extractive_auto_threshold:
+        rows = ctx.reranked.rows
+        _, best = extractive_answer(ctx.req.query, ctx.reranked.pairs(), ctx.texts(rows), ctx.doc_map(rows), max_sentences=1)
+        if best and best[0].score >= settings.extractive_min_coverage:
+            return _extractive_response(ctx, "auto")
+    return None
+
+
+async def assemble(ctx: QueryContext) -> Optional[QueryResponse]:
+    """Token-budgeted context from the most relevant sentences of the reranked chunks."""
+    rows = ctx.reranked.rows
+    passages = assemble_context(
+        ctx.req.query, ctx.reranked.pairs(), ctx.texts(rows), ctx.doc_map(rows), token_budget=ctx.opts.context_tokens
+    )
+    mode = "qa" if ctx.req.mode in ("auto", "qa") else ctx.req.mode
+    # Context in chunk order, not relevance order: the same chunks make the same (cacheable)
+    # block. Citations and context_chunks follow it, so "[Chunk N]" in the answer is passage N.
+    ctx.passages = sorted(passages, key=lambda p: min(p.chunk_ids))
+    ctx.prompt = build_prompt_blocks(mode, ctx.req.query, [p.text for p in ctx.passages])
+    ctx.meta = {
+        "intent": ctx.intent.intent if ctx.intent else None,
+        "threshold_passed": True,
+        "used_semantic": bool(ctx.semantic),
+        "answer_mode": "generative",
+        "context_tokens": sum(p.tokens for p in ctx.passages),
+        "context_chunks": [ctx.chunk_ids(p.chunk_ids) for p in ctx.passages],
+    }
+    return None
+
+
+async def generate(ctx: QueryContext) -> Optional[QueryResponse]:
+    """Generate (optionally hedged) within whatever budget is left."""
+    deadline = ctx.deadline
+    started = deadline.elapsed_ms()
+    try:
+        if deadline.expired():
+            raise asyncio.TimeoutError()
+        gen = await generate_answer_hedged(
+            ctx.prompt,
+            temperature=ctx.opts.temperature,
+            timeout=deadline.timeout(settings.llm_timeout_s),
+            hedge_after=settings.llm_hedge_after_ms / 1000.0 if ctx.opts.hedge else None,
+        )
+    except asyncio.TimeoutError:
+        # Out of budget: fall back to an extractive answer, else return the evidence that was ready
+        ctx.degraded.append("generation_timeout")
+        resp = _extractive_response(ctx, "generation_timeout")
+        if resp is not None:
+            return resp
+        return QueryResponse(
+            error="deadline_exceeded",
+            reason="generation_timeout",
+            citations=ctx.citations(ctx.passages),
+            meta={**ctx.meta, **ctx.diagnostics()},
+        )
+    except Exception:
+        # LLM unavailable: serve the extractive tier, else report failure rather than 500
+        ctx.degraded.append("llm_error")
+        resp = _extractive_response(ctx, "llm_error")
+        if resp is not None:
+            return resp
+        return QueryResponse(error="generation_failed", reason="llm_error", citations=[], meta={**ctx.meta, **ctx.diagnostics()})
+    ctx.answer = gen["text"]
+    ctx.meta["llm"] = {"ms": round(deadline.elapsed_ms() - started, 1), **gen["usage"]}
+    if gen["hedged"]:
+        ctx.meta["hedged"] = True
+        ctx.meta["hedge_won"] = gen["winner"] == 1
+    return None
+
+
+async def filter_evidence(ctx: QueryContext) -> Optional[QueryResponse]:
+    """Sentence-level evidence filter; skipped (answer kept unfiltered) if the budget cannot cover it."""
+    deadline = ctx.deadline
+    if not deadline.allows(settings.evidence_filter_min_ms / 1000.0):
+        ctx.degraded.append("evidence_filter_skipped")
+        return None
+    try:
+        ctx.answer = await asyncio.wait_for(
+            run_in_threadpool(
+                in_request(evidence_filter),
+                ctx.answer or "",
+                [p.text for p in ctx.passages],
+                timeout=deadline.timeout(settings.embedding_timeout_s),
+            ),
+            timeout=deadline.timeout(),
+        )
+    except asyncio.TimeoutError:
+        ctx.degraded.append("evidence_filter_timeout")
+    return None
+
+
+async def respond(ctx: QueryContext) -> Optional[QueryResponse]:
+    return QueryResponse(answer=ctx.answer, citations=ctx.citations(ctx.passages), meta={**ctx.meta, **ctx.diagnostics()})
+
+
+DEFAULT_STAGES: List[Stage] = [
+    intent,
+    retrieve,
+    pregate,
+    rerank,
+    gate,
+    extractive,
+    assemble,
+    generate,
+    filter_evidence,
+    respond,
+]
+
+
+async def run_query(ctx: QueryContext, stages: List[Stage] | None = None) -> QueryResponse:
+    try:
+        for stage in stages or DEFAULT_STAGES:
+            resp = await stage(ctx)
+            if resp is not None:
+                return resp
+        raise RuntimeError("query pipeline finished without a response")
+    finally:
+        ctx.release()
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import List, Tuple
+import re
+import threading
+
+from backend.generation.llm import generate_answer
+from .rewrite import deterministic_rewrite
+
+
+# Function words dropped for the keyword variant: question scaffolding rarely appears in the
+# passage that answers it, and TF-IDF/embeddings both score better on the content terms
+_SCAFFOLDING = {
+    "a", "an", "the", "is", "are", "was", "were", "be", "do", "does", "did", "can", "could",
+    "should", "would", "will", "what", "which", "who", "whom", "when", "where", "why", "how",
+    "of", "for", "to", "in", "on", "at", "by", "about", "me", "tell", "please", "there", "it",
+}
+_RE_WORD = re.compile(r"[\w][\w\-.,/%]*[\w%]|\w")
+_RE_LIST_PREFIX = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s*")
+
+_PROMPT = (
+    "Rewrite the search question below in {n} different ways that a document answering it might "
+    "use. Vary the wording and use synonyms; keep the meaning and any names, numbers or codes. "
+    "Return one rewrite per line with no numbering or commentary.\n\nQuestion: {query}"
+)
+
+_CACHE_SIZE = 1024
+_CACHE_LOCK = threading.Lock()
+_LLM_CACHE: "OrderedDict[Tuple[str, int], List[str]]" = OrderedDict()
+
+
+def keyword_variant(query: str) -> str:
+    words = _RE_WORD.findall(deterministic_rewrite(query))
+    return " ".join(w for w in words if w not in _SCAFFOLDING)
+
+
+def deterministic_variants(query: str) -> List[str]:
+    """Cheap rewrites needing no provider call (currently: the content-word form)."""
+    base = deterministic_rewrite(query)
+    keywords = keyword_variant(query)
+    return [keywords] if keywords and keywords != base else []
+
+
+def parse_variants(text: str, n: int) -> List[str]:
+    out: List[str] = []
+    for line in text.splitlines():
+        line = _RE_LIST_PREFIX.sub("", line).strip().strip('"')
+        if line and line.lower() not in {v.lower() for v in out}:
+            out.append(line)
+    return out[:n]
+
+
+def llm_variants(query: str, n: int, timeout: float | None = None) -> Tuple[List[str], bool]:
+    """LLM paraphrases of query, cached per normalized query. Returns (variants, cache_hit).
+
+    Provider errors propagate and are not cached.
+    """
+    key = (deterministic_rewrite(query), n)
+    with _CACHE_LOCK:
+        hit = _LLM_CACHE.get(key)
+        if hit is not None:
+            _LLM_CACHE.move_to_end(key)
+            return list(hit), True
+    variants = parse_variants(generate_answer(_PROMPT.format(n=n, query=query), temperature=0.5, timeout=timeout), n)
+    with _CACHE_LOCK:
+        _LLM_CACHE[key] = variants
+        while len(_LLM_CACHE) > _CACHE_SIZE:
+            _LLM_CACHE.popitem(last=False)
+    return list(variants), False
+
+
+def dedupe(queries: List[str]) -> List[str]:
+    seen = set()
+    out = []
+    for q in queries:
+        norm = deterministic_rewrite(q)
+        if norm and norm not in seen:
+            seen.add(norm)
+            out.append(q)
+    return out
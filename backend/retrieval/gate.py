@@ -1,41 +1,47 @@
 from __future__ import annotations
 
-from typing import List, Tuple, Dict, Any
+from typing import Sequence, Tuple, Dict, Any
+
+import numpy as np
 
 from backend.config import settings
+from backend.index.registry import Hits
+
 
+DEFAULT_MIN_SOURCES = 2
 
-def mean_topk(values: List[float], k: int) -> float:
-    if not values:
+
+def mean_topk(values: Sequence[float] | np.ndarray, k: int) -> float:
+    values = np.asarray(values, dtype=np.float64)
+    if values.size == 0:
         return 0.0
-    k = max(1, min(k, len(values)))
-    top = sorted(values, reverse=True)[:k]
-    return sum(top) / len(top)
+    k = max(1, min(k, values.size))
+    return float(np.sort(values)[::-1][:k].mean())
 
 
 def evidence_gate(
-    ranked: List[Tuple[str, float]],
-    chunk_doc_map: Dict[str, str],
+    ranked: Hits,
+    row_docs: np.ndarray,
     min_sources: int | None = None,
     threshold: float | None = None,
+    k: int | None = None,
 ) -> Tuple[bool, Dict[str, Any]]:
     """Decide if retrieval evidence is sufficient.
 
     Conditions (configurable):
     - At least min_sources distinct chunks (by doc) among top-k
     - Mean similarity of top-k >= threshold
+    `row_docs` holds the document of each ranked row (any integer or string label).
     Returns (passed, meta)
     """
-    k = settings.evidence_topk
+    k = settings.evidence_topk if k is None else k
     thr = settings.evidence_threshold if threshold is None else threshold
-    need = 2 if min_sources is None else min_sources
-
-    sims = [s for _, s in ranked]
-    mt = mean_topk(sims, k)
-    top_ids = [cid for cid, _ in ranked[:k]]
-    docs = {chunk_doc_map.get(cid, "?") for cid in top_ids}
-    passed = (len(docs) >= need) and (mt >= thr)
-    meta = {"mean_topk": mt, "distinct_docs": len(docs), "need_docs": need, "k": k, "threshold": thr}
+    need = DEFAULT_MIN_SOURCES if min_sources is None else min_sources
+
+    mt = mean_topk(ranked.scores, k)
+    distinct = int(np.unique(np.asarray(row_docs)[:k]).size)
+    passed = (distinct >= need) and (mt >= thr)
+    meta = {"mean_topk": mt, "distinct_docs": distinct, "need_docs": need, "k": k, "threshold": thr}
     return passed, meta
 
 
@@ -1,6 +1,10 @@
 from __future__ import annotations
 
-from typing import List, Tuple, Dict
+from typing import List, Dict
+
+import numpy as np
+
+from backend.index.registry import Hits
 
 
 def _tokenize(text: str) -> List[str]:
@@ -9,14 +13,14 @@ def _tokenize(text: str) -> List[str]:
 
 def rerank_by_heuristics(
     query: str,
-    candidates: List[Tuple[str, float]],
-    chunk_text_map: Dict[str, str],
-    headings_map: Dict[str, str] | None = None,
+    candidates: Hits,
+    chunk_text_map: Dict[int, str],
+    headings_map: Dict[int, str] | None = None,
     w_fusion: float = 0.7,
     w_coverage: float = 0.25,
     w_heading: float = 0.05,
     top_k: int = 10,
-) -> List[Tuple[str, float]]:
+) -> Hits:
     """Re-score fused candidates with simple coverage/heading heuristics.
 
     - query-term coverage: fraction of unique query tokens present in chunk text
@@ -24,9 +28,10 @@ def rerank_by_heuristics(
     The base fused score is combined as: w_fusion*fused + w_coverage*coverage + heading_bonus
     """
     q_tokens = set(_tokenize(query))
-    out: List[Tuple[str, float]] = []
-    for cid, fused_score in candidates:
-        text = chunk_text_map.get(cid, "")
+    coverages = np.zeros(len(candidates))
+    bonuses = np.zeros(len(candidates))
+    for i, row in enumerate(candidates.rows.tolist()):
+        text = chunk_text_map.get(row, "")
         if not text:
             coverage = 0.0
         else:
@@ -35,12 +40,24 @@ def rerank_by_heuristics(
             coverage = (overlap / max(1, len(q_tokens)))
         heading_bonus = 0.0
         if headings_map:
-            heading = (headings_map.get(cid) or "").lower()
+            heading = (headings_map.get(row) or "").lower()
             if any(tok in heading for tok in q_tokens):
                 heading_bonus = w_heading
-        score = w_fusion * fused_score + w_coverage * coverage + heading_bonus
-        out.append((cid, score))
-    out.sort(key=lambda x: x[1], reverse=True)
-    return out[:top_k]
+        coverages[i] = coverage
+        bonuses[i] = heading_bonus
+    scores = w_fusion * candidates.scores + w_coverage * coverages + bonuses
+    order = np.argsort(-scores, kind="stable")[: max(1, top_k)]
+    return Hits(candidates.rows[order], scores[order])
 
 
+def rerank_upper_bound(
+    candidates: Hits,
+    w_fusion: float = 0.7,
+    w_coverage: float = 0.25,
+    w_heading: float = 0.05,
+) -> np.ndarray:
+    """Highest score each candidate could get from rerank_by_heuristics (full coverage + heading).
+
+    Lets callers reject weak evidence before loading any chunk text.
+    """
+    return w_fusion * candidates.scores + w_coverage + w_heading
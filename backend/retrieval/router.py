@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass
+from typing import Any, Dict
+
+from backend.config import settings
+from backend.index.registry import Hits
+
+
+@dataclass(frozen=True)
+class RouteDecision:
+    semantic: bool
+    reason: str
+    top: float
+    margin: float
+    coverage: float
+
+    def as_meta(self) -> Dict[str, Any]:
+        return {k: (round(v, 4) if isinstance(v, float) else v) for k, v in asdict(self).items()}
+
+
+def route_query(
+    lexical: Hits,
+    coverage: float,
+    min_top: float | None = None,
+    min_margin: float | None = None,
+    min_coverage: float | None = None,
+) -> RouteDecision:
+    """Decide from the lexical score distribution whether semantic retrieval is worth its round trip.
+
+    Lexical is decisive when every query term is known to the TF-IDF vocabulary (`coverage`),
+    the best hit is strong (`top`) and clearly ahead of the runner-up (`margin`, relative to
+    the top score). Anything else - unknown terms, weak or flat scores - goes to semantic.
+    """
+    min_top = settings.route_min_top if min_top is None else min_top
+    min_margin = settings.route_min_margin if min_margin is None else min_margin
+    min_coverage = settings.route_min_coverage if min_coverage is None else min_coverage
+
+    scores = lexical.scores
+    top = float(scores[0]) if scores.size else 0.0
+    second = float(scores[1]) if scores.size > 1 else 0.0
+    margin = (top - second) / top if top > 0 else 0.0
+
+    def decide(semantic: bool, reason: str) -> RouteDecision:
+        return RouteDecision(semantic=semantic, reason=reason, top=top, margin=margin, coverage=coverage)
+
+    if top <= 0:
+        return decide(True, "no_lexical_match")
+    if coverage < min_coverage:
+        return decide(True, "low_coverage")
+    if top < min_top:
+        return decide(True, "weak_top")
+    if margin < min_margin:
+        return decide(True, "low_margin")
+    return decide(False, "lexical_decisive")
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from typing import List, Set, Tuple
+import re
+
+from .expand import keyword_variant
+
+
+_RE_TOKEN = re.compile(r"\w+")
+
+
+def query_terms(query: str) -> Set[str]:
+    """Content words of the query (question scaffolding dropped), lowercased."""
+    return set(_RE_TOKEN.findall(keyword_variant(query)))
+
+
+def _matches(word: str, terms: Set[str]) -> bool:
+    # Exact, or differing by a plural "s" (no stemming: "warranty"/"warranties" is a miss)
+    return word in terms or (word.endswith("s") and word[:-1] in terms) or f"{word}s" in terms
+
+
+def snippet(text: str, terms: Set[str], max_words: int = 30) -> Tuple[str, List[Tuple[int, int]]]:
+    """Window of at most `max_words` words of `text` with the most distinct query terms.
+
+    Returns the snippet (ellipsised where cut) and [start, end) character offsets of the
+    matched terms within it. Without any match, the snippet is the start of the text.
+    """
+    text = " ".join(text.split())
+    words = list(_RE_TOKEN.finditer(text))
+    if not words:
+        return "", []
+    hits = [i for i, m in enumerate(words) if _matches(m.group().lower(), terms)]
+    start = 0
+    if hits:
+        best = (-1, -1)
+        for first in hits:
+            window = [i for i in hits if first <= i < first + max_words]
+            score = (len({words[i].group().lower() for i in window}), len(window))
+            if score > best:
+                best, start = score, first
+        # Lead in with a little context rather than starting on the first match
+        start = max(0, min(start - max_words // 5, len(words) - max_words))
+    end = min(len(words), start + max_words)
+    lo = words[start].start() if start else 0
+    hi = words[end - 1].end() if end < len(words) else len(text)
+    lead = "…" if lo > 0 else ""
+    out = f"{lead}{text[lo:hi]}{'…' if end < len(words) else ''}"
+    shift = len(lead) - lo
+    marks = [(words[i].start() + shift, words[i].end() + shift) for i in hits if start <= i < end]
+    return out, marks
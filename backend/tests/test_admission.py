@@ -0,0 +1,51 @@
+import asyncio
+
+import pytest
+
+from backend.pipeline.admission import AdmissionController, Rejected, TokenBucketLimiter
+
+
+def test_queue_full_rejects_immediately_and_slots_hand_over():
+    async def scenario():
+        ctl = AdmissionController(max_in_flight=1, max_queue=1, max_wait_s=1.0)
+        await ctl.acquire()
+        waiter = asyncio.create_task(ctl.acquire())
+        await asyncio.sleep(0)
+        assert ctl.queue_depth == 1
+        with pytest.raises(Rejected) as exc:
+            await ctl.acquire()
+        assert exc.value.reason == "queue_full" and exc.value.retry_after >= 1
+        ctl.release(0.01)
+        await waiter
+        assert ctl.in_flight == 1 and ctl.queue_depth == 0
+        ctl.release(0.01)
+        return ctl.metrics()
+
+    metrics = asyncio.run(scenario())
+    assert metrics["in_flight"] == 0
+    assert metrics["admitted"] == 2 and metrics["rejected_queue_full"] == 1 and metrics["max_queue_depth_seen"] == 1
+
+
+def test_queue_wait_times_out():
+    async def scenario():
+        ctl = AdmissionController(max_in_flight=1, max_queue=4, max_wait_s=0.02)
+        async with ctl.slot():
+            with pytest.raises(Rejected) as exc:
+                await ctl.acquire()
+            assert exc.value.reason == "queue_timeout"
+            assert ctl.queue_depth == 0
+        return ctl
+
+    ctl = asyncio.run(scenario())
+    assert ctl.in_flight == 0 and ctl.counters["rejected_queue_timeout"] == 1
+
+
+def test_token_bucket_per_client():
+    now = [0.0]
+    limiter = TokenBucketLimiter(rate=2.0, burst=2, clock=lambda: now[0])
+    assert limiter.check("a") == 0 and limiter.check("a") == 0
+    assert limiter.check("a") == pytest.approx(0.5)
+    assert limiter.check("b") == 0  # buckets are independent
+    now[0] = 0.5
+    assert limiter.check("a") == 0
+    assert TokenBucketLimiter(rate=0, burst=1).check("a") == 0
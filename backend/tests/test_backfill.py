@@ -0,0 +1,90 @@
+import pytest
+
+from backend.index import catalog
+from backend.ingestion import backfill, chunk, page_cache
+from backend.ingestion.extract import PageContent
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(catalog, "_DB_PATH", tmp_path / "catalog.sqlite3")
+    monkeypatch.setattr(catalog, "_LEGACY_MANIFEST", tmp_path / "manifest.json")
+    monkeypatch.setattr(catalog, "_LEGACY_CHUNKS_DIR", tmp_path / "legacy")
+    monkeypatch.setattr(chunk, "chunks_dir", lambda: tmp_path / "chunks")
+    monkeypatch.setattr(page_cache, "_PAGES_DIR", tmp_path / "pages")
+    monkeypatch.setattr(backfill, "docs_dir", lambda: tmp_path / "docs")
+    monkeypatch.setattr(backfill, "ensure_data_dirs", lambda: (tmp_path / "docs").mkdir(exist_ok=True))
+    monkeypatch.setattr(backfill, "_INDEXES_PENDING", tmp_path / "indexes_pending")
+    return tmp_path
+
+
+def test_backfill_checkpoints_and_resumes(data_dir, monkeypatch):
+    rebuilds = []
+    monkeypatch.setattr(backfill, "rebuild_indexes", lambda: rebuilds.append(1))
+
+    archive = data_dir / "archive"
+    (archive / "sub").mkdir(parents=True)
+    for name in ["a.pdf", "sub/b.pdf", "c.pdf"]:
+        (archive / name).write_bytes(name.encode() * 100)
+    broken = {"c.pdf"}
+
+    def fake_extract(path):
+        if path.name in broken:
+            raise RuntimeError("corrupt pdf")
+        return [PageContent(0, f"text of {path.stem} " * 20, []), PageContent(1, "more", [])]
+
+    monkeypatch.setattr(page_cache, "extract_pdf_pages", fake_extract)
+
+    stats = backfill.backfill(archive)
+    assert (stats.done_docs, stats.skipped_docs, stats.failed) == (2, 0, [str(archive / "c.pdf")])
+    assert stats.pages == 4 and rebuilds == [1]
+    b = backfill.doc_id_for(archive / "sub/b.pdf", archive)
+    assert set(catalog.all_documents()) == {"a", b}
+
+    broken.clear()
+    stats = backfill.backfill(archive)
+    assert (stats.done_docs, stats.skipped_docs, stats.failed) == (1, 2, [])
+    assert set(catalog.all_documents()) == {"a", b, "c"} and rebuilds == [1, 1]
+    assert stats.progress()["remaining"] == 0
+
+
+def test_backfill_rebuilds_indexes_left_pending_by_an_interrupted_run(data_dir, monkeypatch):
+    monkeypatch.setattr(page_cache, "extract_pdf_pages", lambda path: [PageContent(0, f"text of {path.stem} " * 20, [])])
+    archive = data_dir / "archive"
+    archive.mkdir()
+    (archive / "a.pdf").write_bytes(b"a" * 100)
+
+    def crash():
+        raise KeyboardInterrupt  # killed after the last checkpoint, before the rebuild finished
+
+    monkeypatch.setattr(backfill, "rebuild_indexes", crash)
+    try:
+        backfill.backfill(archive)
+    except KeyboardInterrupt:
+        pass
+    assert set(catalog.all_documents()) == {"a"}
+
+    rebuilds = []
+    monkeypatch.setattr(backfill, "rebuild_indexes", lambda: rebuilds.append(1))
+    stats = backfill.backfill(archive)
+    assert (stats.done_docs, stats.skipped_docs) == (0, 1) and rebuilds == [1]
+    # Once published, a run with nothing new leaves the indexes alone
+    backfill.backfill(archive)
+    assert rebuilds == [1]
+
+
+def test_backfill_keeps_same_named_files_in_different_directories_apart(data_dir, monkeypatch):
+    monkeypatch.setattr(backfill, "rebuild_indexes", lambda: None)
+    monkeypatch.setattr(page_cache, "extract_pdf_pages", lambda path: [PageContent(0, path.read_text() * 20, [])])
+    archive = data_dir / "archive"
+    for year in ["2023", "2024"]:
+        (archive / year).mkdir(parents=True)
+        (archive / year / "report.pdf").write_text(f"report for {year} ")
+
+    stats = backfill.backfill(archive)
+    docs = catalog.all_documents()
+    assert stats.done_docs == 2 and len(docs) == 2
+    for year in ["2023", "2024"]:
+        doc_id = backfill.doc_id_for(archive / year / "report.pdf", archive)
+        assert docs[doc_id]["filename"] == f"{doc_id}.pdf" and (data_dir / "docs" / f"{doc_id}.pdf").read_text() == f"report for {year} "
+    assert backfill.backfill(archive).skipped_docs == 2
@@ -0,0 +1,52 @@
+import json
+import threading
+
+import pytest
+
+from backend.index import catalog
+
+
+@pytest.fixture
+def tmp_catalog(tmp_path, monkeypatch):
+    monkeypatch.setattr(catalog, "_DB_PATH", tmp_path / "catalog.sqlite3")
+    monkeypatch.setattr(catalog, "_LEGACY_MANIFEST", tmp_path / "manifest.json")
+    monkeypatch.setattr(catalog, "_LEGACY_CHUNKS_DIR", tmp_path / "chunks")
+    return tmp_path
+
+
+def test_imports_legacy_manifest_once(tmp_catalog):
+    (tmp_catalog / "manifest.json").write_text(
+        json.dumps({"a": {"doc_id": "a", "filename": "a.pdf", "md5": "m1", "pages": 3}}), encoding="utf-8"
+    )
+    (tmp_catalog / "chunks").mkdir()
+    rows = [
+        {"chunk_id": "a::ch1", "doc_id": "a", "text": "x", "page_start": 0, "page_end": 1, "headings_path": ["Intro"]},
+        {"chunk_id": "a::ch2", "doc_id": "a", "text": "y", "page_start": 1, "page_end": 2, "headings_path": []},
+    ]
+    (tmp_catalog / "chunks" / "a.jsonl").write_text("\n".join(json.dumps(r) for r in rows), encoding="utf-8")
+
+    assert catalog.get_document("a")["md5"] == "m1"
+    assert catalog.find_by_md5("m1")[0]["doc_id"] == "a"
+    meta = catalog.get_chunk_meta(["a::ch1", "a::ch2", "missing"])
+    assert meta["a::ch1"]["headings_path"] == ["Intro"]
+    assert set(meta) == {"a::ch1", "a::ch2"}
+    assert catalog.connection().execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_replace_chunks_drops_stale_rows(tmp_catalog):
+    catalog.replace_chunks("d", [{"chunk_id": f"d::ch{i}", "doc_id": "d", "page_start": 0, "page_end": 0} for i in (1, 2, 3)])
+    catalog.replace_chunks("d", [{"chunk_id": "d::ch1", "doc_id": "d", "page_start": 0, "page_end": 0}])
+    assert [c["chunk_id"] for c in catalog.chunks_for_doc("d")] == ["d::ch1"]
+
+
+def test_concurrent_upserts_do_not_lose_updates(tmp_catalog):
+    def worker(n):
+        for i in range(20):
+            catalog.upsert_documents([{"doc_id": f"w{n}-{i}", "filename": "f.pdf", "md5": "m", "pages": 1}])
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(catalog.all_documents()) == 80
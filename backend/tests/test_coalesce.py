@@ -0,0 +1,48 @@
+import asyncio
+
+from backend.models.io import QueryRequest
+from backend.pipeline.coalesce import SingleFlight, request_key
+
+
+def test_concurrent_duplicates_share_one_execution():
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        return "answer"
+
+    async def scenario():
+        sf = SingleFlight()
+        results = await asyncio.gather(*(sf.do("k", work) for _ in range(4)))
+        assert sf.in_flight() == 0
+        later = await sf.do("k", work)  # not overlapping: runs again
+        return results, later
+
+    results, later = asyncio.run(scenario())
+    assert len(calls) == 2
+    assert [r[0] for r in results] == ["answer"] * 4
+    assert [r[1] for r in results].count(False) == 1  # one leader, three shared
+    assert all(r[2] == 3 for r in results)
+    assert later == ("answer", False, 0)
+
+
+def test_errors_propagate_to_waiters():
+    async def boom():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("down")
+
+    async def scenario():
+        sf = SingleFlight()
+        return await asyncio.gather(sf.do("k", boom), sf.do("k", boom), return_exceptions=True)
+
+    out = asyncio.run(scenario())
+    assert all(isinstance(e, RuntimeError) for e in out)
+
+
+def test_request_key_normalizes_query_and_resolves_defaults():
+    a = QueryRequest(query="  What is   RAG? ")
+    b = QueryRequest(query="what is rag?", use_rrf=None)
+    assert request_key(a) == request_key(b)
+    assert request_key(a) != request_key(QueryRequest(query="what is rag?", top_k=5))
+    assert request_key(a) != request_key(QueryRequest(query="what is rag?", mode="list"))
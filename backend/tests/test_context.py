@@ -0,0 +1,44 @@
+from backend.generation.context import assemble_context
+from backend.utils.text import count_tokens
+
+
+def test_budget_and_relevance():
+    filler = " ".join(f"Filler sentence number {i} talks about nothing in particular." for i in range(40))
+    texts = {
+        "a::ch1": filler + " The battery warranty length is eight years. " + filler,
+        "b::ch1": "Little's Law relates queue length to wait time.",
+    }
+    ranked = [("a::ch1", 0.9), ("b::ch1", 0.4)]
+    docs = {"a::ch1": "a", "b::ch1": "b"}
+    passages = assemble_context("battery warranty length", ranked, texts, docs, token_budget=30, window=1)
+    assert sum(count_tokens(p.text) for p in passages) <= 30
+    assert "warranty length is eight years" in passages[0].text
+    assert passages[0].chunk_ids == ["a::ch1"]
+
+
+def test_overlapping_windows_are_merged_and_attributed():
+    shared = "Level 2 charging uses 240 V and delivers up to 19 kW."
+    texts = {
+        "ev::ch1": "Level 1 charging uses a 120 V outlet. " + shared,
+        "ev::ch2": shared + " DC fast charging delivers 50 kW or more.",
+    }
+    ranked = [("ev::ch1", 0.8), ("ev::ch2", 0.7)]
+    docs = {"ev::ch1": "ev", "ev::ch2": "ev"}
+    passages = assemble_context("level 2 charging kW", ranked, texts, docs, token_budget=200)
+    joined = " ".join(p.text for p in passages)
+    assert joined.count(shared) == 1
+    owner = next(p for p in passages if shared in p.text)
+    assert owner.chunk_ids == ["ev::ch1", "ev::ch2"]
+
+
+def test_extractive_answer_picks_matching_sentence_once():
+    from backend.generation.extractive import extractive_answer
+
+    sentence = "The battery warranty length is eight years."
+    texts = {"ev::ch1": "Charging is covered elsewhere. " + sentence, "ev2::ch1": sentence + " Unrelated tail."}
+    ranked = [("ev::ch1", 0.7), ("ev2::ch1", 0.6)]
+    docs = {"ev::ch1": "ev", "ev2::ch1": "ev2"}
+    answer, used = extractive_answer("battery warranty length", ranked, texts, docs, max_sentences=2)
+    assert answer.count(sentence) == 1
+    assert used[0].chunk_ids == ["ev::ch1", "ev2::ch1"]
+    assert extractive_answer("zebra", ranked, texts, docs)[0] == ""
@@ -0,0 +1,41 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from backend.generation import llm
+from backend.utils.deadline import Deadline
+
+
+def test_deadline_budget():
+    unbounded = Deadline(None)
+    assert unbounded.remaining() is None and unbounded.allows(1e9) and unbounded.timeout(5.0) == 5.0
+    d = Deadline(50)
+    assert d.allows(0.01) and not d.allows(1.0)
+    assert d.timeout(cap=10.0) <= 0.05
+    time.sleep(0.06)
+    assert d.expired() and d.timeout() == 0.0
+
+
+def test_hedged_second_request_wins(monkeypatch):
+    calls = []
+    lock = threading.Lock()
+
+    def fake_generate(prompt, temperature=0.1, timeout=None):
+        with lock:
+            n = len(calls)
+            calls.append(timeout)
+        time.sleep(0.5 if n == 0 else 0.01)
+        return llm.Completion(f"answer-{n}")
+
+    monkeypatch.setattr(llm, "complete", fake_generate)
+    out = asyncio.run(llm.generate_answer_hedged("p", timeout=2.0, hedge_after=0.05))
+    assert out == {"text": "answer-1", "usage": {}, "hedged": True, "winner": 1}
+    assert len(calls) == 2
+
+
+def test_hedged_call_times_out(monkeypatch):
+    monkeypatch.setattr(llm, "complete", lambda prompt, temperature=0.1, timeout=None: time.sleep(0.3) or llm.Completion("late"))
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(llm.generate_answer_hedged("p", timeout=0.05))
@@ -0,0 +1,30 @@
+import random
+
+from backend.index.dedup import estimated_jaccard, find_near_duplicates, minhash_signature
+from backend.ingestion.chunk import _window_overlaps
+
+
+random.seed(7)
+VOCAB = [f"w{i}" for i in range(2000)]
+
+
+def _text(n=400):
+    return " ".join(random.choice(VOCAB) for _ in range(n))
+
+
+def test_revision_is_near_duplicate_but_overlapping_windows_are_not():
+    base = _text(1000)
+    words = base.split()
+    revision = " ".join(words[:500] + ["revised"] + words[500:])  # one inserted word
+    windows = _window_overlaps(base, target_tokens=400, overlap_tokens=60)
+
+    assert estimated_jaccard(minhash_signature(base), minhash_signature(revision)) > 0.9
+    assert estimated_jaccard(minhash_signature(windows[0]), minhash_signature(windows[1])) < 0.3
+
+
+def test_find_near_duplicates_keeps_first_occurrence():
+    a, b = _text(), _text()
+    a_rev = a.replace(a.split()[10], "changed", 1)
+    ids = ["a::ch1", "b::ch1", "a-rev::ch1", "nosig::ch1"]
+    sigs = {cid: minhash_signature(t) for cid, t in zip(ids[:3], [a, b, a_rev])}
+    assert find_near_duplicates(ids, sigs, threshold=0.8) == {"a-rev::ch1": "a::ch1"}
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from backend.config import settings
+from backend.index import doc_index, lexical, registry, semantic, snapshot, tombstones
+from backend.index.registry import ChunkRegistry
+
+
+TOPICS = ["battery warranty", "queue utilization", "order quantity", "solar panel", "tax deduction", "heat pump"]
+CORPUS = [(f"d{i}::ch{j}", f"{topic} section {j} details about {topic}") for i, topic in enumerate(TOPICS) for j in range(3)]
+
+
+@pytest.fixture
+def index(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot, "index_dir", lambda: tmp_path)
+    monkeypatch.setattr(snapshot, "_CURRENT_PATH", tmp_path / "CURRENT")
+    monkeypatch.setattr(snapshot, "_SNAPSHOTS_DIR", tmp_path / "snapshots")
+    for module, loader in ((lexical, lexical.load_index), (semantic, semantic.load_embeddings), (registry, registry.load_registry)):
+        monkeypatch.setattr(module, "_CACHE", snapshot.SnapshotCache(loader))
+    monkeypatch.setattr(tombstones, "_PATH", tmp_path / "tombstones.json")
+    monkeypatch.setattr(tombstones, "_state", {"stamp": None, "docs": frozenset()})
+    monkeypatch.setattr(settings, "embedding_provider", "local")
+    monkeypatch.setattr(semantic, "load_index_corpus", lambda: (list(CORPUS), {}))
+    with snapshot.writer() as snap:
+        lexical.save_index(*lexical.build_index(CORPUS), out_dir=snap)
+        semantic.build_embeddings_from_all_chunks(out_dir=snap)
+
+
+def _docs(hits):
+    return {cid.split("::")[0] for cid in registry.get_registry().ids(hits.rows.tolist())}
+
+
+def test_two_stage_search_scores_only_top_documents(index):
+    full = lexical.search("queue utilization", top_k=3)
+    routed = lexical.search("queue utilization", top_k=3, doc_top_m=2)
+    assert routed.rows.tolist() == full.rows.tolist() and _docs(routed) == {"d1"}
+    assert len(lexical.search("queue utilization", top_k=20, doc_top_m=2)) == 6  # two docs' chunks only
+
+    assert _docs(semantic.semantic_search("heat pump", top_k=3, doc_top_m=1)) == {"d5"}
+    tombstones.add(["d5"])
+    assert "d5" not in _docs(semantic.semantic_search("heat pump", top_k=3, doc_top_m=1))
+
+
+def test_doc_rows_group_non_contiguous_rows():
+    reg = ChunkRegistry.from_ids(["a::1", "b::1", "a::2", "c::1", "b::2"])
+    rows = doc_index.doc_rows(reg)
+    assert rows.rows_of(np.array([1])).tolist() == [1, 4]
+    assert rows.rows_of(np.array([2, 0])).tolist() == [0, 2, 3]
+    matrix = np.eye(5, dtype=np.float32)
+    centroids = doc_index.doc_centroids(matrix, reg)
+    assert centroids.shape == (3, 5) and np.allclose(np.linalg.norm(centroids, axis=1), 1.0)
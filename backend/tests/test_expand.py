@@ -0,0 +1,93 @@
+import asyncio
+import threading
+
+from backend.config import settings
+from backend.index.fusion import rrf_many
+from backend.index.registry import Hits
+from backend.models.io import QueryRequest
+from backend.pipeline import stages
+from backend.pipeline.context import QueryContext
+from backend.retrieval import expand
+
+
+def test_variants_are_parsed_and_deduplicated():
+    text = '1. How long is the warranty?\n- "Warranty duration"\n\nhow long is the warranty?\n* Guarantee period'
+    assert expand.parse_variants(text, 3) == ["How long is the warranty?", "Warranty duration", "Guarantee period"]
+    assert expand.deterministic_variants("What is the EOQ formula?") == ["eoq formula"]
+    assert expand.dedupe(["EOQ formula", "eoq  formula", "reorder point"]) == ["EOQ formula", "reorder point"]
+
+
+def test_llm_variants_are_cached_per_normalized_query(monkeypatch):
+    calls = []
+
+    def fake_generate(prompt, temperature=0.0, timeout=None):
+        calls.append(prompt)
+        return "warranty length\nguarantee period"
+
+    monkeypatch.setattr(expand, "generate_answer", fake_generate)
+    monkeypatch.setattr(expand, "_LLM_CACHE", type(expand._LLM_CACHE)())
+    assert expand.llm_variants("How long is the warranty?", 2) == (["warranty length", "guarantee period"], False)
+    assert expand.llm_variants("how long is the  warranty?", 2) == (["warranty length", "guarantee period"], True)
+    assert len(calls) == 1
+
+
+def test_normalized_rrf_tops_out_at_one():
+    same = Hits.of([3, 1], [0.9, 0.5])
+    fused = rrf_many([same, same, same], top_k=2, normalize=True)
+    assert fused.rows.tolist() == [3, 1] and abs(fused.scores[0] - 1.0) < 1e-9
+    assert len(rrf_many([Hits.empty(), Hits.empty()], normalize=True)) == 0
+
+
+def test_expanded_query_retrieves_all_variants_in_one_batch(monkeypatch):
+    batches = []
+
+    def fake_many(queries, top_k=5, version=None, doc_top_m=0):
+        batches.append(list(queries))
+        return [Hits.of([i], [0.5]) for i in range(len(queries))]
+
+    def failing_generate(*_args, **_kwargs):
+        raise RuntimeError("provider down")
+
+    monkeypatch.setattr(settings, "expand_llm_variants", 2)
+    monkeypatch.setattr(expand, "generate_answer", failing_generate)
+    monkeypatch.setattr(stages, "lexical_search_many", fake_many)
+    ctx = QueryContext.from_request(QueryRequest(query="What is the EOQ formula?", semantic=False, llm_expand=True))
+    ctx.rewritten = "what is the eoq formula?"
+    asyncio.run(stages.retrieve(ctx))
+    assert batches == [["what is the eoq formula?", "eoq formula"]]
+    assert sorted(ctx.fused.rows.tolist()) == [0, 1] and ctx.fused.scores.max() <= 1.0
+    # Provider failure degrades to the deterministic variants
+    assert ctx.diagnostics()["expansion"] == {"variants": ["eoq formula"], "llm": "failed"}
+    assert "expansion_llm_failed" in ctx.degraded
+
+
+def test_first_pass_runs_while_llm_variants_are_generated(monkeypatch):
+    batches = []
+    first_pass_done = threading.Event()
+
+    def fake_many(queries, top_k=5, version=None, doc_top_m=0):
+        batches.append(list(queries))
+        first_pass_done.set()
+        return [Hits.of([i], [0.5]) for i in range(len(queries))]
+
+    def fake_single(query, top_k=5, version=None, doc_top_m=0):
+        batches.append([query])
+        return Hits.of([7], [0.5])
+
+    def slow_generate(*_args, **_kwargs):
+        # Only answers once retrieval of the original query has gone ahead without it
+        assert first_pass_done.wait(5)
+        return "economic order quantity\neoq formula"
+
+    monkeypatch.setattr(settings, "expand_llm_variants", 2)
+    monkeypatch.setattr(expand, "generate_answer", slow_generate)
+    monkeypatch.setattr(expand, "_LLM_CACHE", type(expand._LLM_CACHE)())
+    monkeypatch.setattr(stages, "lexical_search_many", fake_many)
+    monkeypatch.setattr(stages, "lexical_search", fake_single)
+    ctx = QueryContext.from_request(QueryRequest(query="What is the EOQ formula?", semantic=False, llm_expand=True))
+    ctx.rewritten = "what is the eoq formula?"
+    asyncio.run(stages.retrieve(ctx))
+    # The second batch holds only the paraphrase the first pass had not searched
+    assert batches == [["what is the eoq formula?", "eoq formula"], ["economic order quantity"]]
+    assert sorted(ctx.fused.rows.tolist()) == [0, 1, 7]
+    assert ctx.diagnostics()["expansion"] == {"variants": ["eoq formula", "economic order quantity"], "llm": "generated"}
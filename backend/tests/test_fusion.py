@@ -1,19 +1,23 @@
 from backend.index.fusion import weighted_sum, rrf
+from backend.index.registry import Hits
 
 
 def test_weighted_sum_basic():
-    lex = [("a", 0.9), ("b", 0.5)]
-    sem = [("b", 0.9), ("c", 0.8)]
+    lex = Hits.of([0, 1], [0.9, 0.5])
+    sem = Hits.of([1, 2], [0.9, 0.8])
     fused = weighted_sum(lex, sem, w_lex=0.5, w_sem=0.5, top_k=3)
-    # b should rank top combining both
-    assert fused[0][0] == "b"
+    # 1 should rank top combining both
+    assert fused.rows[0] == 1
 
 
 def test_rrf_basic():
-    lex = [("a", 0.9), ("b", 0.5), ("c", 0.1)]
-    sem = [("c", 0.95), ("b", 0.6), ("d", 0.2)]
+    lex = Hits.of([0, 1, 2], [0.9, 0.5, 0.1])
+    sem = Hits.of([2, 1, 3], [0.95, 0.6, 0.2])
     fused = rrf(lex, sem, k=60, top_k=4)
-    ids = [cid for cid, _ in fused]
-    assert set(ids) == {"a", "b", "c", "d"}
+    assert set(fused.rows.tolist()) == {0, 1, 2, 3}
 
 
+def test_fusion_handles_empty_lists():
+    lex = Hits.of([4, 2], [0.3, 0.1])
+    assert weighted_sum(lex, Hits.empty(), top_k=5).rows.tolist() == [4, 2]
+    assert len(rrf(Hits.empty(), Hits.empty())) == 0
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from backend.index import catalog, lexical, registry, semantic, snapshot, stats
+
+
+@pytest.fixture
+def built_index(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot, "index_dir", lambda: tmp_path)
+    monkeypatch.setattr(snapshot, "_CURRENT_PATH", tmp_path / "CURRENT")
+    monkeypatch.setattr(snapshot, "_SNAPSHOTS_DIR", tmp_path / "snapshots")
+    for module, loader in ((lexical, lexical.load_index), (semantic, semantic.load_embeddings), (registry, registry.load_registry)):
+        monkeypatch.setattr(module, "_CACHE", snapshot.SnapshotCache(loader))
+    for name in ("chunks_dir", "pages_dir", "index_dir"):
+        monkeypatch.setattr(stats, name, lambda: tmp_path)
+    monkeypatch.setattr(catalog, "all_documents", lambda: {"a": {"pages": 3}, "b": {"pages": 1}})
+    corpus = [("a::ch1", "vector search with tf idf"), ("a::ch2", "sparse matrix rows"), ("b::ch1", "dense embeddings")]
+    with snapshot.writer() as snap:
+        lexical.save_index(*lexical.build_index(corpus), out_dir=snap)
+        semantic.save_embeddings(np.ones((3, 8), dtype=np.float32), [cid for cid, _ in corpus], snap)
+
+
+def test_index_stats_reports_sizes_and_per_document_breakdown(built_index):
+    report = stats.index_stats(per_doc=True)
+    lex, sem = report["lexical"], report["semantic"]
+    assert lex["loaded"] and lex["matrix_shape"][0] == 3 and lex["vocab_terms"] == lex["matrix_shape"][1]
+    assert sem == {"loaded": True, "shape": [3, 8], "dtype": "float32", "mib": stats._mib(96), "mmap": False, "zero_rows": 0}
+    assert report["registry"] == {"chunks": 3, "docs": 2}
+    assert report["caches"]["lexical"] == [report["snapshot"]]
+    assert report["process"]["peak_rss_mib"] > 0
+
+    docs = {d["doc_id"]: d for d in report["documents"]}
+    assert docs["a"]["chunks"] == 2 and docs["a"]["pages"] == 3 and docs["a"]["embedding_bytes"] == 64
+    assert docs["a"]["tfidf_nnz"] + docs["b"]["tfidf_nnz"] == lex["matrix_nnz"]
+
+
+def test_missing_index_and_tracemalloc_off(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot, "index_dir", lambda: tmp_path)
+    monkeypatch.setattr(snapshot, "_CURRENT_PATH", tmp_path / "CURRENT")
+    monkeypatch.setattr(lexical, "_CACHE", snapshot.SnapshotCache(lexical.load_index))
+    assert stats.lexical_stats(None) == {"loaded": False}
+    assert stats.tracemalloc_report() == {"tracing": False}
+    assert stats._module_of("/x/site-packages/scipy/sparse/_csr.py") == "scipy"
+    assert stats._module_of("/repo/backend/index/lexical.py") == "backend.index.lexical"
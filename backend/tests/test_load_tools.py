@@ -0,0 +1,75 @@
+import asyncio
+import os
+import sys
+import threading
+
+import anthropic
+import httpx
+import numpy as np
+import pytest
+import voyageai
+from fastapi import FastAPI
+
+from backend.config import settings
+from backend.generation import llm
+from backend.generation.prompt import build_prompt_blocks
+from backend.index import semantic
+from backend.index.local_embed import embed_local
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "scripts"))
+from load_test import run_step  # noqa: E402
+from stub_providers import Latency, StubConfig, make_server  # noqa: E402
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    server, state = make_server(StubConfig(llm=Latency(5.0), embed=Latency(1.0), embed_dim=64, stream_tokens_per_s=0))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    monkeypatch.setattr(settings, "anthropic_base_url", base)
+    monkeypatch.setattr(settings, "anthropic_api_key", "stub")
+    monkeypatch.setattr(settings, "voyage_base_url", f"{base}/v1")
+    monkeypatch.setattr(settings, "voyage_api_key", "stub")
+    monkeypatch.setattr(voyageai, "api_base", voyageai.api_base)  # restored after the test
+    yield base, state
+    server.shutdown()
+
+
+def test_providers_are_reachable_through_base_url_overrides(stub):
+    base, state = stub
+    vectors = semantic._embed_voyage(["battery warranty", "queue length"], model="voyage-3.5", timeout=5.0)
+    assert np.allclose(vectors, embed_local(["battery warranty", "queue length"], dim=64), atol=1e-6)
+
+    prompt = build_prompt_blocks("qa", "how long?", ["The warranty is eight years. It covers the battery."])
+    first, second = llm.complete(prompt, timeout=5.0), llm.complete(prompt, timeout=5.0)
+    assert first.text == "The warranty is eight years."
+    assert first.usage["cache_creation_input_tokens"] > 0 and second.usage["cache_read_input_tokens"] > 0
+
+    client = anthropic.Anthropic(api_key="stub", base_url=base)
+    events = list(client.messages.create(model="m", max_tokens=10, messages=[{"role": "user", "content": "hi"}], stream=True))
+    text = "".join(e.delta.text for e in events if e.type == "content_block_delta")
+    assert text.strip() == "This is a stub answer." and events[-1].type == "message_stop"
+
+    state.config.llm_error_rate = 1.0
+    with pytest.raises(anthropic.APIStatusError):
+        llm.complete(prompt, timeout=5.0)
+    assert state.counts["errors"] == 1
+
+
+def test_open_loop_keeps_sending_while_requests_are_slow():
+    app = FastAPI()
+
+    @app.post("/query")
+    async def slow_query():
+        await asyncio.sleep(0.2)
+        return {}
+
+    async def go():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://t") as client:
+            return await run_step(client, rps=50, duration_s=0.3, ingest_ratio=0.0, pdfs=[], poisson=False)
+
+    step = asyncio.run(go())
+    report = step.report(slo_ms=100.0)
+    # 14 arrivals in 0.3 s; none waited for the previous one (closed-loop would take 2.8 s)
+    assert report["sent"] == 14 and report["statuses"] == {"200": 14}
+    assert report["p99_ms"] < 1000.0 and report["saturated"] is True
@@ -0,0 +1,18 @@
+import numpy as np
+
+from backend.index.local_embed import embed_local
+
+
+def test_local_embeddings_are_normalised_deterministic_and_batch_consistent():
+    texts = ["Battery warranty covers eight years.", "Queueing delay grows with utilisation.", ""]
+    batch = embed_local(texts, dim=64)
+    assert batch.shape == (3, 64) and batch.dtype == np.float32
+    assert np.allclose(np.linalg.norm(batch[:2], axis=1), 1.0, atol=1e-5)
+    assert not batch[2].any()
+    assert np.allclose(batch[0], embed_local([texts[0]], dim=64)[0], atol=1e-5)
+
+
+def test_local_embeddings_rank_related_text_first():
+    docs = embed_local(["The battery warranty lasts eight years.", "Arrival rates in M/M/1 queues.", "Cats sleep a lot."])
+    query = embed_local(["how long is the batteries warranty"])[0]
+    assert int(np.argmax(docs @ query)) == 0
@@ -0,0 +1,51 @@
+from backend.index import catalog
+from backend.ingestion import chunk, manifest, page_cache, rechunk
+from backend.ingestion.extract import PageContent
+
+
+def _no_pdf(*_args, **_kwargs):
+    raise AssertionError("PDF must not be opened")
+
+
+def test_cached_pages_round_trip_without_reparsing(tmp_path, monkeypatch):
+    monkeypatch.setattr(page_cache, "_PAGES_DIR", tmp_path)
+    pages = [PageContent(0, "1. Intro\nSome text here.", []), PageContent(1, "MORE TEXT\nbody", [])]
+    monkeypatch.setattr(page_cache, "extract_pdf_pages", lambda _p: pages)
+    assert page_cache.extract_pages_cached(tmp_path / "doc.pdf", "abc") == pages
+    assert (tmp_path / "abc.json.gz").exists()
+
+    monkeypatch.setattr(page_cache, "extract_pdf_pages", _no_pdf)
+    loaded = page_cache.extract_pages_cached(tmp_path / "doc.pdf", "abc")
+    assert [p.text for p in loaded] == [p.text for p in pages]
+    # heading candidates are recomputed from the cached text
+    assert loaded[0].heading_candidates[0] == "1. Intro"
+    assert loaded[1].heading_candidates[0] == "MORE TEXT"
+
+
+def test_rechunk_document_uses_only_the_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(page_cache, "_PAGES_DIR", tmp_path)
+    monkeypatch.setattr(page_cache, "extract_pdf_pages", _no_pdf)
+    page_cache.save_pages("m1", [PageContent(0, " ".join(f"w{i}" for i in range(250)), [])])
+
+    doc_id, chunks = rechunk.rechunk_document("d", "m1", target_tokens=100, overlap_ratio=0.1)
+    assert doc_id == "d" and [c.chunk_id for c in chunks] == ["d::ch1", "d::ch2", "d::ch3"]
+    assert rechunk.rechunk_document("e", "not-cached", 100, 0.1) == ("e", None)
+
+
+def test_rechunk_all_in_worker_processes_writes_the_catalog_from_the_parent(tmp_path, monkeypatch):
+    monkeypatch.setattr(catalog, "_DB_PATH", tmp_path / "catalog.sqlite3")
+    monkeypatch.setattr(catalog, "_LEGACY_MANIFEST", tmp_path / "manifest.json")
+    monkeypatch.setattr(catalog, "_LEGACY_CHUNKS_DIR", tmp_path / "legacy")
+    monkeypatch.setattr(chunk, "chunks_dir", lambda: tmp_path / "chunks")
+    monkeypatch.setattr(page_cache, "_PAGES_DIR", tmp_path / "pages")
+    monkeypatch.setattr(page_cache, "extract_pdf_pages", _no_pdf)
+    for i in range(4):
+        page_cache.save_pages(f"m{i}", [PageContent(0, " ".join(f"d{i}w{j}" for j in range(250)), [])])
+        manifest.upsert_document(f"doc{i}", f"doc{i}.pdf", f"m{i}", 1)
+    manifest.upsert_document("gone", "gone.pdf", "not-cached", 1)
+
+    stats = rechunk.rechunk_all(target_tokens=100, overlap_ratio=0.1, workers=2, rebuild=False)
+    assert (stats["docs"], stats["chunks"], stats["missing"]) == (4, 12, ["gone"])
+    for i in range(4):
+        assert [c["chunk_id"] for c in catalog.chunks_for_doc(f"doc{i}")] == [f"doc{i}::ch{n}" for n in (1, 2, 3)]
+    assert catalog.connection().execute("PRAGMA integrity_check").fetchone()[0] == "ok"
@@ -0,0 +1,111 @@
+import asyncio
+
+from backend.config import settings
+from backend.index.registry import ChunkRegistry, Hits
+from backend.models.io import QueryRequest
+from backend.pipeline import context as pctx
+from backend.pipeline import stages
+from backend.pipeline.context import QueryContext
+
+
+def _fail_if_called(*_args, **_kwargs):
+    raise AssertionError("chunk store must not be touched")
+
+
+def test_weak_evidence_exits_before_loading_chunks(monkeypatch):
+    monkeypatch.setattr(pctx, "get_text_map_for_ids", _fail_if_called)
+    monkeypatch.setattr(pctx, "get_meta_map_for_ids", _fail_if_called)
+    registry = ChunkRegistry.from_ids(["a::ch1", "a::ch2", "b::ch1"])
+    monkeypatch.setattr(pctx, "get_registry", lambda version=None: registry)
+
+    # Single source document: the distinct-docs condition cannot be met
+    monkeypatch.setattr(stages, "lexical_search", lambda q, top_k=5, version=None, doc_top_m=0: Hits.of([0, 1], [0.9, 0.8]))
+    req = QueryRequest(query="what is the warranty?", semantic=False)
+    resp = asyncio.run(stages.run_query(QueryContext.from_request(req)))
+    assert resp.error == "insufficient_evidence" and resp.meta["early_exit"] is True
+    assert resp.meta["distinct_docs"] == 1
+
+    # Even full coverage and heading bonuses could not lift the scores over the threshold
+    monkeypatch.setattr(stages, "lexical_search", lambda q, top_k=5, version=None, doc_top_m=0: Hits.of([0, 2], [0.01, 0.001]))
+    req = QueryRequest(query="what is the warranty?", semantic=False, evidence_threshold=0.6)
+    resp = asyncio.run(stages.run_query(QueryContext.from_request(req)))
+    assert resp.error == "insufficient_evidence" and resp.meta["early_exit"] is True
+
+
+def test_request_overrides_do_not_touch_settings():
+    before = settings.evidence_topk
+    ctx = QueryContext.from_request(QueryRequest(query="x", evidence_topk=before + 3))
+    assert ctx.opts.evidence_topk == before + 3
+    assert settings.evidence_topk == before
+
+
+def test_adaptive_routing_skips_semantic_when_lexical_is_decisive(monkeypatch):
+    calls = []
+
+    def fake_semantic(q, top_k=5, timeout=None, version=None, doc_top_m=0):
+        calls.append(q)
+        return Hits.of([2], [0.7])
+
+    monkeypatch.setattr(settings, "route_speculative", False)
+    monkeypatch.setattr(stages, "semantic_search", fake_semantic)
+    monkeypatch.setattr(stages, "lexical_coverage", lambda q, version=None: 1.0)
+
+    monkeypatch.setattr(stages, "lexical_search", lambda q, top_k=5, version=None, doc_top_m=0: Hits.of([0, 1], [0.8, 0.2]))
+    ctx = QueryContext.from_request(QueryRequest(query="EOQ formula", routing="adaptive"))
+    ctx.rewritten = ctx.req.query
+    asyncio.run(stages.retrieve(ctx))
+    assert ctx.route.semantic is False and ctx.route.reason == "lexical_decisive"
+    assert calls == [] and len(ctx.semantic) == 0
+    assert ctx.diagnostics()["route"]["reason"] == "lexical_decisive"
+
+    # Flat lexical scores: semantic is needed and runs after the decision
+    monkeypatch.setattr(stages, "lexical_search", lambda q, top_k=5, version=None, doc_top_m=0: Hits.of([0, 1], [0.5, 0.45]))
+    ctx = QueryContext.from_request(QueryRequest(query="EOQ formula", routing="adaptive"))
+    ctx.rewritten = ctx.req.query
+    asyncio.run(stages.retrieve(ctx))
+    assert ctx.route.reason == "low_margin" and calls == ["EOQ formula"]
+    assert 2 in ctx.fused.rows.tolist()
+
+
+def test_prompt_chunk_numbers_match_citation_order(monkeypatch):
+    registry = ChunkRegistry.from_ids(["a::ch1", "b::ch1", "c::ch1"])
+    texts = {
+        "a::ch1": "Alpha warranty covers the battery for eight years.",
+        "b::ch1": "Beta warranty covers the motor for five years.",
+        "c::ch1": "Gamma warranty covers the paint for two years.",
+    }
+    monkeypatch.setattr(pctx, "get_registry", lambda version=None: registry)
+    monkeypatch.setattr(pctx, "get_text_map_for_ids", lambda cids: {c: texts[c] for c in cids})
+    monkeypatch.setattr(pctx, "get_meta_map_for_ids", lambda cids: {c: {"doc_id": c.split("::")[0]} for c in cids})
+    ctx = QueryContext.from_request(QueryRequest(query="which warranty covers what?", semantic=False))
+    ctx.reranked = Hits.of([2, 0, 1], [0.9, 0.8, 0.7])  # relevance order differs from chunk order
+
+    asyncio.run(stages.assemble(ctx))
+    ctx.answer = "See [Chunk 1]."
+    resp = asyncio.run(stages.respond(ctx))
+    numbered = [block.split("\n", 1)[1].split(" ")[0] for block in ctx.prompt.context.split("[Chunk ")[1:]]
+    assert numbered == ["Alpha", "Beta", "Gamma"]
+    assert [c.doc_id for c in resp.citations] == ["a", "b", "c"]
+    assert resp.meta["context_chunks"] == [["a::ch1"], ["b::ch1"], ["c::ch1"]]
+    ctx.release()
+
+
+def test_provider_failure_keeps_the_diagnostics(monkeypatch):
+    registry = ChunkRegistry.from_ids(["a::ch1", "b::ch1"])
+    monkeypatch.setattr(pctx, "get_registry", lambda version=None: registry)
+    monkeypatch.setattr(pctx, "get_text_map_for_ids", lambda cids: {c: f"Text of {c}." for c in cids})
+    monkeypatch.setattr(pctx, "get_meta_map_for_ids", lambda cids: {c: {"doc_id": c.split("::")[0]} for c in cids})
+
+    async def provider_down(*_args, **_kwargs):
+        raise RuntimeError("overloaded")
+
+    monkeypatch.setattr(stages, "generate_answer_hedged", provider_down)
+    monkeypatch.setattr(stages, "_extractive_response", lambda ctx, reason: None)  # no extractive fallback
+    ctx = QueryContext.from_request(QueryRequest(query="which warranty?", semantic=False, latency_budget_ms=5000))
+    ctx.reranked = Hits.of([0, 1], [0.9, 0.8])
+    asyncio.run(stages.assemble(ctx))
+    resp = asyncio.run(stages.generate(ctx))
+    assert (resp.error, resp.reason) == ("generation_failed", "llm_error")
+    assert resp.meta["degraded"] == ["llm_error"] and "elapsed_ms" in resp.meta
+    assert resp.meta["intent"] is None and resp.meta["context_chunks"] == [["a::ch1"], ["b::ch1"]]
+    ctx.release()
@@ -0,0 +1,62 @@
+import asyncio
+import threading
+import time
+
+from fastapi.concurrency import run_in_threadpool
+
+from backend.utils.profiler import HotStacks, RequestProfile, in_request
+
+
+def _busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        sum(range(200))
+
+
+def test_request_profile_writes_speedscope_samples():
+    with RequestProfile(interval_s=0.001) as prof:
+        _busy(0.1)
+    assert prof.samples > 0
+    doc = prof.to_speedscope("busy")
+    frames = doc["shared"]["frames"]
+    profile = doc["profiles"][0]
+    assert profile["type"] == "sampled" and len(profile["samples"]) == len(profile["weights"]) == prof.samples
+    assert "_busy" in {frames[i]["name"] for s in profile["samples"] for i in s}
+
+
+def _other_request(seconds):
+    _busy(seconds)
+
+
+def test_request_profile_leaves_out_concurrent_requests():
+    other = threading.Thread(target=_other_request, args=(0.3,))
+    other.start()
+
+    async def profiled():
+        with RequestProfile(interval_s=0.001) as prof:
+            await run_in_threadpool(in_request(_busy), 0.1)  # this request's pool work
+            await run_in_threadpool(_other_request, 0.05)  # not marked: someone else's
+            _busy(0.05)  # inline on the event loop
+        return prof
+
+    prof = asyncio.run(profiled())
+    other.join()
+    doc = prof.to_speedscope("busy")
+    names = {doc["shared"]["frames"][i]["name"] for s in doc["profiles"][0]["samples"] for i in s}
+    assert {"_busy", "in_request.<locals>.run"} <= names and any(n.endswith(".<locals>.profiled") for n in names)
+    assert "_other_request" not in names
+    assert in_request(_busy) is _busy  # no profile active: nothing to mark
+
+
+def test_hot_stacks_aggregate_and_bound():
+    hot = HotStacks(hz=500, max_stacks=4)
+    hot.start()
+    _busy(0.1)
+    hot.stop()
+    assert not hot.running and hot.total > 0
+    top = hot.top(3)
+    assert top and "_busy (test_profiler.py" in top[0]["stack"]
+
+    off = HotStacks(hz=0)
+    off.start()
+    assert not off.running
@@ -0,0 +1,70 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from backend.config import settings
+from backend.generation import llm
+from backend.generation.prompt import build_prompt_blocks
+
+
+class _StandIn(BaseHTTPRequestHandler):
+    """Minimal Messages API: records requests, reports a cache write then cache reads."""
+
+    requests = []
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.requests.append({"path": self.path, "beta": self.headers.get("anthropic-beta"), "body": body})
+        first = len(self.requests) == 1
+        usage = {
+            "input_tokens": 12,
+            "output_tokens": 5,
+            "cache_creation_input_tokens": 0 if not first else 1500,
+            "cache_read_input_tokens": 1500 if not first else 0,
+        }
+        out = json.dumps(
+            {
+                "id": "msg_1",
+                "type": "message",
+                "role": "assistant",
+                "model": body["model"],
+                "content": [{"type": "text", "text": "eight years"}],
+                "stop_reason": "end_turn",
+                "stop_sequence": None,
+                "usage": usage,
+            }
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+    def log_message(self, *_args):
+        pass
+
+
+def test_prompt_blocks_are_sent_cacheable_and_usage_is_reported(monkeypatch):
+    server = HTTPServer(("127.0.0.1", 0), _StandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(settings, "anthropic_base_url", f"http://127.0.0.1:{server.server_port}")
+    monkeypatch.setattr(settings, "anthropic_api_key", "test-key")
+    monkeypatch.setattr(settings, "llm_prompt_cache", True)
+    try:
+        prompt = build_prompt_blocks("qa", "battery warranty?", ["The battery warranty is eight years."])
+        first = llm.complete(prompt, timeout=5.0)
+        second = llm.complete(build_prompt_blocks("qa", "how long is it?", ["The battery warranty is eight years."]), timeout=5.0)
+    finally:
+        server.shutdown()
+
+    assert first.text == "eight years"
+    assert first.usage["cache_creation_input_tokens"] == 1500 and second.usage["cache_read_input_tokens"] == 1500
+    req = _StandIn.requests[0]
+    assert "prompt-caching" in req["beta"]
+    assert req["body"]["system"][0]["cache_control"] == {"type": "ephemeral"}
+    context, question = req["body"]["messages"][0]["content"]
+    assert context["cache_control"] == {"type": "ephemeral"} and "cache_control" not in question
+    # Only the question block differs between the two requests
+    assert _StandIn.requests[1]["body"]["system"] == req["body"]["system"]
+    assert _StandIn.requests[1]["body"]["messages"][0]["content"][0] == context
+    assert question["text"] == "Question: battery warranty?"
@@ -0,0 +1,12 @@
+from backend.index.registry import Hits
+from backend.retrieval.router import route_query
+
+
+def test_route_query_reasons():
+    kw = dict(min_top=0.3, min_margin=0.25, min_coverage=1.0)
+    assert route_query(Hits.empty(), 1.0, **kw).reason == "no_lexical_match"
+    assert route_query(Hits.of([0, 1], [0.9, 0.1]), 0.5, **kw).reason == "low_coverage"
+    assert route_query(Hits.of([0, 1], [0.2, 0.01]), 1.0, **kw).reason == "weak_top"
+    assert route_query(Hits.of([0, 1], [0.6, 0.5]), 1.0, **kw).reason == "low_margin"
+    decision = route_query(Hits.of([0, 1], [0.6, 0.3]), 1.0, **kw)
+    assert decision.semantic is False and decision.margin == 0.5
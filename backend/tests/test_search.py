@@ -0,0 +1,85 @@
+import asyncio
+from collections import OrderedDict
+
+import pytest
+
+from backend.index.registry import ChunkRegistry, Hits
+from backend.models.io import SearchRequest
+from backend.pipeline import context as pctx
+from backend.pipeline import search, stages
+from backend.retrieval.snippets import query_terms, snippet
+
+
+def test_snippet_centres_on_query_terms():
+    text = "Intro words. " * 20 + "The battery warranty length is eight years or 160,000 km. " + "Filler. " * 20
+    out, marks = snippet(text, query_terms("What is the battery warranty length?"), max_words=12)
+    assert out.startswith("…") and out.endswith("…") and "eight years" in out
+    assert [out[a:b] for a, b in marks] == ["battery", "warranty", "length"]
+    assert snippet("Short text.", {"absent"}) == ("Short text.", [])
+
+
+@pytest.fixture
+def corpus(monkeypatch):
+    ids = [f"doc{i}::ch1" for i in range(5)]
+    registry = ChunkRegistry.from_ids(ids)
+    texts = {cid: f"Chunk {cid} about battery warranty terms." for cid in ids}
+    monkeypatch.setattr(pctx, "get_registry", lambda version=None: registry)
+    monkeypatch.setattr(pctx, "get_text_map_for_ids", lambda cids: {c: texts[c] for c in cids})
+    monkeypatch.setattr(pctx, "get_meta_map_for_ids", lambda cids: {c: {"doc_id": c.split("::")[0], "page_start": 1, "page_end": 1} for c in cids})
+    monkeypatch.setattr(search, "_RESULTS", OrderedDict())
+    monkeypatch.setattr(search.snapshot, "pin", lambda version=None: version)
+    calls = []
+
+    def fake_lexical(q, top_k=5, version=None, doc_top_m=0):
+        calls.append(q)
+        return Hits.of([0, 1, 2, 3, 4], [0.9, 0.8, 0.7, 0.6, 0.5])
+
+    monkeypatch.setattr(stages, "lexical_search", fake_lexical)
+    return calls
+
+
+def test_cursor_pages_slice_one_ranking(corpus):
+    req = SearchRequest(query="battery warranty", semantic=False, page_size=2)
+    first = asyncio.run(search.run_search(req))
+    assert [h.chunk_id for h in first.results] == ["doc0::ch1", "doc1::ch1"] and first.total == 5
+    assert first.results[0].highlights and first.results[0].pages == "1-1"
+
+    seen = [h.chunk_id for h in first.results]
+    cursor = first.next_cursor
+    while cursor:
+        page = asyncio.run(search.run_search(req.model_copy(update={"cursor": cursor})))
+        assert page.meta["ranking_cached"] is True
+        seen += [h.chunk_id for h in page.results]
+        cursor = page.next_cursor
+    # Scoring ran once; pages neither repeat nor skip
+    assert corpus == ["battery warranty"]
+    assert seen == [f"doc{i}::ch1" for i in range(5)]
+
+
+def test_cursor_errors(corpus, monkeypatch):
+    req = SearchRequest(query="battery warranty", semantic=False, page_size=2)
+    first = asyncio.run(search.run_search(req))
+    with pytest.raises(search.CursorError) as exc:
+        asyncio.run(search.run_search(SearchRequest(query="other", semantic=False, cursor=first.next_cursor)))
+    assert exc.value.reason == "cursor_mismatch"
+    with pytest.raises(search.CursorError) as exc:
+        asyncio.run(search.run_search(req.model_copy(update={"cursor": "not-a-cursor"})))
+    assert exc.value.status == 400
+
+    # A cursor bound to a snapshot that has been garbage-collected has expired
+    stale = search.encode_cursor("19700101T000000.000000000", search.query_key(req), 2)
+    with pytest.raises(search.CursorError) as exc:
+        asyncio.run(search.run_search(req.model_copy(update={"cursor": stale})))
+    assert exc.value.status == 410
+
+    # Cursors are unsigned: a forged version never reaches the filesystem or the caches
+    pinned = []
+    monkeypatch.setattr(search.snapshot, "pin", lambda version=None: pinned.append(version) or version)
+    for forged in ["../..", "/etc", {"x": 1}]:
+        cursor = search.encode_cursor(forged, search.query_key(req), 2)
+        with pytest.raises(search.CursorError) as exc:
+            asyncio.run(search.run_search(req.model_copy(update={"cursor": cursor})))
+        assert (exc.value.reason, exc.value.status) == ("invalid_cursor", 400)
+    with pytest.raises(search.CursorError) as exc:
+        asyncio.run(search.run_search(req.model_copy(update={"cursor": stale})))
+    assert exc.value.status == 410 and pinned == []
@@ -0,0 +1,103 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from backend.index import semantic, snapshot
+from backend.index.registry import save_registry
+from backend.models.io import QueryRequest
+from backend.pipeline.context import QueryContext
+from backend.pipeline.stages import run_query
+
+
+@pytest.fixture
+def tmp_index(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot, "index_dir", lambda: tmp_path)
+    monkeypatch.setattr(snapshot, "_CURRENT_PATH", tmp_path / "CURRENT")
+    monkeypatch.setattr(snapshot, "_SNAPSHOTS_DIR", tmp_path / "snapshots")
+    monkeypatch.setattr(semantic, "_CACHE", snapshot.SnapshotCache(semantic.load_embeddings))
+    return tmp_path
+
+
+def test_publish_carries_over_untouched_files_and_pinned_readers_keep_their_build(tmp_index):
+    with snapshot.writer() as snap:
+        semantic.save_embeddings(np.ones((2, 4), dtype=np.float32), ["a::ch1", "a::ch2"], snap)
+        save_registry(["a::ch1", "a::ch2"], snap)
+    v1 = snapshot.pin()
+    assert semantic.get_embeddings()[1] == ["a::ch1", "a::ch2"]
+
+    with snapshot.writer() as snap:
+        semantic.save_embeddings(np.full((1, 4), 2.0, dtype=np.float32), ["b::ch1"], snap)
+        save_registry(["b::ch1"], snap)
+    v2 = snapshot.current_version()
+    assert v2 > v1
+    assert semantic.get_embeddings(v1)[1] == ["a::ch1", "a::ch2"]
+    assert semantic.get_embeddings()[1] == ["b::ch1"]
+
+    # Embeddings-only rebuild: the registry is carried over (hardlinked) from v2
+    semantic.save_embeddings(np.zeros((1, 4), dtype=np.float32), ["b::ch1"])
+    assert (snapshot.snapshot_path(snapshot.current_version()) / "chunk_ids.json").exists()
+    assert not semantic.get_embeddings()[0].any()
+
+
+def test_carried_over_embeddings_are_aligned_to_the_registry(tmp_index):
+    with snapshot.writer() as snap:
+        semantic.save_embeddings(np.eye(2, dtype=np.float32), ["a::ch1", "a::ch2"], snap)
+        save_registry(["a::ch1", "a::ch2"], snap)
+    with snapshot.writer() as snap:
+        save_registry(["a::ch2", "c::ch1", "a::ch1"], snap)  # lexical-only rebuild
+    matrix, ids = semantic.get_embeddings()
+    assert ids == ["a::ch2", "c::ch1", "a::ch1"]
+    assert matrix.tolist() == [[0, 1], [0, 0], [1, 0]]
+
+
+def test_failed_build_is_discarded_and_old_snapshots_are_collected(tmp_index):
+    for i in range(4):
+        with snapshot.writer() as snap:
+            semantic.save_embeddings(np.zeros((1, 2), dtype=np.float32), [f"d{i}::ch1"], snap)
+            save_registry([f"d{i}::ch1"], snap)
+    current = snapshot.current_version()
+    with pytest.raises(RuntimeError):
+        with snapshot.writer() as snap:
+            (snap / "embeddings.npy").write_bytes(b"partial")
+            raise RuntimeError("build failed")
+
+    assert snapshot.current_version() == current
+    assert snapshot.list_versions()[-1] == current
+    assert len(snapshot.list_versions()) == 3
+    assert semantic.get_embeddings()[1] == ["d3::ch1"]
+
+
+def test_gc_keeps_snapshots_pinned_by_in_flight_readers(tmp_index, monkeypatch):
+    monkeypatch.setattr(snapshot, "_PINS", {})
+    with snapshot.writer() as snap:
+        save_registry(["a::ch1"], snap)
+    reader = snapshot.pin()
+    with snapshot.writer() as snap:
+        save_registry(["b::ch1"], snap)
+    assert snapshot.gc(keep=1) == [] and reader in snapshot.list_versions()
+
+    # A second reader (a /search cursor) holds it too; it goes once both are done
+    assert snapshot.pin(reader) == reader
+    snapshot.release(reader)
+    assert snapshot.gc(keep=1) == []
+    snapshot.release(reader)
+    assert snapshot.gc(keep=1) == [reader]
+    assert snapshot.list_versions() == [snapshot.current_version()]
+
+
+def test_query_pin_is_released_when_the_pipeline_ends(tmp_index, monkeypatch):
+    monkeypatch.setattr(snapshot, "_PINS", {})
+    with snapshot.writer() as snap:
+        save_registry(["a::ch1"], snap)
+    ctx = QueryContext.from_request(QueryRequest(query="battery warranty"))
+    assert snapshot._PINS == {ctx.snapshot: 1}
+
+    async def failing(_ctx):
+        raise RuntimeError("stage crashed")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(run_query(ctx, [failing]))
+    assert snapshot._PINS == {}
+    ctx.release()  # idempotent: never drops another reader's pin
+    assert snapshot._PINS == {}
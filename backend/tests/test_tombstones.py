@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+from backend.config import settings
+from backend.index import compact, lexical, registry, semantic, snapshot, tombstones
+from backend.ingestion import service
+
+
+CORPUS = [
+    ("a::ch1", "battery warranty eight years"),
+    ("a::ch2", "charging levels and battery care"),
+    ("b::ch1", "battery recycling programme"),
+]
+
+
+@pytest.fixture
+def index(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot, "index_dir", lambda: tmp_path)
+    monkeypatch.setattr(snapshot, "_CURRENT_PATH", tmp_path / "CURRENT")
+    monkeypatch.setattr(snapshot, "_SNAPSHOTS_DIR", tmp_path / "snapshots")
+    for module, loader in ((lexical, lexical.load_index), (semantic, semantic.load_embeddings), (registry, registry.load_registry)):
+        monkeypatch.setattr(module, "_CACHE", snapshot.SnapshotCache(loader))
+    monkeypatch.setattr(tombstones, "_PATH", tmp_path / "tombstones.json")
+    monkeypatch.setattr(tombstones, "_state", {"stamp": None, "docs": frozenset()})
+    monkeypatch.setattr(settings, "embedding_provider", "local")
+    monkeypatch.setattr(semantic, "load_index_corpus", lambda: (list(CORPUS), {}))
+    monkeypatch.setattr(compact, "get_document", lambda doc_id: None)  # deleted from the catalog
+    with snapshot.writer() as snap:
+        lexical.save_index(*lexical.build_index(CORPUS), out_dir=snap)
+        semantic.build_embeddings_from_all_chunks(out_dir=snap)
+    return tmp_path
+
+
+def _docs(hits):
+    return {registry.get_registry().chunk_ids[r].split("::")[0] for r in hits.rows.tolist()}
+
+
+def test_tombstoned_rows_are_hidden_then_compacted_away(index):
+    assert _docs(lexical.search("battery", top_k=5)) == {"a", "b"}
+    tombstones.add(["a"])
+    assert _docs(lexical.search("battery", top_k=5)) == {"b"}
+    assert _docs(semantic.semantic_search("battery warranty", top_k=5)) == {"b"}
+
+    result = compact.compact(tombstones.deleted())
+    tombstones.discard(["a"])
+    assert result == {"rows_before": 3, "rows_after": 1, "docs": ["a"]}
+    assert registry.get_registry().chunk_ids == ["b::ch1"]
+    matrix, ids = semantic.get_embeddings()
+    assert ids == ["b::ch1"] and matrix.shape[0] == 1 and matrix.any()
+    assert _docs(lexical.search("battery", top_k=5)) == {"b"}
+
+
+def test_rebuild_reuses_embeddings_of_unchanged_text(index, monkeypatch):
+    embedded = []
+    real = semantic.embed_texts
+    monkeypatch.setattr(semantic, "embed_texts", lambda texts, model=None, timeout=None: embedded.extend(texts) or real(texts))
+    changed = CORPUS[:2] + [("b::ch1", "battery recycling programme, revised")]
+    monkeypatch.setattr(semantic, "load_index_corpus", lambda: (changed, {}))
+    before, _ = semantic.get_embeddings()
+    semantic.build_embeddings_from_all_chunks()
+    after, _ = semantic.get_embeddings()
+    assert embedded == ["battery recycling programme, revised"]
+    assert np.allclose(before[:2], after[:2]) and not np.allclose(before[2], after[2])
+
+
+def test_compaction_keeps_a_document_re_ingested_after_the_dead_set_was_read(index, monkeypatch):
+    tombstones.add(["a"])
+
+    def reupload_meanwhile(dead):
+        # Runs between compact_deleted reading the tombstones and taking the writer lock:
+        # "a" is uploaded again, published in a fresh snapshot and its tombstone cleared
+        assert dead == {"a"}
+        monkeypatch.setattr(compact, "get_document", lambda doc_id: {"doc_id": doc_id} if doc_id == "a" else None)
+        with snapshot.writer() as snap:
+            lexical.save_index(*lexical.build_index(CORPUS), out_dir=snap)
+            semantic.build_embeddings_from_all_chunks(out_dir=snap)
+        tombstones.discard(["a"])
+        published.append(snapshot.current_version())
+        return False
+
+    monkeypatch.setattr(compact, "orphans_near_duplicates", reupload_meanwhile)
+    published = []
+    result = service.compact_deleted()
+    assert result == {"compacted": False, "rebuild": False, "rows_before": 3, "rows_after": 3, "docs": []}
+    assert snapshot.current_version() == published[0]  # nothing sliced out of the re-upload
+    assert registry.get_registry().chunk_ids == ["a::ch1", "a::ch2", "b::ch1"]
+    assert _docs(lexical.search("battery", top_k=5)) == {"a", "b"}
@@ -0,0 +1,47 @@
+import asyncio
+import hashlib
+
+import pytest
+
+from backend.ingestion.upload import store_upload
+
+
+class FakeUpload:
+    def __init__(self, filename, data):
+        self.filename = filename
+        self._data = data
+        self._pos = 0
+        self.reads = []
+
+    async def read(self, size=-1):
+        self.reads.append(size)
+        chunk = self._data[self._pos : self._pos + size]
+        self._pos += len(chunk)
+        return chunk
+
+
+def test_store_upload_streams_in_chunks_and_hashes_in_one_pass(tmp_path):
+    data = bytes(range(256)) * 1000
+    upload = FakeUpload("../../etc/report.pdf", data)
+    stored = asyncio.run(store_upload(upload, dest_dir=tmp_path, chunk_size=4096))
+
+    assert stored.path == tmp_path / "report.pdf"
+    assert stored.path.read_bytes() == data
+    assert stored.md5 == hashlib.md5(data).hexdigest() and stored.size == len(data)
+    assert set(upload.reads) == {4096}
+    assert [p.name for p in tmp_path.iterdir()] == ["report.pdf"]
+
+
+def test_failed_upload_leaves_existing_document_untouched(tmp_path):
+    (tmp_path / "doc.pdf").write_bytes(b"old")
+
+    class Broken(FakeUpload):
+        async def read(self, size=-1):
+            if self._pos:
+                raise ConnectionError("client went away")
+            return await super().read(size)
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(store_upload(Broken("doc.pdf", b"x" * 10000), dest_dir=tmp_path, chunk_size=1000))
+    assert [p.name for p in tmp_path.iterdir()] == ["doc.pdf"]
+    assert (tmp_path / "doc.pdf").read_bytes() == b"old"
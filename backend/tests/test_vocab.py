@@ -0,0 +1,73 @@
+import json
+
+import joblib
+import numpy as np
+import pytest
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from backend.index import lexical, snapshot
+from backend.index.vocab import from_vectorizer, save_vocabulary, load_vocabulary
+
+
+CORPUS = [
+    "The warranty covers the battery for eight years or 160,000 km.",
+    "Little's Law relates the average number of items in a queue to arrival rate and wait time.",
+    "Économie d'énergie: HVAC efficiency measures and the EOQ formula are covered here.",
+    "Graph databases store nodes and edges; pattern matching finds sub-graphs.",
+]
+
+QUERIES = [
+    "what is the battery warranty length?",
+    "Little's law wait time",
+    "énergie HVAC",
+    "the and of",  # stop words only
+    "unseen vocabulary entirely",
+]
+
+
+def test_transform_matches_sklearn(tmp_path):
+    vectorizer = TfidfVectorizer(ngram_range=(1, 2), stop_words="english", norm="l2")
+    vectorizer.fit(CORPUS)
+    vocab, order = from_vectorizer(vectorizer)
+    save_vocabulary(vocab, tmp_path / "tfidf_vocab")
+    loaded = load_vocabulary(tmp_path / "tfidf_vocab")
+
+    expected = vectorizer.transform(QUERIES + CORPUS).toarray()[:, order]
+    got = loaded.transform(QUERIES + CORPUS).toarray()
+    assert got.shape == expected.shape
+    assert np.allclose(got, expected)
+
+
+def test_lookup_roundtrip():
+    vectorizer = TfidfVectorizer(ngram_range=(1, 2), stop_words="english").fit(CORPUS)
+    vocab, order = from_vectorizer(vectorizer)
+    names = vectorizer.get_feature_names_out()[order]
+    for col, term in enumerate(names):
+        assert vocab.lookup(term) == col
+    assert vocab.lookup("zzz-not-a-term") == -1
+
+
+def test_legacy_pickled_vectorizer_is_converted_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot, "_SNAPSHOTS_DIR", tmp_path / "snapshots")
+    legacy = tmp_path / "index"
+    legacy.mkdir()
+    vectorizer = TfidfVectorizer(ngram_range=(1, 2), stop_words="english", norm="l2")
+    sparse.save_npz(legacy / "tfidf_matrix.npz", vectorizer.fit_transform(CORPUS))
+    joblib.dump(vectorizer, legacy / "tfidf_vectorizer.pkl")
+    (legacy / "tfidf_ids.json").write_text(json.dumps([f"d{i}::ch1" for i in range(len(CORPUS))]))
+
+    vocab, matrix, ids = lexical.load_index(legacy)
+    assert ids == ["d0::ch1", "d1::ch1", "d2::ch1", "d3::ch1"]
+    assert np.allclose(vocab.transform(CORPUS).toarray(), matrix.toarray())
+    # Converted in place: later loads no longer need the pickle
+    (legacy / "tfidf_vectorizer.pkl").unlink()
+    assert lexical.load_index(legacy)[0].lookup("battery") == vocab.lookup("battery") >= 0
+
+
+def test_matrix_without_vocabulary_is_an_error_not_an_empty_index(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        lexical.load_index(tmp_path)  # nothing built yet
+    sparse.save_npz(tmp_path / "tfidf_matrix.npz", sparse.csr_matrix(np.eye(2)))
+    with pytest.raises(RuntimeError, match="no vocabulary"):
+        lexical.load_index(tmp_path)
@@ -0,0 +1,90 @@
+import asyncio
+import threading
+
+import httpx
+import numpy as np
+import pytest
+
+from backend.app import app
+from backend.config import settings
+from backend.index import catalog, chunkio, lexical, registry, warmup
+
+
+@pytest.fixture
+def fresh_warmup(monkeypatch):
+    monkeypatch.setattr(warmup, "_READY", threading.Event())
+    monkeypatch.setattr(warmup, "_STATUS", {})
+    monkeypatch.setattr(settings, "use_semantic", False)
+    monkeypatch.setattr(settings, "doc_route_top_m", 0)
+    monkeypatch.setattr(registry, "get_registry", lambda *a: None)
+    monkeypatch.setattr(catalog, "all_documents", lambda: {"a": {}, "b": {}})
+    monkeypatch.setattr(chunkio, "preload_chunk_store", lambda: 2)
+
+
+def _get_ready():
+    async def go():
+        # ASGITransport skips the lifespan, so warm-up only runs when the test starts it
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://t") as client:
+            return await client.get("/ready")
+
+    return asyncio.run(go())
+
+
+def test_ready_is_503_until_warm_up_finishes_then_200(fresh_warmup, monkeypatch):
+    release = threading.Event()
+
+    def slow_index(*_args):
+        release.wait(5)
+        return None, np.zeros((3, 2)), ["a::ch1", "a::ch2", "b::ch1"]
+
+    monkeypatch.setattr(lexical, "get_index", slow_index)
+    assert _get_ready().status_code == 503
+
+    thread = warmup.start_background_warm_up()
+    response = _get_ready()
+    assert response.status_code == 503 and response.json() == {"ready": False}
+
+    release.set()
+    thread.join(5)
+    response = _get_ready()
+    assert response.status_code == 200
+    body = response.json()
+    assert body["ready"] is True and body["lexical"] == {"loaded": True, "chunks": 3}
+    assert body["catalog"] == {"docs": 2} and body["chunk_store"] == {"docs": 2}
+
+
+def test_warm_up_failure_is_reported_not_left_hanging(fresh_warmup, monkeypatch):
+    def broken_index(*_args):
+        raise ValueError("matrix.npz is truncated")
+
+    monkeypatch.setattr(lexical, "get_index", broken_index)
+    thread = warmup.start_background_warm_up()
+    thread.join(5)
+    assert not thread.is_alive()
+
+    response = _get_ready()
+    assert response.status_code == 503
+    assert response.json() == {"ready": False, "error": "matrix.npz is truncated"}
+
+
+def test_missing_indexes_do_not_block_readiness(fresh_warmup, monkeypatch):
+    def nothing_ingested(*_args):
+        raise FileNotFoundError("no snapshot")
+
+    monkeypatch.setattr(lexical, "get_index", nothing_ingested)
+    assert warmup.warm_up()["lexical"] == {"loaded": False}
+    assert _get_ready().status_code == 200
+
+
+def test_debug_introspection_is_hidden_unless_profiling_is_enabled(monkeypatch):
+    monkeypatch.setattr(settings, "profile_enabled", False)
+    monkeypatch.setattr(settings, "debug", False)
+
+    async def go(path):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://t") as client:
+            return await client.get(path)
+
+    for path in ["/debug/index-stats?trace=true", "/debug/hot-stacks"]:
+        assert asyncio.run(go(path)).status_code == 404
+    monkeypatch.setattr(settings, "profile_enabled", True)
+    assert asyncio.run(go("/debug/hot-stacks")).status_code == 200
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import time
+
+
+class Deadline:
+    """Per-request latency budget measured on the monotonic clock.
+
+    A budget of None (or <= 0) means unbounded: every check passes and timeouts are None.
+    """
+
+    def __init__(self, budget_ms: float | None = None) -> None:
+        self.started = time.monotonic()
+        self.budget_ms = budget_ms if budget_ms and budget_ms > 0 else None
+        self._end = None if self.budget_ms is None else self.started + self.budget_ms / 1000.0
+
+    @property
+    def bounded(self) -> bool:
+        return self._end is not None
+
+    def remaining(self) -> float | None:
+        """Seconds left (never negative), or None when unbounded."""
+        if self._end is None:
+            return None
+        return max(0.0, self._end - time.monotonic())
+
+    def expired(self) -> bool:
+        return self._end is not None and time.monotonic() >= self._end
+
+    def allows(self, seconds: float) -> bool:
+        """True if a stage expected to take `seconds` still fits in the budget."""
+        left = self.remaining()
+        return left is None or left >= seconds
+
+    def timeout(self, cap: float | None = None, reserve: float = 0.0) -> float | None:
+        """Timeout for a blocking call: remaining budget minus `reserve`, capped at `cap`."""
+        left = self.remaining()
+        if left is None:
+            return cap
+        left = max(0.0, left - reserve)
+        return left if cap is None else min(cap, left)
+
+    def elapsed_ms(self) -> float:
+        return (time.monotonic() - self.started) * 1000.0
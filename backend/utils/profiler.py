@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+from collections import Counter
+from contextvars import ContextVar
+from pathlib import Path
+from types import FrameType
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple, TypeVar
+import functools
+import os
+import sys
+import threading
+import time
+
+
+# A frame is identified by function, file and first line so samples of one function merge
+FrameKey = Tuple[str, str, int]
+Stack = Tuple[FrameKey, ...]
+
+_BACKEND_DIR = str(Path(__file__).resolve().parents[1]) + os.sep
+
+T = TypeVar("T")
+
+
+def _stack(frame: FrameType | None) -> Stack:
+    out: List[FrameKey] = []
+    while frame is not None:
+        code = frame.f_code
+        out.append((getattr(code, "co_qualname", code.co_name), code.co_filename, code.co_firstlineno))
+        frame = frame.f_back
+    out.reverse()  # root -> leaf
+    return tuple(out)
+
+
+def _is_app_stack(stack: Stack) -> bool:
+    # Idle event-loop and pool threads never have a backend frame; profiler threads are excluded by id
+    return any(f[1].startswith(_BACKEND_DIR) for f in stack)
+
+
+def _descends_from(frame: FrameType | None, root: FrameType) -> bool:
+    while frame is not None:
+        if frame is root:
+            return True
+        frame = frame.f_back
+    return False
+
+
+class Sampler:
+    """Background thread that samples every other thread's Python stack at a fixed interval.
+
+    Only stacks running backend code, on threads `accept(thread_id, frame)` lets through
+    (all by default), are passed to `on_sample`. Sampling reads `sys._current_frames()`,
+    so the profiled code is not instrumented.
+    """
+
+    def __init__(
+        self,
+        interval_s: float,
+        on_sample: Callable[[Stack], None],
+        accept: Callable[[int, FrameType], bool] | None = None,
+    ) -> None:
+        self.interval_s = interval_s
+        self._on_sample = on_sample
+        self._accept = accept
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self) -> "Sampler":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval_s):
+            for tid, frame in sys._current_frames().items():
+                if tid == own or (self._accept is not None and not self._accept(tid, frame)):
+                    continue
+                stack = _stack(frame)
+                if _is_app_stack(stack):
+                    self._on_sample(stack)
+
+
+def to_speedscope(name: str, stacks: Iterable[Tuple[Stack, float]], unit: str = "milliseconds") -> Dict[str, Any]:
+    """Build a speedscope "sampled" profile from (stack, weight) pairs."""
+    frame_index: Dict[FrameKey, int] = {}
+    samples: List[List[int]] = []
+    weights: List[float] = []
+    for stack, weight in stacks:
+        samples.append([frame_index.setdefault(f, len(frame_index)) for f in stack])
+        weights.append(weight)
+    frames = [{"name": n, "file": file, "line": line} for (n, file, line) in frame_index]
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": name,
+        "exporter": "backend.utils.profiler",
+        "shared": {"frames": frames},
+        "profiles": [
+            {
+                "type": "sampled",
+                "name": name,
+                "unit": unit,
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            }
+        ],
+    }
+
+
+# The RequestProfile of the request running in this context, if it is being profiled
+_ACTIVE: ContextVar[Optional["RequestProfile"]] = ContextVar("request_profile", default=None)
+
+
+def in_request(func: Callable[..., T]) -> Callable[..., T]:
+    """`func`, marked as the current request's work for the worker thread that will run it.
+
+    Wrap what a profiled request hands to a thread pool; without an active RequestProfile
+    this returns `func` itself.
+    """
+    prof = _ACTIVE.get()
+    if prof is None:
+        return func
+
+    @functools.wraps(func)
+    def run(*args: Any, **kwargs: Any) -> T:
+        tid = threading.get_ident()
+        with prof._lock:
+            prof._threads.add(tid)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            with prof._lock:
+                prof._threads.discard(tid)
+
+    return run
+
+
+class RequestProfile:
+    """Sample stacks for the duration of a `with` block (one request).
+
+    Only the request's own work is sampled: frames below the one that entered the block
+    (on the event loop, the request's coroutine while it runs) and pool threads while they
+    run a function wrapped with `in_request`. Concurrent requests stay out of the profile.
+    """
+
+    def __init__(self, interval_s: float = 0.002) -> None:
+        self.interval_s = interval_s
+        self._stacks: List[Stack] = []
+        self._sampler = Sampler(interval_s, self._stacks.append, self._accept)
+        self._lock = threading.Lock()
+        self._threads: Set[int] = set()
+        self._root: FrameType | None = None
+        self.elapsed_s = 0.0
+
+    def __enter__(self) -> "RequestProfile":
+        self._root = sys._getframe(1)
+        self._token = _ACTIVE.set(self)
+        self._started = time.perf_counter()
+        self._sampler.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._sampler.stop()
+        self.elapsed_s = time.perf_counter() - self._started
+        _ACTIVE.reset(self._token)
+        self._root = None
+
+    def _accept(self, tid: int, frame: FrameType) -> bool:
+        with self._lock:
+            if tid in self._threads:
+                return True
+        return self._root is not None and _descends_from(frame, self._root)
+
+    @property
+    def samples(self) -> int:
+        return len(self._stacks)
+
+    def to_speedscope(self, name: str) -> Dict[str, Any]:
+        interval_ms = self.interval_s * 1000.0
+        return to_speedscope(name, ((s, interval_ms) for s in self._stacks))
+
+
+class HotStacks:
+    """Low-rate, always-on sampling aggregated into counts per stack.
+
+    Keeps at most `max_stacks` distinct stacks; when full, the rarer half is dropped.
+    """
+
+    def __init__(self, hz: float, max_stacks: int = 5000) -> None:
+        self.hz = hz
+        self.max_stacks = max_stacks
+        self.total = 0
+        self._counts: Counter[Stack] = Counter()
+        self._lock = threading.Lock()
+        self._sampler: Sampler | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._sampler is not None
+
+    def start(self) -> None:
+        if self.hz > 0 and self._sampler is None:
+            self._sampler = Sampler(1.0 / self.hz, self._add).start()
+
+    def stop(self) -> None:
+        if self._sampler is not None:
+            self._sampler.stop()
+            self._sampler = None
+
+    def _add(self, stack: Stack) -> None:
+        with self._lock:
+            self.total += 1
+            self._counts[stack] += 1
+            if len(self._counts) > self.max_stacks:
+                self._counts = Counter(dict(self._counts.most_common(self.max_stacks // 2)))
+
+    def top(self, limit: int = 20) -> List[Dict[str, Any]]:
+        with self._lock:
+            common = self._counts.most_common(limit)
+            total = max(1, self.total)
+        return [
+            {"stack": ";".join(f"{n} ({os.path.basename(file)}:{line})" for n, file, line in stack), "count": c, "share": round(c / total, 4)}
+            for stack, c in common
+        ]
+
+    def to_speedscope(self, name: str = "hot stacks") -> Dict[str, Any]:
+        with self._lock:
+            items = list(self._counts.items())
+        return to_speedscope(name, ((s, float(c)) for s, c in items), unit="none")
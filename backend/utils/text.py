@@ -4,6 +4,7 @@ import re
 
 
 _RE_WS = re.compile(r"\s+")
+_RE_SENT_END = re.compile(r"(?<=[.!?])\s+")
 
 
 def normalize_whitespace(text: str) -> str:
@@ -24,3 +25,6 @@ def tail_words(text: str, max_words: int) -> str:
     return " ".join(words[-max_words:])
 
 
+def split_sentences(text: str) -> list[str]:
+    s = _RE_SENT_END.split(text.strip()) if text else []
+    return [t.strip() for t in s if t.strip()]
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import json
+import os
+import statistics
+import sys
+import time
+
+from backend.index.fusion import weighted_sum
+from backend.index.lexical import query_coverage, search as lexical_search
+from backend.index.registry import Hits
+from backend.index.semantic import semantic_search
+from backend.retrieval.rewrite import deterministic_rewrite
+from backend.retrieval.router import route_query
+
+sys.path.insert(0, os.path.dirname(__file__))
+from run_eval import QUERIES  # noqa: E402
+
+
+# Offline benchmark of adaptive routing against the current index snapshot: for each eval
+# query, time lexical and semantic retrieval, record the router's decision, and compare the
+# fused top-k with and without semantic. Run after ingesting the corpus:
+#   PYTHONPATH=$PWD python scripts/bench_routing.py
+TOP_K = int(os.environ.get("TOP_K", "12"))
+EVIDENCE_K = int(os.environ.get("EVIDENCE_TOPK", "4"))
+
+
+def _ms(fn, *args, **kwargs):
+    start = time.perf_counter()
+    out = fn(*args, **kwargs)
+    return out, (time.perf_counter() - start) * 1000.0
+
+
+def _semantic(query: str) -> Hits:
+    try:
+        return semantic_search(query, top_k=TOP_K)
+    except FileNotFoundError:
+        return Hits.empty()  # embeddings not built: semantic contributes nothing
+
+
+def main() -> None:
+    rows = []
+    for body in QUERIES:
+        query = deterministic_rewrite(body["query"])
+        lex, lex_ms = _ms(lexical_search, query, top_k=TOP_K)
+        sem, sem_ms = _ms(_semantic, query)
+        decision = route_query(lex, query_coverage(query))
+        both = weighted_sum(lex, sem, top_k=TOP_K)
+        routed = both if decision.semantic else weighted_sum(lex, lex, top_k=TOP_K)
+        full = set(both.rows.tolist())
+        head = set(both.rows[:EVIDENCE_K].tolist())
+        rows.append(
+            {
+                "query": body["query"][:60],
+                "semantic": decision.semantic,
+                "reason": decision.reason,
+                "lexical_ms": round(lex_ms, 2),
+                "semantic_ms": round(sem_ms, 2),
+                "saved_ms": 0.0 if decision.semantic else round(sem_ms, 2),
+                f"recall@{TOP_K}": len(full & set(routed.rows.tolist())) / max(1, len(full)),
+                f"recall@{EVIDENCE_K}": len(head & set(routed.rows[:EVIDENCE_K].tolist())) / max(1, len(head)),
+            }
+        )
+
+    skipped = [r for r in rows if not r["semantic"]]
+    summary = {
+        "queries": len(rows),
+        "semantic_skipped": len(skipped),
+        "mean_semantic_ms": round(statistics.mean(r["semantic_ms"] for r in rows), 2),
+        "mean_saved_ms_per_query": round(statistics.mean(r["saved_ms"] for r in rows), 2),
+        f"mean_recall@{TOP_K}": round(statistics.mean(r[f"recall@{TOP_K}"] for r in rows), 3),
+        f"mean_recall@{EVIDENCE_K}": round(statistics.mean(r[f"recall@{EVIDENCE_K}"] for r in rows), 3),
+        f"skipped_recall@{EVIDENCE_K}": round(statistics.mean(r[f"recall@{EVIDENCE_K}"] for r in skipped), 3) if skipped else None,
+    }
+    for r in rows:
+        print(json.dumps(r, ensure_ascii=False))
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -18,4 +18,5 @@ paths = save_index(vectorizer, matrix, saved_ids)
 print("Index saved:", paths)
 
 print("Query: methods")
-print("Results:", search("methods", top_k=3))
+hits = search("methods", top_k=3)
+print("Results:", [(saved_ids[row], score) for row, score in hits.pairs()])
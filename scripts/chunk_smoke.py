@@ -15,4 +15,4 @@ chunks = build_chunks(doc_id="smoke-pdf", pages=pages, target_tokens=60, overlap
 print(f"Built {len(chunks)} chunks. Example: {chunks[0].chunk_id if chunks else N/A}")
 paths = persist_chunks("smoke-pdf", chunks)
 print("Wrote:", paths)
-print("Chunk files present:", (chunks_dir() / "smoke-pdf.jsonl").exists())
+print("Chunk files present:", (chunks_dir() / "smoke-pdf.texts.json").exists())
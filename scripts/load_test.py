@@ -0,0 +1,300 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import httpx
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(__file__))
+from run_eval import QUERIES  # noqa: E402
+from stub_providers import Latency, StubConfig, make_server  # noqa: E402
+
+
+# Open-loop load generator for capacity planning. Requests are fired on a Poisson (or
+# uniform) schedule at each target rate, whether or not earlier ones have finished, and
+# latency is measured from the scheduled send time, so a slow server shows up as tail
+# latency instead of silently lowering the offered load. Typical run, with the provider
+# stand-ins and one API server per worker count:
+#   PYTHONPATH=$PWD python scripts/load_test.py --stub --workers 1,2,4 --rps 2,5,10,20 --duration 20
+# or against an already running API:
+#   PYTHONPATH=$PWD python scripts/load_test.py --base http://localhost:8000 --rps 5,10
+
+
+@dataclass
+class Sample:
+    kind: str  # "query" | "ingest"
+    status: int  # HTTP status; 0 = client-side timeout or connection error
+    latency_ms: float
+
+
+@dataclass
+class Step:
+    offered_rps: float
+    duration_s: float
+    samples: List[Sample] = field(default_factory=list)
+    dropped: int = 0  # arrivals not sent because --max-outstanding requests were pending
+
+    def report(self, slo_ms: float) -> Dict[str, Any]:
+        ok = [s.latency_ms for s in self.samples if s.status == 200]
+        statuses: Dict[str, int] = {}
+        for s in self.samples:
+            statuses[str(s.status)] = statuses.get(str(s.status), 0) + 1
+        lat = np.asarray(ok) if ok else np.zeros(1)
+        sent = len(self.samples) + self.dropped
+        out = {
+            "offered_rps": self.offered_rps,
+            "throughput_rps": round(len(ok) / self.duration_s, 2),
+            "sent": sent,
+            "ok": len(ok),
+            "statuses": statuses,
+            "dropped": self.dropped,
+            "p50_ms": round(float(np.percentile(lat, 50)), 1),
+            "p95_ms": round(float(np.percentile(lat, 95)), 1),
+            "p99_ms": round(float(np.percentile(lat, 99)), 1),
+            "max_ms": round(float(lat.max()), 1),
+            "by_kind_p99_ms": {
+                kind: round(float(np.percentile([s.latency_ms for s in self.samples if s.kind == kind and s.status == 200], 99)), 1)
+                for kind in {s.kind for s in self.samples if s.status == 200}
+            },
+        }
+        # Saturated: it no longer keeps up with the offered rate, sheds or fails, or misses the SLO
+        error_rate = 1.0 - len(ok) / sent if sent else 0.0
+        out["saturated"] = bool(
+            out["throughput_rps"] < 0.9 * self.offered_rps or error_rate > 0.05 or out["p99_ms"] > slo_ms
+        )
+        return out
+
+
+def _arrivals(rps: float, duration_s: float, poisson: bool, rng: random.Random) -> List[float]:
+    out: List[float] = []
+    t = 0.0
+    while True:
+        t += rng.expovariate(rps) if poisson else 1.0 / rps
+        if t >= duration_s:
+            return out
+        out.append(t)
+
+
+def _synthetic_pdfs(out_dir: Path, n: int) -> List[Path]:
+    import fitz  # PyMuPDF, already an ingestion dependency
+
+    rng = random.Random(7)
+    words = [w.strip("?.,’") for q in QUERIES for w in q["query"].split() if len(w) > 3]
+    paths = []
+    for i in range(n):
+        doc = fitz.open()
+        for page in range(3):
+            sentences = [" ".join(rng.choice(words) for _ in range(rng.randint(8, 16))).capitalize() + "." for _ in range(14)]
+            doc.new_page().insert_textbox(fitz.Rect(72, 72, 540, 720), f"{page + 1}. Section {i}-{page}\n{' '.join(sentences)}")
+        path = out_dir / f"loadgen-{i:03d}.pdf"
+        doc.save(str(path))
+        doc.close()
+        paths.append(path)
+    return paths
+
+
+async def _send(client: httpx.AsyncClient, kind: str, pdfs: List[Path], rng: random.Random, extra: Dict[str, Any]) -> int:
+    if kind == "ingest":
+        pdf = rng.choice(pdfs)
+        resp = await client.post("/ingest", files=[("files", (pdf.name, pdf.read_bytes(), "application/pdf"))])
+    else:
+        resp = await client.post("/query", json={**rng.choice(QUERIES), **extra}, headers={"X-Client-Id": f"loadgen-{rng.randrange(1000)}"})
+    return resp.status_code
+
+
+async def run_step(
+    client: httpx.AsyncClient,
+    rps: float,
+    duration_s: float,
+    ingest_ratio: float,
+    pdfs: List[Path],
+    poisson: bool = True,
+    max_outstanding: int = 1000,
+    seed: int = 0,
+    extra: Optional[Dict[str, Any]] = None,
+) -> Step:
+    """Fire requests open-loop at `rps` for `duration_s`; wait for stragglers before returning."""
+    rng = random.Random(seed)
+    step = Step(offered_rps=rps, duration_s=duration_s)
+    pending: set = set()
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+
+    async def one(kind: str, scheduled: float) -> None:
+        try:
+            status = await _send(client, kind, pdfs, rng, extra or {})
+        except (httpx.TimeoutException, httpx.TransportError):
+            status = 0
+        step.samples.append(Sample(kind, status, (loop.time() - scheduled) * 1000.0))
+
+    for offset in _arrivals(rps, duration_s, poisson, rng):
+        await asyncio.sleep(max(0.0, start + offset - loop.time()))
+        if len(pending) >= max_outstanding:
+            step.dropped += 1
+            continue
+        kind = "ingest" if pdfs and rng.random() < ingest_ratio else "query"
+        task = asyncio.ensure_future(one(kind, start + offset))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+    if pending:
+        await asyncio.wait(pending)
+    return step
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_api(workers: int, env: Dict[str, str]) -> tuple[subprocess.Popen, str]:
+    port = _free_port()
+    cmd = [sys.executable, "-m", "uvicorn", "backend.app:app", "--port", str(port), "--workers", str(workers), "--log-level", "warning"]
+    proc = subprocess.Popen(cmd, env=env)
+    base = f"http://127.0.0.1:{port}"
+    for _ in range(600):
+        try:
+            if httpx.get(f"{base}/health", timeout=1.0).status_code < 500:
+                return proc, base
+        except httpx.TransportError:
+            pass
+        if proc.poll() is not None:
+            raise RuntimeError(f"API server exited with {proc.returncode}")
+        time.sleep(0.1)
+    proc.terminate()
+    raise RuntimeError("API server did not come up")
+
+
+async def sweep(base: str, args: argparse.Namespace, pdfs: List[Path]) -> List[Dict[str, Any]]:
+    limits = httpx.Limits(max_connections=args.max_outstanding, max_keepalive_connections=args.max_outstanding)
+    async with httpx.AsyncClient(base_url=base, timeout=args.timeout, limits=limits) as client:
+        if pdfs and not args.no_ingest:
+            files = [("files", (p.name, p.read_bytes(), "application/pdf")) for p in pdfs]
+            r = await client.post("/ingest", files=files, timeout=max(args.timeout, 300.0))
+            print(f"  setup ingest: {r.status_code}", flush=True)
+        steps = []
+        for i, rps in enumerate(args.rps):
+            step = await run_step(
+                client,
+                rps,
+                args.duration,
+                args.ingest_ratio,
+                pdfs,
+                not args.uniform,
+                args.max_outstanding,
+                seed=args.seed + i,
+                extra={"mode": args.mode} if args.mode else None,
+            )
+            report = step.report(args.slo_ms)
+            steps.append(report)
+            print(
+                f"  {rps:>7.1f} rps -> {report['throughput_rps']:>7.2f} ok/s  p50 {report['p50_ms']:>8.1f}  "
+                f"p95 {report['p95_ms']:>8.1f}  p99 {report['p99_ms']:>8.1f} ms  {report['statuses']}"
+                f"{'  SATURATED' if report['saturated'] else ''}",
+                flush=True,
+            )
+            if report["saturated"] and args.stop_at_saturation:
+                break
+        return steps
+
+
+def _summary(steps: List[Dict[str, Any]]) -> Dict[str, Any]:
+    sustained = [s["offered_rps"] for s in steps if not s["saturated"]]
+    saturated = next((s["offered_rps"] for s in steps if s["saturated"]), None)
+    return {"max_sustained_rps": max(sustained) if sustained else None, "saturation_rps": saturated, "steps": steps}
+
+
+def _floats(text: str) -> List[float]:
+    return [float(x) for x in text.split(",") if x.strip()]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Open-loop load test of /query and /ingest.")
+    parser.add_argument("--base", default=None, help="running API to test (default: start one per --workers value)")
+    parser.add_argument("--workers", default="1", help="comma-separated uvicorn worker counts (ignored with --base)")
+    parser.add_argument("--rps", type=_floats, default=_floats("1,2,5,10"), help="comma-separated target rates")
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds per rate step")
+    parser.add_argument("--ingest-ratio", type=float, default=0.0, help="fraction of arrivals that are /ingest uploads")
+    parser.add_argument("--pdf-dir", default=None, help="PDFs to ingest first and upload (default: synthetic)")
+    parser.add_argument("--synthetic-docs", type=int, default=8)
+    parser.add_argument("--no-ingest", action="store_true", help="skip the setup ingest (index already built)")
+    parser.add_argument("--uniform", action="store_true", help="evenly spaced arrivals instead of Poisson")
+    parser.add_argument("--mode", default=None, help="answer mode for every query, e.g. qa to always generate (default: auto)")
+    parser.add_argument("--slo-ms", type=float, default=5000.0, help="p99 above this counts as saturated")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--max-outstanding", type=int, default=1000)
+    parser.add_argument("--stop-at-saturation", action="store_true")
+    parser.add_argument("--stub", action="store_true", help="serve provider stand-ins and point the API at them")
+    parser.add_argument("--stub-llm-median-ms", type=float, default=800.0)
+    parser.add_argument("--stub-llm-sigma", type=float, default=0.4)
+    parser.add_argument("--stub-embed-median-ms", type=float, default=40.0)
+    parser.add_argument("--stub-error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="backend/data/load_results.json")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    stub_state = None
+    if args.stub:
+        config = StubConfig(
+            llm=Latency(args.stub_llm_median_ms, args.stub_llm_sigma),
+            embed=Latency(args.stub_embed_median_ms, 0.3),
+            llm_error_rate=args.stub_error_rate,
+            embed_error_rate=args.stub_error_rate,
+            seed=args.seed,
+        )
+        server, stub_state = make_server(config)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        stub = f"http://127.0.0.1:{server.server_port}"
+        env.update(
+            ANTHROPIC_BASE_URL=stub, ANTHROPIC_API_KEY="stub", VOYAGE_BASE_URL=f"{stub}/v1", VOYAGE_API_KEY="stub", EMBEDDING_PROVIDER="voyage"
+        )
+        print(f"provider stand-ins on {stub}", flush=True)
+
+    tmp = tempfile.TemporaryDirectory()
+    pdfs: List[Path] = []
+    if not args.no_ingest or args.ingest_ratio > 0:
+        pdfs = sorted(Path(args.pdf_dir).glob("*.pdf")) if args.pdf_dir else _synthetic_pdfs(Path(tmp.name), args.synthetic_docs)
+
+    results: Dict[str, Any] = {"config": vars(args), "runs": {}}
+    targets: List[Optional[int]] = [None] if args.base else [int(w) for w in args.workers.split(",")]
+    for workers in targets:
+        proc = None
+        base = args.base
+        if workers is not None:
+            proc, base = _start_api(workers, env)
+        label = "external" if workers is None else f"workers={workers}"
+        print(f"{label} ({base})", flush=True)
+        try:
+            steps = asyncio.run(sweep(base, args, pdfs))
+        finally:
+            if proc is not None:
+                proc.terminate()
+                proc.wait(timeout=30)
+        results["runs"][label] = _summary(steps)
+        print(f"  max sustained {results['runs'][label]['max_sustained_rps']} rps", flush=True)
+    if stub_state is not None:
+        results["stub_counts"] = dict(stub_state.counts)
+    tmp.cleanup()
+
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(json.dumps({label: {k: v for k, v in run.items() if k != "steps"} for label, run in results["runs"].items()}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
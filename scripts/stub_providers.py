@@ -0,0 +1,252 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Set, Tuple
+from urllib.parse import urlsplit
+import argparse
+import base64
+import hashlib
+import json
+import random
+import threading
+import time
+
+from backend.index.local_embed import embed_local
+
+
+# Local stand-ins for the Anthropic Messages API and the Voyage embeddings API, so the
+# pipeline can be load-tested without spending provider quota. Latencies are lognormal
+# (median + shape), errors are injected at a fixed rate, prompt caching is emulated per
+# cached prefix, and `"stream": true` returns server-sent events. Run and point the API at it:
+#   PYTHONPATH=$PWD python scripts/stub_providers.py --port 9100 --llm-median-ms 800
+#   ANTHROPIC_BASE_URL=http://127.0.0.1:9100 ANTHROPIC_API_KEY=stub \
+#   VOYAGE_BASE_URL=http://127.0.0.1:9100/v1 VOYAGE_API_KEY=stub uvicorn backend.app:app
+
+
+@dataclass
+class Latency:
+    median_ms: float = 0.0
+    sigma: float = 0.0  # lognormal shape; 0 = always the median
+
+    def sample(self, rng: random.Random) -> float:
+        if self.median_ms <= 0:
+            return 0.0
+        factor = rng.lognormvariate(0.0, self.sigma) if self.sigma > 0 else 1.0
+        return self.median_ms * factor / 1000.0
+
+
+@dataclass
+class StubConfig:
+    llm: Latency = field(default_factory=lambda: Latency(800.0, 0.4))
+    embed: Latency = field(default_factory=lambda: Latency(40.0, 0.3))
+    llm_error_rate: float = 0.0
+    embed_error_rate: float = 0.0
+    stream_tokens_per_s: float = 60.0
+    cache_speedup: float = 0.3  # latency multiplier when the cached prefix is hit
+    embed_dim: int = 1024
+    seed: int | None = None
+
+
+class StubState:
+    def __init__(self, config: StubConfig):
+        self.config = config
+        self._rng = random.Random(config.seed)
+        self._lock = threading.Lock()
+        self._cached: Set[str] = set()
+        self.counts: Dict[str, int] = {"messages": 0, "embeddings": 0, "errors": 0, "cache_hits": 0}
+
+    def draw(self, latency: Latency, error_rate: float) -> Tuple[float, bool]:
+        with self._lock:
+            return latency.sample(self._rng), self._rng.random() < error_rate
+
+    def count(self, key: str) -> None:
+        with self._lock:
+            self.counts[key] += 1
+
+    def cache(self, key: str) -> bool:
+        """True if the prefix was cached before (a read); records it otherwise (a write)."""
+        with self._lock:
+            hit = key in self._cached
+            self._cached.add(key)
+            return hit
+
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _blocks(body: Dict[str, Any]) -> List[Dict[str, Any]]:
+    # Request text as content blocks, in prompt order: system, then each message
+    def as_blocks(content: Any) -> List[Dict[str, Any]]:
+        return [{"type": "text", "text": content}] if isinstance(content, str) else list(content or [])
+
+    out = as_blocks(body.get("system"))
+    for message in body.get("messages", []):
+        out += as_blocks(message.get("content"))
+    return out
+
+
+def _answer(blocks: List[Dict[str, Any]]) -> str:
+    # First sentence of the first context chunk, so evidence filtering keeps it
+    text = "\n".join(b.get("text", "") for b in blocks)
+    _, marker, rest = text.partition("[Chunk 1]\n")
+    if not marker:
+        return "This is a stub answer."
+    sentence = rest.split("\n\n")[0].split(". ")[0].strip()
+    return sentence if sentence.endswith(".") else f"{sentence}."
+
+
+def _usage(state: StubState, blocks: List[Dict[str, Any]]) -> Dict[str, int]:
+    last = max((i for i, b in enumerate(blocks) if b.get("cache_control")), default=-1)
+    prefix = "\x00".join(b.get("text", "") for b in blocks[: last + 1])
+    rest = sum(_tokens(b.get("text", "")) for b in blocks[last + 1 :])
+    usage = {"input_tokens": rest, "cache_creation_input_tokens": 0, "cache_read_input_tokens": 0}
+    if last >= 0:
+        hit = state.cache(hashlib.blake2b(prefix.encode(), digest_size=16).hexdigest())
+        usage["cache_read_input_tokens" if hit else "cache_creation_input_tokens"] = _tokens(prefix)
+    return usage
+
+
+def make_handler(state: StubState) -> type:
+    class Handler(BaseHTTPRequestHandler):
+        def _json(self, status: int, payload: Dict[str, Any]) -> None:
+            out = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(out)))
+            self.end_headers()
+            self.wfile.write(out)
+
+        def _sse(self, event: str, payload: Dict[str, Any]) -> None:
+            self.wfile.write(f"event: {event}\ndata: {json.dumps(payload)}\n\n".encode())
+            self.wfile.flush()
+
+        def do_POST(self) -> None:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+            path = urlsplit(self.path).path  # the prompt-caching beta adds ?beta=...
+            if path.endswith("/messages"):
+                self._messages(body)
+            elif path.endswith("/embeddings"):
+                self._embeddings(body)
+            else:
+                self._json(404, {"type": "error", "error": {"type": "not_found_error", "message": self.path}})
+
+        def do_GET(self) -> None:
+            self._json(200, dict(state.counts))
+
+        def _messages(self, body: Dict[str, Any]) -> None:
+            state.count("messages")
+            cfg = state.config
+            delay, fail = state.draw(cfg.llm, cfg.llm_error_rate)
+            if fail:
+                state.count("errors")
+                time.sleep(delay / 2)
+                self._json(529, {"type": "error", "error": {"type": "overloaded_error", "message": "stub overloaded"}})
+                return
+            blocks = _blocks(body)
+            usage = _usage(state, blocks)
+            if usage["cache_read_input_tokens"]:
+                state.count("cache_hits")
+                delay *= cfg.cache_speedup
+            text = _answer(blocks)
+            usage["output_tokens"] = _tokens(text)
+            message = {
+                "id": "msg_stub",
+                "type": "message",
+                "role": "assistant",
+                "model": body.get("model", "stub"),
+                "content": [{"type": "text", "text": text}],
+                "stop_reason": "end_turn",
+                "stop_sequence": None,
+                "usage": usage,
+            }
+            time.sleep(delay)  # time to first token
+            if not body.get("stream"):
+                self._json(200, message)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            self._sse("message_start", {"type": "message_start", "message": {**message, "content": [], "stop_reason": None}})
+            self._sse("content_block_start", {"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}})
+            for word in text.split(" "):
+                self._sse("content_block_delta", {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": word + " "}})
+                if cfg.stream_tokens_per_s > 0:
+                    time.sleep(1.0 / cfg.stream_tokens_per_s)
+            self._sse("content_block_stop", {"type": "content_block_stop", "index": 0})
+            self._sse(
+                "message_delta",
+                {"type": "message_delta", "delta": {"stop_reason": "end_turn", "stop_sequence": None}, "usage": {"output_tokens": usage["output_tokens"]}},
+            )
+            self._sse("message_stop", {"type": "message_stop"})
+
+        def _embeddings(self, body: Dict[str, Any]) -> None:
+            state.count("embeddings")
+            cfg = state.config
+            delay, fail = state.draw(cfg.embed, cfg.embed_error_rate)
+            time.sleep(delay)
+            if fail:
+                state.count("errors")
+                self._json(503, {"detail": "stub unavailable"})
+                return
+            texts = body.get("input") or []
+            texts = [texts] if isinstance(texts, str) else texts
+            vectors = embed_local(texts, dim=cfg.embed_dim) if texts else []
+            as_b64 = body.get("encoding_format") == "base64"
+            data = [
+                {"object": "embedding", "index": i, "embedding": base64.b64encode(v.tobytes()).decode() if as_b64 else v.tolist()}
+                for i, v in enumerate(vectors)
+            ]
+            self._json(200, {"object": "list", "data": data, "model": body.get("model"), "usage": {"total_tokens": sum(_tokens(t) for t in texts)}})
+
+        def log_message(self, *_args: Any) -> None:
+            pass
+
+    return Handler
+
+
+def make_server(config: StubConfig, host: str = "127.0.0.1", port: int = 0) -> Tuple[ThreadingHTTPServer, StubState]:
+    """Bound (not yet serving) stub server; port 0 picks a free port (see server.server_port)."""
+    state = StubState(config)
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    server.daemon_threads = True
+    return server, state
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local Anthropic Messages + Voyage embeddings stand-in.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--llm-median-ms", type=float, default=800.0)
+    parser.add_argument("--llm-sigma", type=float, default=0.4, help="lognormal shape of LLM latency (0 = fixed)")
+    parser.add_argument("--embed-median-ms", type=float, default=40.0)
+    parser.add_argument("--embed-sigma", type=float, default=0.3)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="fraction of messages answered 529")
+    parser.add_argument("--embed-error-rate", type=float, default=0.0, help="fraction of embeddings answered 503")
+    parser.add_argument("--stream-tokens-per-s", type=float, default=60.0)
+    parser.add_argument("--cache-speedup", type=float, default=0.3, help="latency multiplier on a prompt cache hit")
+    parser.add_argument("--embed-dim", type=int, default=1024)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    config = StubConfig(
+        llm=Latency(args.llm_median_ms, args.llm_sigma),
+        embed=Latency(args.embed_median_ms, args.embed_sigma),
+        llm_error_rate=args.llm_error_rate,
+        embed_error_rate=args.embed_error_rate,
+        stream_tokens_per_s=args.stream_tokens_per_s,
+        cache_speedup=args.cache_speedup,
+        embed_dim=args.embed_dim,
+        seed=args.seed,
+    )
+    server, _ = make_server(config, args.host, args.port)
+    print(f"stub providers on http://{args.host}:{server.server_port} (GET / for counters)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -12,7 +12,7 @@ export default function App() {
   const [threshold, setThreshold] = useState(0.28)
   const [evidenceTopK, setEvidenceTopK] = useState(4)
   const [temperature, setTemperature] = useState(0.1)
-  const [mode, setMode] = useState<'auto' | 'qa' | 'list' | 'table'>('auto')
+  const [mode, setMode] = useState<'auto' | 'qa' | 'list' | 'table' | 'extractive'>('auto')
   const [answer, setAnswer] = useState<string>('')
   const [citations, setCitations] = useState<any[]>([])
   const [meta, setMeta] = useState<any>({})
@@ -94,6 +94,7 @@ export default function App() {
             <option value="qa">qa</option>
             <option value="list">list</option>
             <option value="table">table</option>
+            <option value="extractive">extractive</option>
           </select>
           <button onClick={onAsk} disabled={busy} style={{ padding: '6px 12px' }}>Send</button>
         </div>